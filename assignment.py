@@ -15,57 +15,513 @@
 - Сохранить результаты в ag_news_results.json
 """
 
+import argparse
+import hashlib
+import heapq
 import json
+import math
+import os
+import pickle
 import re
-from collections import Counter, defaultdict
-from typing import Dict, List, Tuple
+import sys
+import time
+import zlib
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from functools import partial
+from itertools import chain, islice
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
-import numpy as np
-# from datasets import load_dataset # Импорт закомментирован, так как может не работать
-import matplotlib.pyplot as plt
+# Тяжёлые зависимости (numpy, matplotlib, datasets) импортируются внутри функций,
+# которым они нужны: импорт модуля ради preprocess_text не должен их загружать.
+if TYPE_CHECKING:
+    import numpy as np
+    from scipy import sparse
 
 CATEGORY_LABELS = {0: "World", 1: "Sports", 2: "Business", 3: "Tech"}
 
 #  Имя файла для локального датасета
 LOCAL_DATASET_FILE = "ag_news_sample.json"
 
+#  Источники датасета и время ожидания Hugging Face Hub в режиме 'auto' (секунды)
+DATASET_SOURCES = ("auto", "hub", "local")
+DEFAULT_HUB_DEADLINE = 10.0
+
 #  Обратный словарь для проверки в тестах
 LABEL_TO_CATEGORY = {v: k for k, v in CATEGORY_LABELS.items()}
 
+#  Количество записей в одной порции при потоковом чтении
+DEFAULT_BATCH_SIZE = 1000
+
+#  Количество записей в одном шарде при многопроцессном подсчёте
+DEFAULT_SHARD_SIZE = 10000
+
+#  Количество отслеживаемых слов на категорию в приближённом режиме (Space-Saving)
+DEFAULT_SKETCH_CAPACITY = 2000
+
+#  Каталог кэша результатов анализа и его предельный размер
+CACHE_DIR = ".ag_news_cache"
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+#  Версия формата кэша: увеличивается при изменении AnalysisState или результатов
+CACHE_FORMAT_VERSION = 4
+
+#  Имена n-грамм в результатах, число корзин хэш-счётчика по умолчанию и запас
+#  кандидатов: точно пересчитываются NGRAM_CANDIDATE_FACTOR * top_n лучших корзин
+NGRAM_NAMES = {2: "bigrams", 3: "trigrams"}
+DEFAULT_NGRAM_BUCKETS = 1 << 18
+NGRAM_CANDIDATE_FACTOR = 4
+_NGRAM_HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+
+#  Методы поиска характерных слов и доля общих частот слов в априорном распределении
+#  Дирихле для log-odds (псевдосчётчики слова = DEFAULT_PRIOR_SCALE * его общая частота)
+CHARACTERISTIC_METHODS = ("log_odds", "tfidf")
+DEFAULT_PRIOR_SCALE = 0.1
+
+#  Файл круговой диаграммы
+CHART_FILE = "visualization.png"
+
+#  Файл с сохранённым сливаемым состоянием анализа (для режима --append)
+STATE_FILE = "ag_news_state.pkl"
+
+#  Версия формата корпуса токенов и метка документа с неизвестной категорией
+CORPUS_FORMAT_VERSION = 2
+UNKNOWN_LABEL_CODE = 255
+
+#  Размер блока чтения файла (символы) при потоковом разборе JSON
+READ_CHUNK_SIZE = 1 << 16
+
+#  Версия токенизатора: увеличивается при любом изменении правил разбиения на слова
+TOKENIZER_VERSION = 1
+
+#  Разделитель документов при пакетной токенизации (не является буквой a-z)
+_DOC_SEPARATOR = "\x00"
+
+#  Таблица перевода байтов: буквы a-z и разделитель документов сохраняются, остальное -> пробел
+_TOKEN_BYTE_TABLE = bytes(
+    code if (ord("a") <= code <= ord("z") or code == 0) else ord(" ") for code in range(256)
+)
+
+#  Разделители между элементами JSON-массива
+_JSON_SEPARATORS = re.compile(r'[\s,]*')
+
 
-def load_ag_news_dataset():
+def iter_json_record_batches(path: str, batch_size: int = DEFAULT_BATCH_SIZE,
+                             chunk_size: int = READ_CHUNK_SIZE) -> Iterator[List[Dict]]:
     """
-    Загружает датасет AG News.
-    Сначала пытается загрузить с Hugging Face Hub.
-    Если загрузка зависает или вызывает ошибку, использует локальный файл 'ag_news_sample.json'.
+    Потоково читает записи из JSON-массива или JSON Lines порциями.
+
+    Файл читается блоками по chunk_size символов, поэтому в памяти
+    одновременно находятся только текущий блок и одна порция записей.
+
+    Args:
+        path (str): Путь к файлу (.json с массивом или .jsonl).
+        batch_size (int): Количество записей в одной порции.
+        chunk_size (int): Размер блока чтения файла.
+
+    Returns:
+        Iterator[List[Dict]]: Порции записей.
+
+    Raises:
+        ValueError: Если batch_size меньше 1.
+        json.JSONDecodeError: Если файл содержит некорректный JSON.
+    """
+    if batch_size < 1:
+        raise ValueError(f"batch_size должен быть положительным, получено {batch_size}")
+    decoder = json.JSONDecoder()
+    batch = []
+    with open(path, "r", encoding="utf-8") as f:
+        buffer = f.read(chunk_size)
+        # Ведущие пробелы могут быть длиннее блока: читаем до первого значимого символа
+        while buffer and not buffer.strip():
+            buffer = f.read(chunk_size)
+        pos = _JSON_SEPARATORS.match(buffer).end()
+        # JSON-массив начинается с '[', иначе считаем файл JSON Lines
+        in_array = buffer[pos:pos + 1] == "["
+        if in_array:
+            pos += 1
+        eof = not buffer
+        while True:
+            pos = _JSON_SEPARATORS.match(buffer, pos).end()
+            if in_array and buffer[pos:pos + 1] == "]":
+                break
+            try:
+                if pos == len(buffer):
+                    raise json.JSONDecodeError("Expecting value", buffer, pos)
+                record, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    if pos == len(buffer) and not in_array:
+                        break
+                    raise
+                # Запись не поместилась в буфер: дочитываем следующий блок
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+            batch.append(record)
+            pos = end
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+class LocalDatasetStream:
+    """
+    Потоковый датасет поверх локального файла.
+
+    Не держит записи в памяти: каждый проход заново читает файл
+    порциями по batch_size записей.
+    """
+
+    def __init__(self, path: str, batch_size: int = DEFAULT_BATCH_SIZE):
+        """
+        Инициализация потока.
+
+        Args:
+            path (str): Путь к файлу с JSON-массивом или JSON Lines.
+            batch_size (int): Количество записей в одной порции.
+        """
+        self.path = path
+        self.batch_size = batch_size
+
+    def iter_batches(self, batch_size: int = None) -> Iterator[List[Dict]]:
+        """
+        Возвращает итератор по порциям записей.
+
+        Args:
+            batch_size (int): Размер порции. По умолчанию self.batch_size.
+
+        Returns:
+            Iterator[List[Dict]]: Порции записей.
+        """
+        return iter_json_record_batches(self.path, batch_size or self.batch_size)
+
+    def __iter__(self) -> Iterator[Dict]:
+        """Итерирует по отдельным записям."""
+        for batch in self.iter_batches():
+            yield from batch
+
+
+def iter_dataset_batches(dataset, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Dict]]:
+    """
+    Разбивает датасет на порции записей, не материализуя его целиком.
+
+    Args:
+        dataset: Список записей, LocalDatasetStream или любой итерируемый набор.
+        batch_size (int): Количество записей в одной порции.
+
+    Returns:
+        Iterator[List[Dict]]: Порции записей.
+    """
+    if isinstance(dataset, LocalDatasetStream):
+        yield from dataset.iter_batches(batch_size)
+        return
+    if isinstance(dataset, list):
+        for start in range(0, len(dataset), batch_size):
+            yield dataset[start:start + batch_size]
+        return
+    iterator = iter(dataset)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def is_columnar_dataset(dataset) -> bool:
+    """
+    Проверяет, поддерживает ли датасет постолбцовое чтение порциями.
+
+    Так устроен datasets.Dataset (Hugging Face): метод iter(batch_size)
+    отдаёт порции как словари столбцов, читая их прямо из Arrow-таблицы
+    без создания словаря на каждую строку.
+
+    Args:
+        dataset: Загруженный датасет.
+
+    Returns:
+        bool: True для датасетов с column_names и iter(batch_size).
+    """
+    return (not isinstance(dataset, (list, LocalDatasetStream))
+            and hasattr(dataset, "column_names")
+            and callable(getattr(dataset, "iter", None)))
+
+
+def iter_column_batches(dataset,
+                        batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Tuple[List, List]]:
+    """
+    Разбивает датасет на порции столбцов 'label' и 'text'.
+
+    Для datasets.Dataset столбцы читаются из Arrow порциями; для списков
+    и потоков записей столбцы собираются из словарей (резервный путь).
+
+    Args:
+        dataset: datasets.Dataset, список записей, LocalDatasetStream или итерируемый набор.
+        batch_size (int): Количество записей в одной порции.
+
+    Returns:
+        Iterator[Tuple[List, List]]: Пары (метки, тексты) для каждой порции.
+    """
+    if is_columnar_dataset(dataset):
+        for columns in dataset.iter(batch_size=batch_size):
+            yield columns['label'], columns['text']
+        return
+    for batch in iter_dataset_batches(dataset, batch_size):
+        yield [item.get('label') for item in batch], [item.get('text', '') for item in batch]
+
+
+def encode_labels(labels) -> "np.ndarray":
     """
+    Переводит метки в компактный массив кодов категорий.
+
+    Код известной метки - её номер в CATEGORY_LABELS, код любой другой метки
+    (None, -1, 7, "World") - UNKNOWN_LABEL_CODE. Целочисленные столбцы
+    кодируются векторно; массив uint8 считается уже закодированным.
+
+    Args:
+        labels: Метки порции или всего датасета.
+
+    Returns:
+        np.ndarray: Коды категорий (uint8).
+
+    Examples:
+        >>> encode_labels([0, 3, 7, -1]).tolist()
+        [0, 3, 255, 255]
+        >>> encode_labels([1, None, "Sports"]).tolist()
+        [1, 255, 255]
+    """
+    import numpy as np
+    if isinstance(labels, np.ndarray) and labels.dtype == np.uint8:
+        return labels
+    values = np.asarray(labels)
+    if values.dtype.kind in "biu":
+        known = (values >= 0) & (values < len(CATEGORY_LABELS))
+        return np.where(known, values, UNKNOWN_LABEL_CODE).astype(np.uint8)
+    # Смешанные типы (None, строки, float) разбираются поштучно по словарю меток
+    codes = {label: code for code, label in enumerate(CATEGORY_LABELS)}
+    return np.fromiter((codes.get(label, UNKNOWN_LABEL_CODE) for label in values.tolist()),
+                       dtype=np.uint8, count=len(values))
+
+
+def label_distribution(codes: "np.ndarray") -> Tuple[Dict[str, int], int]:
+    """
+    Считает распределение категорий по массиву кодов через np.bincount.
+
+    Args:
+        codes (np.ndarray): Коды категорий (см. encode_labels()).
+
+    Returns:
+        Tuple[Dict[str, int], int]: Количество записей по каждой категории и
+        количество записей с неизвестной меткой.
+
+    Examples:
+        >>> label_distribution(encode_labels([0, 1, 1, 9]))
+        ({'World': 1, 'Sports': 2, 'Business': 0, 'Tech': 0}, 1)
+    """
+    import numpy as np
+    known = codes[codes < len(CATEGORY_LABELS)]
+    counts = np.bincount(known, minlength=len(CATEGORY_LABELS)).tolist()
+    return dict(zip(CATEGORY_LABELS.values(), counts)), len(codes) - len(known)
+
+
+def dataset_label_codes(dataset, batch_size: int = DEFAULT_BATCH_SIZE) -> "np.ndarray":
+    """
+    Извлекает коды категорий всего датасета один раз.
+
+    Результат можно передать в analyze_category_distribution(),
+    analyze_text_lengths_by_category(), extract_top_words_by_category() и
+    collect_analysis_state() (label_codes=...), чтобы метки не разбирались
+    заново в каждой функции. У TokenCorpus коды уже хранятся в labels.u8.
+
+    Args:
+        dataset: Загруженный датасет (должен обходиться повторно).
+        batch_size (int): Количество записей в одной порции.
+
+    Returns:
+        np.ndarray: Коды категорий (uint8) в порядке записей датасета.
+    """
+    import numpy as np
+    if isinstance(dataset, TokenCorpus):
+        return np.asarray(dataset.labels)
+    batches = [encode_labels(labels) for labels, _ in iter_column_batches(dataset, batch_size)]
+    return np.concatenate(batches) if batches else np.zeros(0, dtype=np.uint8)
+
+
+def load_hub_dataset():
+    """
+    Загружает train-сплит AG News с Hugging Face Hub.
+
+    Returns:
+        datasets.Dataset: Датасет AG News.
+
+    Raises:
+        ImportError: Если библиотека 'datasets' не установлена.
+    """
+    from datasets import load_dataset
+    return load_dataset("ag_news", split="train")
+
+
+def is_valid_dataset(dataset) -> bool:
+    """
+    Проверяет, что источник вернул непустой датасет.
+
+    Args:
+        dataset: Результат загрузки.
+
+    Returns:
+        bool: False для None и пустых датасетов с известной длиной.
+    """
+    if dataset is None:
+        return False
     try:
-        print("DEBUG: Попытка загрузки датасета из Hugging Face Hub...")
-        from datasets import load_dataset
-        dataset = load_dataset("ag_news", split="train")
-        print("DEBUG: Датасет успешно загружен из Hugging Face Hub.")
-        return dataset
-    except ImportError:
-        print("DEBUG: Библиотека 'datasets' не установлена. Использую локальный файл.")
-    except KeyboardInterrupt:
-        print("DEBUG: Прервано пользователем (Ctrl+C). Использую локальный файл.")
-    except Exception as e:
-        print(f"DEBUG: Ошибка при загрузке из Hugging Face Hub: {e}. Использую локальный файл.")
-    # Если Hugging Face не сработал, загружаем из локального файла
+        return len(dataset) > 0
+    except TypeError:
+        # Потоковые датасеты не знают своей длины
+        return True
+
+
+def _load_local_dataset(streaming: bool = False, batch_size: int = DEFAULT_BATCH_SIZE,
+                        verbose: bool = True):
+    """
+    Загружает датасет из локального файла LOCAL_DATASET_FILE.
+
+    Args:
+        streaming (bool): Вернуть LocalDatasetStream вместо списка записей.
+        batch_size (int): Размер порции при потоковом чтении.
+        verbose (bool): Печатать сообщения. В фоновом потоке отключается, чтобы
+            сообщения не перемешивались с основным потоком.
+
+    Raises:
+        FileNotFoundError: Если файл отсутствует.
+        json.JSONDecodeError: Если файл не является корректным JSON.
+    """
+    log = print if verbose else (lambda *args: None)
     try:
-        print(f"DEBUG: Загружаю датасет из локального файла '{LOCAL_DATASET_FILE}'...")
+        log(f"DEBUG: Загружаю датасет из локального файла '{LOCAL_DATASET_FILE}'...")
+        if streaming:
+            # Открываем файл сразу, чтобы ошибка отсутствия возникла здесь, а не при анализе
+            with open(LOCAL_DATASET_FILE, "r", encoding="utf-8"):
+                pass
+            log("DEBUG: Локальный датасет будет прочитан потоково.")
+            return LocalDatasetStream(LOCAL_DATASET_FILE, batch_size)
         with open(LOCAL_DATASET_FILE, "r", encoding="utf-8") as f:
             data = json.load(f)
-        print("DEBUG: Локальный датасет успешно загружен.")
+        log("DEBUG: Локальный датасет успешно загружен.")
         return data
     except FileNotFoundError:
-        print(f"ERROR: Файл '{LOCAL_DATASET_FILE}' не найден. Невозможно загрузить датасет.")
+        log(f"ERROR: Файл '{LOCAL_DATASET_FILE}' не найден. Невозможно загрузить датасет.")
         raise FileNotFoundError(f"Файл '{LOCAL_DATASET_FILE}' отсутствует.")
     except json.JSONDecodeError as e:
-        print(f"ERROR: Ошибка чтения JSON из '{LOCAL_DATASET_FILE}': {e}")
+        log(f"ERROR: Ошибка чтения JSON из '{LOCAL_DATASET_FILE}': {e}")
         raise e
 
 
+def load_ag_news_dataset(streaming: bool = False, batch_size: int = DEFAULT_BATCH_SIZE,
+                         source: str = "auto", deadline: float = DEFAULT_HUB_DEADLINE,
+                         hub_loader: Optional[Callable[[], Any]] = None):
+    """
+    Загружает датасет AG News.
+
+    В режиме 'auto' Hugging Face Hub и локальный файл 'ag_news_sample.json'
+    загружаются одновременно в фоновых потоках. Hub предпочтительнее (это
+    полный датасет), но его ждут не дольше deadline секунд: если Hub вернул
+    ошибку или не успел, сразу используется локальный файл. Зависший поток
+    Hub - демон и не мешает завершению программы.
+
+    Args:
+        streaming (bool): Читать локальный файл потоково (LocalDatasetStream)
+            вместо загрузки всего списка в память.
+        batch_size (int): Размер порции при потоковом чтении.
+        source (str): 'auto', 'hub' (только Hub) или 'local' (только файл).
+        deadline (float): Сколько секунд ждать Hub в режиме 'auto'.
+        hub_loader (Optional[Callable[[], Any]]): Функция загрузки с Hub.
+            По умолчанию load_hub_dataset; в тестах подменяется фейковым Hub.
+
+    Raises:
+        ValueError: Если source неизвестен или Hub вернул пустой датасет (source='hub').
+        FileNotFoundError: Если ни один источник недоступен и локального файла нет.
+
+    Examples:
+        >>> dataset = load_ag_news_dataset(source="auto", deadline=2.0,
+        ...                                hub_loader=lambda: [{"label": 0, "text": "Hub"}])
+        ... # doctest: +SKIP
+    """
+    if source not in DATASET_SOURCES:
+        raise ValueError(f"Неизвестный источник датасета: '{source}'")
+    hub_loader = hub_loader or load_hub_dataset
+    if source == "local":
+        return _load_local_dataset(streaming, batch_size)
+    if source == "hub":
+        print("DEBUG: Загрузка датасета из Hugging Face Hub...")
+        dataset = hub_loader()
+        if not is_valid_dataset(dataset):
+            raise ValueError("Hugging Face Hub вернул пустой датасет.")
+        print("DEBUG: Датасет успешно загружен из Hugging Face Hub.")
+        return dataset
+
+    import queue
+    import threading
+
+    outcomes = queue.Queue()
+
+    def run(name: str, loader: Callable[[], Any]) -> None:
+        try:
+            outcomes.put((name, loader(), None))
+        except Exception as e:
+            outcomes.put((name, None, e))
+
+    print(f"DEBUG: Параллельная загрузка из Hugging Face Hub (до {deadline} с) "
+          "и из локального файла...")
+    loaders = {"hub": hub_loader,
+               "local": partial(_load_local_dataset, streaming, batch_size, verbose=False)}
+    for name, loader in loaders.items():
+        threading.Thread(target=run, args=(name, loader), name=f"ag-news-{name}",
+                         daemon=True).start()
+
+    finished = {}
+
+    def wait_for(name: str, until: Optional[float]) -> Optional[Tuple[Any, Optional[Exception]]]:
+        while name not in finished:
+            timeout = None if until is None else until - time.monotonic()
+            if timeout is not None and timeout <= 0:
+                return None
+            try:
+                done, dataset, error = outcomes.get(timeout=timeout)
+            except queue.Empty:
+                return None
+            finished[done] = (dataset, error)
+        return finished[name]
+
+    try:
+        hub = wait_for("hub", time.monotonic() + deadline)
+    except KeyboardInterrupt:
+        print("DEBUG: Прервано пользователем (Ctrl+C). Использую локальный файл.")
+        hub = None
+    if hub is None:
+        print(f"DEBUG: Hugging Face Hub не ответил за {deadline} с. Использую локальный файл.")
+    elif isinstance(hub[1], ImportError):
+        print("DEBUG: Библиотека 'datasets' не установлена. Использую локальный файл.")
+    elif hub[1] is not None:
+        print(f"DEBUG: Ошибка при загрузке из Hugging Face Hub: {hub[1]}. "
+              "Использую локальный файл.")
+    elif not is_valid_dataset(hub[0]):
+        print("DEBUG: Hugging Face Hub вернул пустой датасет. Использую локальный файл.")
+    else:
+        print("DEBUG: Датасет успешно загружен из Hugging Face Hub.")
+        return hub[0]
+
+    dataset, error = wait_for("local", None)
+    if error is not None:
+        print(f"ERROR: Не удалось загрузить локальный файл '{LOCAL_DATASET_FILE}': {error}")
+        raise error
+    print(f"DEBUG: Датасет загружен из локального файла '{LOCAL_DATASET_FILE}'.")
+    return dataset
+
+
 def preprocess_text(text: str) -> str:
     """
     Предобрабатывает текст: приведение к нижнему регистру, удаление знаков препинания и чисел.
@@ -85,153 +541,2319 @@ def preprocess_text(text: str) -> str:
     return text
 
 
-def analyze_category_distribution(dataset) -> Dict[str, int]:
+def tokenize_batch(texts: List[str]) -> List[List[str]]:
     """
-    Анализирует распределение новостей по категориям.
+    Токенизирует столбец текстов целиком.
+
+    Даёт те же токены, что и preprocess_text(text).split(), но приводит к
+    нижнему регистру и очищает все тексты одной операцией над склеенной
+    строкой вместо regex-замены для каждого текста.
 
     Args:
-        dataset: Загруженный датасет (список словарей с ключами 'text' и 'label').
+        texts (List[str]): Тексты для токенизации.
 
     Returns:
-        Dict[str, int]: Словарь с количеством новостей по каждой категории.
+        List[List[str]]: Список токенов для каждого текста.
+
+    Examples:
+        >>> tokenize_batch(["Hello, World!", "A 1 B!"])
+        [['hello', 'world'], ['a', 'b']]
     """
-    distribution = Counter()
-    for item in dataset:
-        label = item.get('label')
-        if label is not None:
-            category_name = CATEGORY_LABELS.get(label)
-            if category_name:
-                distribution[category_name] += 1
-    # Гарантируем, что все категории присутствуют в результате
-    result = {name: distribution.get(name, 0) for name in CATEGORY_LABELS.values()}
-    return result
+    if not texts:
+        return []
+    joined = _DOC_SEPARATOR.join(texts)
+    if joined.count(_DOC_SEPARATOR) != len(texts) - 1:
+        # Разделитель встречается в самих текстах: обрабатываем по одному
+        return [preprocess_text(text).split() for text in texts]
+    # Символы вне ASCII заменяются на '?' и далее, как и прочие не-буквы, на пробел.
+    # Нижний регистр применяется до этого, т.к. lower() может дать ASCII-буквы (K -> k).
+    cleaned = (joined.lower()
+               .encode("ascii", "replace")
+               .translate(_TOKEN_BYTE_TABLE)
+               .decode("ascii"))
+    return [part.split() for part in cleaned.split(_DOC_SEPARATOR)]
 
 
-def analyze_text_lengths_by_category(dataset) -> Dict[str, Dict[str, float]]:
+class SpaceSavingCounter:
     """
-    Вычисляет статистику длины текстов по категориям.
+    Приближённый счётчик частот с фиксированной памятью (алгоритм Space-Saving).
+
+    Отслеживает не больше capacity слов. Когда место заканчивается, новое
+    слово вытесняет слово с минимальной оценкой и наследует её как
+    погрешность. Оценка частоты никогда не меньше истинной и превышает
+    её не более чем на погрешность слова (и не более чем на total / capacity).
+    """
+
+    def __init__(self, capacity: int = DEFAULT_SKETCH_CAPACITY):
+        """
+        Инициализация пустого счётчика.
+
+        Args:
+            capacity (int): Максимальное количество отслеживаемых слов.
+
+        Raises:
+            ValueError: Если capacity меньше 1.
+        """
+        if capacity < 1:
+            raise ValueError(f"capacity должен быть положительным, получено {capacity}")
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.total = 0
+        self.evicted = False
+        # Куча (оценка, слово): ровно одна запись на слово, оценка в ней может отставать
+        self._heap = []
+
+    def _add(self, item: str, weight: int) -> None:
+        """
+        Учитывает weight появлений слова.
+
+        Args:
+            item (str): Слово.
+            weight (int): Количество появлений.
+        """
+        self.total += weight
+        if item in self.counts:
+            self.counts[item] += weight
+            return
+        if len(self.counts) < self.capacity:
+            self.counts[item] = weight
+            self.errors[item] = 0
+            heapq.heappush(self._heap, (weight, item))
+            return
+        # Ищем слово с минимальной оценкой, обновляя устаревшие записи кучи
+        while True:
+            count, victim = self._heap[0]
+            if self.counts[victim] == count:
+                break
+            heapq.heapreplace(self._heap, (self.counts[victim], victim))
+        heapq.heapreplace(self._heap, (count + weight, item))
+        del self.counts[victim]
+        del self.errors[victim]
+        self.counts[item] = count + weight
+        self.errors[item] = count
+        self.evicted = True
+
+    def update(self, items: Iterable[str]) -> None:
+        """
+        Учитывает последовательность слов.
+
+        Слова предварительно агрегируются, что сохраняет порядок первого появления.
+
+        Args:
+            items (Iterable[str]): Слова.
+        """
+        for item, weight in Counter(items).items():
+            self._add(item, weight)
+
+    def min_count(self) -> int:
+        """
+        Возвращает верхнюю границу частоты любого неотслеживаемого слова.
+
+        Returns:
+            int: Минимальная оценка, если были вытеснения, иначе 0.
+        """
+        return min(self.counts.values()) if self.evicted else 0
+
+    def merge(self, other: "SpaceSavingCounter") -> None:
+        """
+        Сливает с другим счётчиком той же ёмкости (mergeable summaries).
+
+        Слову, отсутствующему в одном из счётчиков, приписывается минимальная
+        оценка этого счётчика, после чего остаются capacity лучших слов.
+
+        Args:
+            other (SpaceSavingCounter): Счётчик следующей части потока.
+        """
+        own_min, other_min = self.min_count(), other.min_count()
+        merged = {}
+        for item in chain(self.counts, other.counts):
+            if item not in merged:
+                merged[item] = (self.counts.get(item, own_min) + other.counts.get(item, other_min),
+                                self.errors.get(item, own_min) + other.errors.get(item, other_min))
+        kept = heapq.nlargest(self.capacity, merged.items(), key=lambda pair: pair[1][0])
+        kept_items = {item for item, _ in kept}
+        self.evicted = self.evicted or other.evicted or len(merged) > self.capacity
+        self.total += other.total
+        # Сохраняем порядок первого появления среди оставшихся слов
+        self.counts = {item: merged[item][0] for item in merged if item in kept_items}
+        self.errors = {item: merged[item][1] for item in merged if item in kept_items}
+        self._heap = [(count, item) for item, count in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def most_common(self, n: int = None) -> List[Tuple[str, int]]:
+        """
+        Возвращает n слов с наибольшей оценкой частоты.
+
+        Args:
+            n (int): Количество слов. По умолчанию все.
+
+        Returns:
+            List[Tuple[str, int]]: Пары (слово, оценка) по убыванию оценки.
+        """
+        if n is None:
+            return sorted(self.counts.items(), key=lambda pair: pair[1], reverse=True)
+        return heapq.nlargest(n, self.counts.items(), key=lambda pair: pair[1])
+
+    def error_bounds(self, top_n: int) -> Dict[str, Any]:
+        """
+        Оценивает точность топ-N слов.
+
+        Топ гарантирован, если нижняя граница частоты каждого слова топа
+        (оценка минус погрешность) строго больше верхней границы частоты
+        любого слова вне топа.
+
+        Args:
+            top_n (int): Размер топа.
+
+        Returns:
+            Dict[str, Any]: max_error (наибольшая погрешность в топе),
+            error_bound (total / capacity), guaranteed (состав топа точный)
+            и exact (к тому же точны все частоты).
+        """
+        ranked = self.most_common(top_n + 1)
+        top, rest = ranked[:top_n], ranked[top_n:]
+        outside_bound = max(rest[0][1] if rest else 0, self.min_count())
+        top_errors = [self.errors[item] for item, _ in top]
+        guaranteed = all(count - self.errors[item] > outside_bound for item, count in top) \
+            or not self.evicted
+        return {
+            "max_error": max(top_errors, default=0),
+            "error_bound": round(self.total / self.capacity, 2),
+            "guaranteed": guaranteed,
+            "exact": guaranteed and not any(top_errors),
+        }
+
+
+class LengthAccumulator:
+    """
+    Потоковая статистика длин текстов одной категории.
+
+    Среднее и дисперсия считаются методом Уэлфорда, а медиана, перцентили,
+    минимум и максимум - точно по гистограмме длин. Память пропорциональна
+    числу различных длин, а не числу текстов.
+    """
+
+    def __init__(self):
+        """Инициализация пустого накопителя."""
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.histogram = Counter()
+
+    def add(self, length: int) -> None:
+        """
+        Учитывает длину одного текста.
+
+        Args:
+            length (int): Длина текста в словах.
+        """
+        self.count += 1
+        delta = length - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (length - self.mean)
+        self.histogram[length] += 1
+
+    def add_many(self, lengths: List[int]) -> None:
+        """
+        Учитывает длины порции текстов.
+
+        Args:
+            lengths (List[int]): Длины текстов в словах.
+        """
+        for length in lengths:
+            self.add(length)
+
+    def merge(self, other: "LengthAccumulator") -> None:
+        """
+        Сливает с накопителем другой части датасета (формула Чана).
+
+        Args:
+            other (LengthAccumulator): Накопитель для следующей части датасета.
+        """
+        if not other.count:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.mean += delta * other.count / total
+        self.count = total
+        self.histogram.update(other.histogram)
+
+    @classmethod
+    def from_histogram(cls, histogram: Dict[int, int]) -> "LengthAccumulator":
+        """
+        Создаёт накопитель по готовой гистограмме длин.
+
+        Args:
+            histogram (Dict[int, int]): Количество текстов для каждой длины.
+
+        Returns:
+            LengthAccumulator: Накопитель с той же статистикой.
+        """
+        accumulator = cls()
+        accumulator.histogram = Counter({length: n for length, n in histogram.items() if n})
+        accumulator.count = sum(accumulator.histogram.values())
+        if accumulator.count:
+            accumulator.mean = sum(length * n for length, n in accumulator.histogram.items()) \
+                / accumulator.count
+            accumulator.m2 = sum(n * (length - accumulator.mean) ** 2
+                                 for length, n in accumulator.histogram.items())
+        return accumulator
+
+    def percentile(self, q: float) -> float:
+        """
+        Вычисляет перцентиль с линейной интерполяцией (как numpy.percentile).
+
+        Args:
+            q (float): Перцентиль от 0 до 100.
+
+        Returns:
+            float: Значение перцентиля.
+        """
+        position = q / 100 * (self.count - 1)
+        lower_rank, upper_rank = math.floor(position), math.ceil(position)
+        lower = upper = None
+        seen = 0
+        # Ищем значения с нужными порядковыми номерами по накопленной гистограмме
+        for length in sorted(self.histogram):
+            seen += self.histogram[length]
+            if lower is None and seen > lower_rank:
+                lower = length
+            if seen > upper_rank:
+                upper = length
+                break
+        return float(lower + (upper - lower) * (position - lower_rank))
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Возвращает итоговую статистику длин.
+
+        Returns:
+            Dict[str, Any]: Средняя, медиана, std, min, max, p90, p99 и гистограмма длин.
+        """
+        if not self.count:
+            return {"mean_length": 0, "median_length": 0, "std_length": 0,
+                    "min_length": 0, "max_length": 0, "p90_length": 0, "p99_length": 0,
+                    "histogram": {}}
+        return {
+            "mean_length": round(self.mean, 2),
+            "median_length": self.percentile(50),
+            # Стандартное отклонение генеральной совокупности, как np.std
+            "std_length": round(math.sqrt(self.m2 / self.count), 2),
+            "min_length": min(self.histogram),
+            "max_length": max(self.histogram),
+            "p90_length": round(self.percentile(90), 2),
+            "p99_length": round(self.percentile(99), 2),
+            "histogram": {length: self.histogram[length] for length in sorted(self.histogram)}
+        }
+
+
+def token_hash(token: str) -> int:
+    """
+    Возвращает хэш токена, одинаковый во всех процессах (CRC32, а не hash()).
 
     Args:
-        dataset: Загруженный датасет.
+        token (str): Токен.
 
     Returns:
-        Dict[str, Dict[str, float]]:
-        Словарь со статистикой (средняя, медиана, std) по каждой категории.
-    """
-    lengths_by_category = defaultdict(list)
-    for item in dataset:
-        text = item.get('text', '')
-        label = item.get('label')
-        category_name = CATEGORY_LABELS.get(label)
-        if category_name:
-            lengths_by_category[category_name].append(len(text.split()))
-
-    stats = {}
-    # Проходим по всем возможным категориям, чтобы гарантировать их наличие
-    for label, category_name in CATEGORY_LABELS.items():
-        lengths = lengths_by_category[category_name]
-        if lengths:
-            arr_lengths = np.array(lengths)
-            stats[category_name] = {
-                "mean_length": round(np.mean(arr_lengths), 2),
-                "median_length": float(np.median(arr_lengths)),
-                "std_length": round(np.std(arr_lengths), 2),
-                "min_length": int(np.min(arr_lengths)),
-                "max_length": int(np.max(arr_lengths))
-            }
-        else:
-            stats[category_name] = {"mean_length": 0, "median_length": 0,
-                                    "std_length": 0, "min_length": 0, "max_length": 0}
-    return stats
+        int: 32-битный хэш.
+    """
+    return zlib.crc32(token.encode("utf-8", "surrogatepass"))
 
 
-def extract_top_words_by_category(dataset, top_n: int = 15) -> Dict[str, List[Tuple[str, int]]]:
+def hash_word_lists(word_lists: List[List[str]]) -> Tuple["np.ndarray", "np.ndarray", List[str]]:
     """
-    Извлекает топ-N слов для каждой категории.
+    Переводит списки токенов документов в плоские массивы хэшей и номеров документов.
+
+    Каждый различный токен порции хэшируется один раз; кэш живёт только
+    в пределах порции, поэтому память не растёт вместе со словарём.
 
     Args:
-        dataset: Загруженный датасет.
-        top_n (int): Количество топ слов для извлечения. По умолчанию 15.
+        word_lists (List[List[str]]): Токены каждого документа.
 
     Returns:
-        Dict[str, List[Tuple[str, int]]]: Словарь, где ключ - категория, значение - список топ слов.
+        Tuple[np.ndarray, np.ndarray, List[str]]: Хэши токенов (uint64), номер
+        документа каждого токена и сами токены подряд.
     """
-    words_by_category = defaultdict(Counter)
-    for item in dataset:
-        text = item.get('text', '')
-        label = item.get('label')
-        category_name = CATEGORY_LABELS.get(label)
-        if category_name:
-            processed_text = preprocess_text(text)
-            words = processed_text.split()
-            # Обновляем счётчик слов для текущей категории
-            words_by_category[category_name].update(words)
-
-    top_words = {}
-    # Проходим по всем возможным категориям, чтобы гарантировать их наличие
-    for label, category_name in CATEGORY_LABELS.items():
-        counter = words_by_category[category_name]
-        # Получаем топ-N слов
-        top_words[category_name] = counter.most_common(top_n)
-    return top_words
+    import numpy as np
+    words = list(chain.from_iterable(word_lists))
+    batch_hashes = {word: token_hash(word) for word in set(words)}
+    hashes = np.fromiter(map(batch_hashes.__getitem__, words), dtype=np.uint64,
+                         count=len(words))
+    doc_ids = np.repeat(np.arange(len(word_lists)), [len(tokens) for tokens in word_lists])
+    return hashes, doc_ids, words
 
 
-def create_pie_chart(category_counts: Dict[str, int]):
+def ngram_hashes(hashes: "np.ndarray", doc_ids: "np.ndarray",
+                 order: int) -> Tuple["np.ndarray", "np.ndarray"]:
     """
-    Создаёт и сохраняет круговую диаграмму распределения категорий.
+    Комбинирует хэши соседних токенов в хэши n-грамм, не пересекающих границы документов.
 
     Args:
-        category_counts (Dict[str, int]): Словарь с количеством новостей по категориям.
+        hashes (np.ndarray): Хэши токенов подряд (uint64).
+        doc_ids (np.ndarray): Номер документа каждого токена.
+        order (int): Длина n-граммы.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Хэши n-грамм и позиции их первых токенов.
+
+    Examples:
+        >>> import numpy as np
+        >>> hashes = np.array([1, 2, 3, 4], dtype=np.uint64)
+        >>> ngram_hashes(hashes, np.array([0, 0, 0, 1]), 2)[1].tolist()
+        [0, 1]
     """
-    labels = category_counts.keys()
-    sizes = category_counts.values()
+    import numpy as np
+    count = len(hashes) - order + 1
+    if count <= 0:
+        return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.int64)
+    combined = hashes[:count].copy()
+    multiplier = np.uint64(_NGRAM_HASH_MULTIPLIER)
+    for shift in range(1, order):
+        # Умножение по модулю 2**64 перемешивает биты; переполнение uint64 ожидаемо
+        combined = combined * multiplier + hashes[shift:shift + count]
+    starts = np.flatnonzero(doc_ids[:count] == doc_ids[order - 1:order - 1 + count])
+    return combined[starts], starts
 
-    plt.figure(figsize=(8, 8))
-    plt.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=140)
-    plt.title('Distribution of News Categories in AG News Dataset')
-    plt.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle.
-    plt.savefig(
-        "visualization.png"
-    )
-    plt.close()
 
+class HashedNgramCounter:
+    """
+    Счётчики n-грамм по категориям с ограниченной памятью (feature hashing).
 
-def main():
+    Каждая n-грамма попадает в одну из buckets корзин по хэшу, поэтому память
+    равна len(orders) * buckets счётчиков на категорию независимо от размера
+    корпуса. Счётчик корзины - верхняя граница частоты любой n-граммы в ней;
+    точные частоты восстанавливает top_ngrams() вторым проходом только для
+    n-грамм из лучших корзин.
     """
-    Основная функция для выполнения анализа.
+
+    def __init__(self, orders: Tuple[int, ...] = (2, 3), buckets: int = DEFAULT_NGRAM_BUCKETS):
+        """
+        Инициализация пустых счётчиков.
+
+        Args:
+            orders (Tuple[int, ...]): Длины n-грамм.
+            buckets (int): Количество корзин на категорию и длину.
+
+        Raises:
+            ValueError: Если длина n-граммы меньше 2 или корзин нет.
+        """
+        if buckets < 1 or any(order < 2 for order in orders):
+            raise ValueError("Нужны n-граммы длины не меньше 2 и хотя бы одна корзина")
+        self.orders = tuple(orders)
+        self.buckets = buckets
+        self.counts: Dict[Tuple[str, int], "np.ndarray"] = {}
+
+    def bucket_counts(self, category_name: str, order: int) -> "np.ndarray":
+        """
+        Возвращает массив счётчиков корзин (создаёт нулевой при первом обращении).
+
+        Args:
+            category_name (str): Категория.
+            order (int): Длина n-граммы.
+
+        Returns:
+            np.ndarray: Счётчики корзин (int64).
+        """
+        key = (category_name, order)
+        if key not in self.counts:
+            import numpy as np
+            self.counts[key] = np.zeros(self.buckets, dtype=np.int64)
+        return self.counts[key]
+
+    def update_hashes(self, category_name: str, hashes: "np.ndarray",
+                      doc_ids: "np.ndarray") -> None:
+        """
+        Учитывает токены документов одной категории, заданные хэшами.
+
+        Args:
+            category_name (str): Категория.
+            hashes (np.ndarray): Хэши токенов подряд.
+            doc_ids (np.ndarray): Номер документа каждого токена.
+        """
+        import numpy as np
+        for order in self.orders:
+            values, _ = ngram_hashes(hashes, doc_ids, order)
+            if len(values):
+                # np.unique по порции дешевле, чем bincount на все корзины
+                buckets, counts = np.unique(values % np.uint64(self.buckets), return_counts=True)
+                self.bucket_counts(category_name, order)[buckets.astype(np.int64)] += counts
+
+    def update(self, category_name: str, word_lists: List[List[str]]) -> None:
+        """
+        Учитывает токенизированные документы одной категории.
+
+        Args:
+            category_name (str): Категория.
+            word_lists (List[List[str]]): Токены каждого документа.
+        """
+        hashes, doc_ids, _ = hash_word_lists(word_lists)
+        self.update_hashes(category_name, hashes, doc_ids)
+
+    def merge(self, other: "HashedNgramCounter") -> None:
+        """
+        Добавляет счётчики другого экземпляра с теми же параметрами.
+
+        Args:
+            other (HashedNgramCounter): Счётчики по следующей части датасета.
+
+        Raises:
+            ValueError: Если длины n-грамм или число корзин различаются.
+        """
+        if (self.orders, self.buckets) != (other.orders, other.buckets):
+            raise ValueError("Нельзя слить счётчики n-грамм с разными параметрами")
+        for (category_name, order), counts in other.counts.items():
+            self.bucket_counts(category_name, order)[:] += counts
+
+    def candidates(self, category_name: str, order: int,
+                   k: int) -> Tuple["np.ndarray", int]:
+        """
+        Выбирает корзины-кандидаты: k корзин с наибольшими счётчиками.
+
+        Корзины, равные k-му счётчику, тоже становятся кандидатами, поэтому
+        любая n-грамма вне кандидатов встречается строго реже k-й корзины.
+
+        Args:
+            category_name (str): Категория.
+            order (int): Длина n-граммы.
+            k (int): Количество корзин-кандидатов.
+
+        Returns:
+            Tuple[np.ndarray, int]: Булева маска корзин-кандидатов и наибольший
+            счётчик среди остальных корзин (верхняя граница частоты любой
+            n-граммы вне кандидатов).
+        """
+        import numpy as np
+        counts = self.bucket_counts(category_name, order)
+        k = min(k, self.buckets)
+        if not k:
+            return np.zeros(self.buckets, dtype=bool), int(counts.max(initial=0))
+        threshold = max(int(np.partition(counts, self.buckets - k)[self.buckets - k]), 1)
+        mask = counts >= threshold
+        return mask, int(counts[~mask].max(initial=0))
+
+
+class WordCountMatrix:
     """
-    print("Loading AG News dataset...")
-    dataset = load_ag_news_dataset()
-    print("Dataset loaded successfully.")
+    Точные частоты слов всех категорий в одной матрице.
 
-    print("Analyzing category distribution...")
-    category_dist = analyze_category_distribution(dataset)
-    print("Category distribution:", category_dist)
+    Общий словарь vocabulary (слово -> номер строки) хранит каждую строку
+    один раз, а частоты лежат в массиве counts формы (словарь, категории)
+    вместо отдельного Counter на категорию. first_seen хранит порядковый
+    номер первого появления слова в категории: топ при равных частотах
+    упорядочивается так же, как Counter.most_common().
+    """
 
-    print("Analyzing text lengths...")
-    length_stats = analyze_text_lengths_by_category(dataset)
-    print("Length statistics by category:", length_stats)
+    def __init__(self, num_categories: int = len(CATEGORY_LABELS)):
+        """
+        Инициализация пустой матрицы.
+
+        Args:
+            num_categories (int): Количество категорий (столбцов).
+        """
+        import numpy as np
+        self.vocabulary: Dict[str, int] = {}
+        self.counts = np.zeros((0, num_categories), dtype=np.int64)
+        self.first_seen = np.full((0, num_categories), -1, dtype=np.int64)
+        self.sequence = 0
+
+    @classmethod
+    def from_arrays(cls, terms: List[str], counts: "np.ndarray", first_seen: "np.ndarray",
+                    sequence: int) -> "WordCountMatrix":
+        """
+        Создаёт матрицу из готовых массивов (например, по корпусу токенов).
+
+        Args:
+            terms (List[str]): Слова по номерам строк.
+            counts (np.ndarray): Частоты формы (слова, категории).
+            first_seen (np.ndarray): Номера первого появления (-1 - слово не встречалось).
+            sequence (int): Номер, больший всех значений first_seen.
+
+        Returns:
+            WordCountMatrix: Матрица.
+        """
+        import numpy as np
+        matrix = cls(counts.shape[1])
+        matrix.vocabulary = {term: i for i, term in enumerate(terms)}
+        matrix.counts = np.ascontiguousarray(counts, dtype=np.int64)
+        matrix.first_seen = np.ascontiguousarray(first_seen, dtype=np.int64)
+        matrix.sequence = sequence
+        return matrix
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """Сохраняет только занятые строки (без запаса под рост словаря)."""
+        state = self.__dict__.copy()
+        size = len(self.vocabulary)
+        state["counts"], state["first_seen"] = self.counts[:size], self.first_seen[:size]
+        return state
+
+    def _reserve(self, size: int) -> None:
+        """Расширяет массивы минимум до size строк (с удвоением ёмкости)."""
+        import numpy as np
+        capacity = len(self.counts)
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity, 1024)
+        counts = np.zeros((capacity, self.counts.shape[1]), dtype=np.int64)
+        first_seen = np.full((capacity, self.counts.shape[1]), -1, dtype=np.int64)
+        counts[:len(self.counts)] = self.counts
+        first_seen[:len(self.first_seen)] = self.first_seen
+        self.counts, self.first_seen = counts, first_seen
+
+    def _ids(self, words: Iterable[str]) -> "np.ndarray":
+        """Возвращает номера строк слов, добавляя новые слова в словарь."""
+        import numpy as np
+        add = self.vocabulary.setdefault
+        vocabulary = self.vocabulary
+        ids = [add(word, len(vocabulary)) for word in words]
+        self._reserve(len(vocabulary))
+        return np.array(ids, dtype=np.int64)
 
-    print("Extracting top words...")
-    top_words = extract_top_words_by_category(dataset, top_n=15)
+    def update(self, category_code: int, words: Iterable[str]) -> None:
+        """
+        Учитывает слова одной категории.
+
+        Слова сначала считаются Counter-ом порции (на C), поэтому в словарь и
+        матрицу обращаются только уникальные слова порции.
+
+        Args:
+            category_code (int): Номер категории (столбец).
+            words (Iterable[str]): Слова.
+        """
+        import numpy as np
+        batch = Counter(words)
+        if not batch:
+            return
+        ids = self._ids(batch)
+        self.counts[ids, category_code] += np.fromiter(batch.values(), dtype=np.int64,
+                                                       count=len(batch))
+        fresh = self.first_seen[ids, category_code] < 0
+        self.first_seen[ids[fresh], category_code] = self.sequence + np.flatnonzero(fresh)
+        self.sequence += len(batch)
+
+    def merge(self, other: "WordCountMatrix") -> None:
+        """
+        Добавляет частоты другой матрицы.
+
+        Новые для категории слова получают номера после всех уже виденных,
+        в порядке их первого появления в other, как при Counter.update().
+
+        Args:
+            other (WordCountMatrix): Матрица по следующей части датасета.
+        """
+        size = len(other.vocabulary)
+        if not size:
+            return
+        ids = self._ids(other.vocabulary)
+        self.counts[ids] += other.counts[:size]
+        first_seen = self.first_seen[ids]
+        fresh = (first_seen < 0) & (other.first_seen[:size] >= 0)
+        first_seen[fresh] = self.sequence + other.first_seen[:size][fresh]
+        self.first_seen[ids] = first_seen
+        self.sequence += other.sequence
+
+    def most_common(self, category_code: int, n: Optional[int] = None,
+                    terms: Optional[List[str]] = None) -> List[Tuple[str, int]]:
+        """
+        Возвращает n самых частых слов категории.
+
+        Кандидаты выбираются через np.argpartition (O(V)); полная сортировка
+        нужна только им и словам с той же частотой, что у n-го.
+
+        Args:
+            category_code (int): Номер категории.
+            n (Optional[int]): Количество слов. По умолчанию все.
+            terms (Optional[List[str]]): Слова по номерам строк (list(vocabulary)),
+                чтобы не строить список заново для каждой категории.
+
+        Returns:
+            List[Tuple[str, int]]: Пары (слово, частота) по убыванию частоты.
+
+        Examples:
+            >>> matrix = WordCountMatrix(2)
+            >>> matrix.update(0, ["b", "a", "b", "c", "a"])
+            >>> matrix.most_common(0, 2)
+            [('b', 2), ('a', 2)]
+        """
+        import numpy as np
+        size = len(self.vocabulary)
+        column = self.counts[:size, category_code]
+        present = np.flatnonzero(column)
+        if n is not None and n < len(present):
+            values = column[present]
+            kth = values[np.argpartition(-values, n - 1)[n - 1]]
+            present = present[values >= kth]
+        order = np.lexsort((self.first_seen[present, category_code], -column[present]))[:n]
+        ids = present[order].tolist()
+        terms = terms if terms is not None else list(self.vocabulary)
+        return [(terms[i], count) for i, count in zip(ids, column[ids].tolist())]
+
+    def category_counts(self, category_code: int) -> Dict[str, int]:
+        """
+        Возвращает частоты слов категории в порядке их первого появления.
+
+        Args:
+            category_code (int): Номер категории.
+
+        Returns:
+            Dict[str, int]: Слово -> частота (только встретившиеся слова).
+        """
+        import numpy as np
+        size = len(self.vocabulary)
+        present = np.flatnonzero(self.counts[:size, category_code])
+        ids = present[np.argsort(self.first_seen[present, category_code], kind="stable")]
+        terms = list(self.vocabulary)
+        return {terms[i]: count
+                for i, count in zip(ids.tolist(), self.counts[ids, category_code].tolist())}
+
+
+class AnalysisState:
+    """
+    Накопленное состояние анализа датасета.
+
+    Собирает распределение по категориям, длины текстов и счётчики слов
+    за один проход по датасету, чтобы не перечитывать записи для каждого
+    вида анализа.
+    """
+
+    def __init__(self, count_lengths: bool = True, count_words: bool = True,
+                 sketch_capacity: int = None, ngram_orders: Tuple[int, ...] = (),
+                 ngram_buckets: int = DEFAULT_NGRAM_BUCKETS):
+        """
+        Инициализация пустого состояния.
+
+        Args:
+            count_lengths (bool): Собирать ли длины текстов.
+            count_words (bool): Собирать ли счётчики слов.
+            sketch_capacity (int): Если задано, слова считаются приближённо
+                (SpaceSavingCounter) с не более чем sketch_capacity словами на категорию;
+                иначе точно, в общей матрице WordCountMatrix.
+            ngram_orders (Tuple[int, ...]): Длины n-грамм для хэш-счётчиков
+                (HashedNgramCounter); пустой кортеж - n-граммы не считаются.
+            ngram_buckets (int): Количество корзин хэш-счётчика n-грамм.
+        """
+        self.count_lengths = count_lengths
+        self.count_words = count_words
+        self.sketch_capacity = sketch_capacity
+        self.ngrams = HashedNgramCounter(ngram_orders, ngram_buckets) if ngram_orders else None
+        self.category_counts = Counter()
+        self.unknown_labels = 0
+        self.lengths_by_category = defaultdict(LengthAccumulator)
+        # Приближённый режим: SpaceSavingCounter на категорию; точный - одна матрица
+        self.words_by_category = (defaultdict(partial(SpaceSavingCounter, sketch_capacity))
+                                  if sketch_capacity else None)
+        self.word_counts = None if sketch_capacity else WordCountMatrix(len(CATEGORY_LABELS))
+
+    def update(self, item: Dict) -> None:
+        """
+        Учитывает одну запись датасета.
+
+        Args:
+            item (Dict): Запись с ключами 'text' и 'label'.
+        """
+        self.update_columns([item.get('label')], [item.get('text', '')])
+
+    def update_batch(self, items: List[Dict]) -> None:
+        """
+        Учитывает порцию записей датасета.
+
+        Args:
+            items (List[Dict]): Записи с ключами 'text' и 'label'.
+        """
+        self.update_columns([item.get('label') for item in items],
+                            [item.get('text', '') for item in items])
+
+    def update_columns(self, labels: List, texts: List[str]) -> None:
+        """
+        Учитывает порцию датасета, заданную столбцами.
+
+        Args:
+            labels (List): Метки категорий или их коды (encode_labels()).
+            texts (List[str]): Тексты (той же длины, что и labels).
+        """
+        codes = encode_labels(labels)
+        distribution, unknown = label_distribution(codes)
+        self.category_counts.update({name: count for name, count in distribution.items() if count})
+        self.unknown_labels += unknown
+        if not (self.count_lengths or self.count_words or self.ngrams):
+            return
+        names = list(CATEGORY_LABELS.values())
+        known = (codes < len(names)).nonzero()[0].tolist()
+        categories = [names[code] for code in codes[known].tolist()]
+        valid_texts = [texts[i] for i in known]
+        lengths_in_batch = defaultdict(list)
+        words_in_batch = defaultdict(list)
+        if self.count_lengths:
+            for category_name, text in zip(categories, valid_texts):
+                lengths_in_batch[category_name].append(len(text.split()))
+        if self.count_words or self.ngrams:
+            for category_name, words in zip(categories, tokenize_batch(valid_texts)):
+                words_in_batch[category_name].append(words)
+        # Одно обновление накопителей на категорию за порцию; n-граммы считаются
+        # по тем же токенам, что и слова
+        for category_name, lengths in lengths_in_batch.items():
+            self.lengths_by_category[category_name].add_many(lengths)
+        for category_name, word_lists in words_in_batch.items():
+            if self.count_words and self.word_counts is not None:
+                self.word_counts.update(LABEL_TO_CATEGORY[category_name],
+                                        chain.from_iterable(word_lists))
+            elif self.count_words:
+                self.words_by_category[category_name].update(chain.from_iterable(word_lists))
+            if self.ngrams:
+                self.ngrams.update(category_name, word_lists)
+
+    def merge(self, other: "AnalysisState") -> None:
+        """
+        Добавляет к состоянию результаты другого состояния.
+
+        Новые слова добавляются в порядке их первого появления в other,
+        поэтому слияние шардов по порядку сохраняет порядок первого
+        появления слов, как при последовательном проходе.
+
+        Args:
+            other (AnalysisState): Состояние, собранное по следующей части датасета.
+        """
+        self.category_counts.update(other.category_counts)
+        self.unknown_labels += other.unknown_labels
+        for category_name, lengths in other.lengths_by_category.items():
+            self.lengths_by_category[category_name].merge(lengths)
+        if other.word_counts is not None:
+            self.word_counts.merge(other.word_counts)
+        else:
+            for category_name, counter in other.words_by_category.items():
+                self.words_by_category[category_name].merge(counter)
+        if other.ngrams:
+            if self.ngrams is None:
+                self.ngrams = HashedNgramCounter(other.ngrams.orders, other.ngrams.buckets)
+            self.ngrams.merge(other.ngrams)
+
+    def category_distribution(self) -> Dict[str, int]:
+        """
+        Возвращает распределение новостей по категориям.
+
+        Returns:
+            Dict[str, int]: Количество новостей по каждой категории.
+        """
+        # Гарантируем, что все категории присутствуют в результате
+        return {name: self.category_counts.get(name, 0) for name in CATEGORY_LABELS.values()}
+
+    def length_statistics(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Возвращает статистику длины текстов по категориям.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Средняя, медиана, std, min, max, p90, p99
+            и гистограмма длин по категориям.
+        """
+        # Проходим по всем возможным категориям, чтобы гарантировать их наличие
+        return {name: self.lengths_by_category[name].summary()
+                for name in CATEGORY_LABELS.values()}
+
+    def top_words(self, top_n: int = 15) -> Dict[str, List[Tuple[str, int]]]:
+        """
+        Возвращает топ-N слов для каждой категории.
+
+        Args:
+            top_n (int): Количество топ слов. По умолчанию 15.
+
+        Returns:
+            Dict[str, List[Tuple[str, int]]]: Топ слов по каждой категории.
+        """
+        if self.word_counts is None:
+            return {name: self.words_by_category[name].most_common(top_n)
+                    for name in CATEGORY_LABELS.values()}
+        terms = list(self.word_counts.vocabulary)
+        return {name: self.word_counts.most_common(code, top_n, terms)
+                for code, name in CATEGORY_LABELS.items()}
+
+    def category_word_counts(self, category_name: str) -> Dict[str, int]:
+        """
+        Возвращает частоты (или оценки частот) слов категории.
+
+        Args:
+            category_name (str): Категория.
+
+        Returns:
+            Dict[str, int]: Слово -> частота в порядке первого появления.
+        """
+        if self.word_counts is None:
+            return dict(self.words_by_category[category_name].counts)
+        return self.word_counts.category_counts(LABEL_TO_CATEGORY[category_name])
+
+    def top_words_error_bounds(self, top_n: int = 15) -> Dict[str, Dict[str, Any]]:
+        """
+        Возвращает границы погрешности топ-N слов в приближённом режиме.
+
+        Args:
+            top_n (int): Количество топ слов. По умолчанию 15.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Результат SpaceSavingCounter.error_bounds()
+            по каждой категории; пустой словарь в точном режиме.
+        """
+        if not self.sketch_capacity:
+            return {}
+        return {name: self.words_by_category[name].error_bounds(top_n)
+                for name in CATEGORY_LABELS.values()}
+
+
+class TokenCorpus:
+    """
+    Корпус токенов, отображённый в память.
+
+    Хранится в каталоге в виде словаря vocab.json и бинарных массивов:
+    tokens.u32 (идентификаторы токенов подряд), offsets.u32 (начало каждого
+    документа в tokens, num_docs + 1 значений), labels.u8 (номер категории
+    или UNKNOWN_LABEL_CODE) и lengths.u32 (число слов исходного текста).
+    Массивы открываются через np.memmap, поэтому несколько процессов
+    разделяют одну копию страниц в кэше ОС.
+    """
+
+    def __init__(self, directory: str):
+        """
+        Открывает корпус.
+
+        Args:
+            directory (str): Каталог, созданный build_token_corpus().
+
+        Raises:
+            ValueError: Если корпус собран другой версией формата или токенизатора.
+        """
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if (self.meta.get("format") != CORPUS_FORMAT_VERSION
+                or self.meta.get("tokenizer_version") != TOKENIZER_VERSION):
+            raise ValueError(f"Корпус '{directory}' собран несовместимой версией. "
+                             "Пересоберите его через build_token_corpus().")
+        with open(os.path.join(directory, "vocab.json"), "r", encoding="utf-8") as f:
+            self.vocab = json.load(f)
+        import numpy as np
+        num_docs, num_tokens = self.meta["num_docs"], self.meta["num_tokens"]
+        self.tokens = self._open_array("tokens.u32", np.uint32, num_tokens)
+        self.offsets = self._open_array("offsets.u32", np.uint32, num_docs + 1)
+        self.labels = self._open_array("labels.u8", np.uint8, num_docs)
+        self.lengths = self._open_array("lengths.u32", np.uint32, num_docs)
+
+    def _open_array(self, name: str, dtype, length: int) -> "np.ndarray":
+        """Отображает массив в память (пустой массив np.memmap открыть не может)."""
+        import numpy as np
+        if not length:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(os.path.join(self.directory, name), dtype=dtype, mode="r",
+                         shape=(length,))
+
+    def __len__(self) -> int:
+        """Возвращает количество документов."""
+        return self.meta["num_docs"]
+
+
+def build_token_corpus(dataset, directory: str,
+                       batch_size: int = DEFAULT_BATCH_SIZE) -> TokenCorpus:
+    """
+    Токенизирует датасет один раз и сохраняет его как TokenCorpus.
+
+    Идентификаторы токенов назначаются в порядке первого появления.
+
+    Args:
+        dataset: Загруженный датасет.
+        directory (str): Каталог корпуса (создаётся при необходимости).
+        batch_size (int): Количество записей, обрабатываемых за один шаг.
+
+    Returns:
+        TokenCorpus: Открытый корпус.
+
+    Raises:
+        ValueError: Если число токенов не помещается в uint32.
+    """
+    import numpy as np
+    os.makedirs(directory, exist_ok=True)
+    vocab = {}
+    num_docs = num_tokens = 0
+    digest = hashlib.blake2b(digest_size=20)
+    paths = {name: os.path.join(directory, name)
+             for name in ("tokens.u32", "offsets.u32", "labels.u8", "lengths.u32")}
+    files = {name: open(path, "wb") for name, path in paths.items()}
+
+    def write(name: str, values: List[int], dtype) -> None:
+        data = np.asarray(values, dtype=dtype).tobytes()
+        files[name].write(data)
+        digest.update(data)
+
+    try:
+        write("offsets.u32", [0], np.uint32)
+        for labels, texts in iter_column_batches(dataset, batch_size):
+            texts = [text or "" for text in texts]
+            token_lists = tokenize_batch(texts)
+            ids = [vocab.setdefault(token, len(vocab))
+                   for tokens in token_lists for token in tokens]
+            ends = np.cumsum([len(tokens) for tokens in token_lists], dtype=np.int64) + num_tokens
+            num_tokens += len(ids)
+            if num_tokens > np.iinfo(np.uint32).max:
+                raise ValueError("Корпус слишком велик для смещений uint32")
+            write("tokens.u32", ids, np.uint32)
+            write("offsets.u32", ends, np.uint32)
+            # Коды меток - те же, что в анализе (encode_labels)
+            write("labels.u8", encode_labels(labels), np.uint8)
+            write("lengths.u32", [len(text.split()) for text in texts], np.uint32)
+            num_docs += len(texts)
+    finally:
+        for f in files.values():
+            f.close()
+
+    # Идентификаторы токенов и коды меток имеют смысл только вместе
+    # со словарём и таблицей категорий, поэтому они входят в отпечаток
+    digest.update(json.dumps([list(vocab), list(CATEGORY_LABELS.items())],
+                             ensure_ascii=False).encode("utf-8"))
+    with open(os.path.join(directory, "vocab.json"), "w", encoding="utf-8") as f:
+        json.dump(list(vocab), f, ensure_ascii=False)
+    meta = {"format": CORPUS_FORMAT_VERSION, "tokenizer_version": TOKENIZER_VERSION,
+            "num_docs": num_docs, "num_tokens": num_tokens, "vocab_size": len(vocab),
+            "categories": list(CATEGORY_LABELS.values()), "fingerprint": digest.hexdigest()}
+    with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=4)
+    return TokenCorpus(directory)
+
+
+def state_from_token_corpus(corpus: TokenCorpus, count_lengths: bool = True,
+                            count_words: bool = True,
+                            sketch_capacity: int = None, ngram_orders: Tuple[int, ...] = (),
+                            ngram_buckets: int = DEFAULT_NGRAM_BUCKETS) -> AnalysisState:
+    """
+    Собирает состояние анализа по корпусу токенов средствами NumPy.
+
+    Распределение и гистограммы длин считаются через np.bincount по
+    меткам, частоты слов - одним np.bincount по парам (категория, токен).
+    Порядок первого появления слова в категории восстанавливается через
+    np.minimum.at, поэтому результат совпадает с обходом исходного датасета.
+
+    Args:
+        corpus (TokenCorpus): Корпус токенов.
+        count_lengths (bool): Собирать ли длины текстов.
+        count_words (bool): Собирать ли счётчики слов.
+        sketch_capacity (int): Ёмкость приближённого счётчика слов (None - точный подсчёт).
+        ngram_orders (Tuple[int, ...]): Длины n-грамм для хэш-счётчиков.
+        ngram_buckets (int): Количество корзин хэш-счётчика n-грамм.
+
+    Returns:
+        AnalysisState: Накопленное состояние.
+    """
+    import numpy as np
+    state = AnalysisState(count_lengths=count_lengths, count_words=count_words,
+                          sketch_capacity=sketch_capacity, ngram_orders=ngram_orders,
+                          ngram_buckets=ngram_buckets)
+    names = list(CATEGORY_LABELS.values())
+    num_categories = len(names)
+    labels = np.asarray(corpus.labels)
+    known = labels < num_categories
+    distribution, state.unknown_labels = label_distribution(labels)
+    state.category_counts.update({name: count for name, count in distribution.items() if count})
+
+    if count_lengths and len(corpus):
+        lengths = np.asarray(corpus.lengths, dtype=np.int64)[known]
+        width = int(lengths.max(initial=0)) + 1
+        histograms = np.bincount(labels[known].astype(np.int64) * width + lengths,
+                                 minlength=num_categories * width).reshape(num_categories, width)
+        for code, histogram in enumerate(histograms):
+            state.lengths_by_category[names[code]] = LengthAccumulator.from_histogram(
+                dict(enumerate(histogram.tolist())))
+
+    if count_words and corpus.meta["num_tokens"]:
+        vocab_size = len(corpus.vocab)
+        token_labels = np.repeat(labels, np.diff(np.asarray(corpus.offsets, dtype=np.int64)))
+        mask = token_labels < num_categories
+        keys = token_labels[mask].astype(np.int64) * vocab_size + np.asarray(corpus.tokens)[mask]
+        counts = np.bincount(keys, minlength=num_categories * vocab_size)
+        first_seen = np.full(num_categories * vocab_size, len(keys), dtype=np.int64)
+        np.minimum.at(first_seen, keys, np.arange(len(keys)))
+        if not sketch_capacity:
+            # Словарь корпуса становится словарём матрицы без пересчёта
+            counts = counts.reshape(num_categories, vocab_size).T
+            first_seen = first_seen.reshape(num_categories, vocab_size).T
+            state.word_counts = WordCountMatrix.from_arrays(
+                corpus.vocab, counts, np.where(counts > 0, first_seen, -1), len(keys))
+        for code, name in enumerate(names if sketch_capacity else ()):
+            category_counts = counts[code * vocab_size:(code + 1) * vocab_size]
+            category_first = first_seen[code * vocab_size:(code + 1) * vocab_size]
+            present = np.flatnonzero(category_counts)
+            ordered = present[np.argsort(category_first[present], kind="stable")]
+            counter = state.words_by_category[name]
+            for word, count in zip([corpus.vocab[i] for i in ordered.tolist()],
+                                   category_counts[ordered].tolist()):
+                counter._add(word, count)
+
+    if state.ngrams and corpus.meta["num_tokens"]:
+        token_labels, doc_ids, hashes = corpus_token_hashes(corpus)
+        for code, name in enumerate(names):
+            in_category = token_labels == code
+            state.ngrams.update_hashes(name, hashes[in_category], doc_ids[in_category])
+    return state
+
+
+def corpus_token_hashes(corpus: TokenCorpus) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+    """
+    Возвращает метку, номер документа и хэш (token_hash) каждого токена корпуса.
+
+    Хэши считаются один раз на слово словаря, а не на каждый токен.
+
+    Args:
+        corpus (TokenCorpus): Корпус токенов.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: Метки, номера документов и хэши токенов.
+    """
+    import numpy as np
+    doc_lengths = np.diff(np.asarray(corpus.offsets, dtype=np.int64))
+    token_labels = np.repeat(np.asarray(corpus.labels), doc_lengths)
+    doc_ids = np.repeat(np.arange(len(corpus)), doc_lengths)
+    vocab_hashes = np.fromiter(map(token_hash, corpus.vocab), dtype=np.uint64,
+                               count=len(corpus.vocab))
+    return token_labels, doc_ids, vocab_hashes[np.asarray(corpus.tokens)]
+
+
+def _collect_shard_state(shard: Tuple[List, List], count_lengths: bool, count_words: bool,
+                         batch_size: int, sketch_capacity: int = None,
+                         ngram_orders: Tuple[int, ...] = (),
+                         ngram_buckets: int = DEFAULT_NGRAM_BUCKETS) -> AnalysisState:
+    """
+    Собирает состояние анализа по одному шарду (выполняется в рабочем процессе).
+
+    Args:
+        shard (Tuple[List, List]): Столбцы (метки, тексты) шарда.
+        count_lengths (bool): Собирать ли длины текстов.
+        count_words (bool): Собирать ли счётчики слов.
+        batch_size (int): Количество записей, обрабатываемых за один шаг.
+        sketch_capacity (int): Ёмкость приближённого счётчика слов (None - точный подсчёт).
+        ngram_orders (Tuple[int, ...]): Длины n-грамм для хэш-счётчиков.
+        ngram_buckets (int): Количество корзин хэш-счётчика n-грамм.
+
+    Returns:
+        AnalysisState: Состояние шарда.
+    """
+    state = AnalysisState(count_lengths=count_lengths, count_words=count_words,
+                          sketch_capacity=sketch_capacity, ngram_orders=ngram_orders,
+                          ngram_buckets=ngram_buckets)
+    labels, texts = shard
+    for start in range(0, len(labels), batch_size):
+        state.update_columns(labels[start:start + batch_size], texts[start:start + batch_size])
+    return state
+
+
+def map_shards_in_order(func: Callable, shards: Iterable, workers: int) -> Iterator:
+    """
+    Применяет функцию к шардам в пуле процессов и возвращает результаты по порядку.
+
+    В обработке одновременно находится не больше 2 * workers шардов,
+    поэтому датасет не материализуется целиком.
+
+    Args:
+        func (Callable): Функция уровня модуля (должна сериализоваться pickle).
+        shards (Iterable): Шарды для обработки.
+        workers (int): Количество рабочих процессов.
+
+    Returns:
+        Iterator: Результаты в порядке следования шардов.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for shard in shards:
+            pending.append(executor.submit(func, shard))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _with_label_codes(batches: Iterator[Tuple[List, List]],
+                      label_codes: Optional["np.ndarray"]) -> Iterator[Tuple[Any, List]]:
+    """
+    Заменяет метки порций готовыми кодами категорий, если они заданы.
+
+    Args:
+        batches (Iterator[Tuple[List, List]]): Порции (метки, тексты).
+        label_codes (Optional[np.ndarray]): Коды категорий всего датасета или None.
+
+    Returns:
+        Iterator[Tuple[Any, List]]: Порции (метки или их коды, тексты).
+    """
+    if label_codes is None:
+        yield from batches
+        return
+    offset = 0
+    for labels, texts in batches:
+        yield label_codes[offset:offset + len(texts)], texts
+        offset += len(texts)
+
+
+def collect_analysis_state(dataset, count_lengths: bool = True,
+                           count_words: bool = True,
+                           batch_size: int = DEFAULT_BATCH_SIZE,
+                           workers: int = 1,
+                           shard_size: int = DEFAULT_SHARD_SIZE,
+                           sketch_capacity: int = None,
+                           ngram_orders: Tuple[int, ...] = (),
+                           ngram_buckets: int = DEFAULT_NGRAM_BUCKETS,
+                           label_codes: Optional["np.ndarray"] = None) -> AnalysisState:
+    """
+    Проходит по датасету один раз и собирает состояние анализа.
+
+    При workers > 1 датасет делится на шарды по shard_size записей, которые
+    обрабатываются в пуле процессов и сливаются по порядку (map-reduce).
+    Границы шардов не зависят от числа процессов, а слияние по порядку
+    сохраняет порядок первого появления слов, поэтому результат (включая
+    порядок слов с равной частотой) совпадает с последовательным режимом.
+
+    Args:
+        dataset: Загруженный датасет: TokenCorpus (обрабатывается через NumPy),
+            datasets.Dataset (читается по столбцам) или итерируемый набор словарей
+            с 'text' и 'label'.
+        count_lengths (bool): Собирать ли длины текстов.
+        count_words (bool): Собирать ли счётчики слов.
+        batch_size (int): Количество записей, обрабатываемых за один шаг.
+        workers (int): Количество процессов. None - по числу ядер.
+        shard_size (int): Количество записей в одном шарде.
+        sketch_capacity (int): Если задано, слова считаются приближённо с фиксированной
+            памятью (SpaceSavingCounter на sketch_capacity слов в каждой категории).
+        ngram_orders (Tuple[int, ...]): Длины n-грамм, которые считаются в том же
+            проходе хэш-счётчиками (см. top_ngrams()).
+        ngram_buckets (int): Количество корзин хэш-счётчика n-грамм.
+        label_codes (Optional[np.ndarray]): Коды категорий из dataset_label_codes();
+            если заданы, метки датасета заново не разбираются.
+
+    Returns:
+        AnalysisState: Накопленное состояние.
+
+    Raises:
+        ValueError: Если workers меньше 1.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError(f"workers должен быть положительным, получено {workers}")
+    if isinstance(dataset, TokenCorpus):
+        # Корпус токенов обрабатывается векторно, пул процессов не нужен
+        return state_from_token_corpus(dataset, count_lengths=count_lengths,
+                                       count_words=count_words, sketch_capacity=sketch_capacity,
+                                       ngram_orders=ngram_orders, ngram_buckets=ngram_buckets)
+    state = AnalysisState(count_lengths=count_lengths, count_words=count_words,
+                          sketch_capacity=sketch_capacity, ngram_orders=ngram_orders,
+                          ngram_buckets=ngram_buckets)
+    if workers == 1:
+        for labels, texts in _with_label_codes(iter_column_batches(dataset, batch_size),
+                                               label_codes):
+            state.update_columns(labels, texts)
+        return state
+    count_shard = partial(_collect_shard_state, count_lengths=count_lengths,
+                          count_words=count_words, batch_size=batch_size,
+                          sketch_capacity=sketch_capacity, ngram_orders=ngram_orders,
+                          ngram_buckets=ngram_buckets)
+    shards = _with_label_codes(iter_column_batches(dataset, shard_size), label_codes)
+    for shard_state in map_shards_in_order(count_shard, shards, workers):
+        state.merge(shard_state)
+    return state
+
+
+def top_ngrams(dataset, state: AnalysisState, top_n: int = 15,
+               batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, Dict[str, List[Tuple[str, int]]]]:
+    """
+    Возвращает топ-N n-грамм каждой категории с точными частотами.
+
+    Первый проход (collect_analysis_state с ngram_orders) заполнил хэш-счётчики.
+    Здесь второй проход по датасету считает точно только n-граммы из
+    NGRAM_CANDIDATE_FACTOR * top_n лучших корзин, поэтому точный Counter
+    содержит лишь кандидатов, а не все n-граммы корпуса. Если частота
+    N-й n-граммы не превышает счётчик лучшей корзины вне кандидатов, топ может
+    быть неполным - об этом печатается предупреждение.
+
+    Args:
+        dataset: Тот же датасет, по которому собрано state (нужен повторный обход).
+        state (AnalysisState): Состояние с хэш-счётчиками n-грамм.
+        top_n (int): Количество n-грамм на категорию. По умолчанию 15.
+        batch_size (int): Количество записей, обрабатываемых за один шаг.
+
+    Returns:
+        Dict[str, Dict[str, List[Tuple[str, int]]]]: Для каждой длины ('bigrams',
+        'trigrams') - пары (n-грамма, частота) по каждой категории.
+
+    Raises:
+        ValueError: Если состояние собрано без n-грамм.
+    """
+    import numpy as np
+
+    ngrams = state.ngrams
+    if ngrams is None:
+        raise ValueError("Состояние собрано без n-грамм (ngram_orders пуст)")
+    names = list(CATEGORY_LABELS.values())
+    bucket_count = np.uint64(ngrams.buckets)
+    candidates = {(name, order): ngrams.candidates(name, order, NGRAM_CANDIDATE_FACTOR * top_n)
+                  for name in names for order in ngrams.orders}
+    exact = defaultdict(Counter)
+
+    def count_candidates(name: str, hashes: "np.ndarray", doc_ids: "np.ndarray",
+                         ngram_text: Callable[[int, int], str]) -> None:
+        for order in ngrams.orders:
+            values, starts = ngram_hashes(hashes, doc_ids, order)
+            mask, _ = candidates[(name, order)]
+            hits = starts[mask[(values % bucket_count).astype(np.int64)]]
+            exact[(name, order)].update(ngram_text(start, order) for start in hits.tolist())
+
+    if isinstance(dataset, TokenCorpus):
+        token_labels, doc_ids, hashes = corpus_token_hashes(dataset)
+        tokens = np.asarray(dataset.tokens)
+        for code, name in enumerate(names):
+            in_category = token_labels == code
+            category_tokens = tokens[in_category]
+            count_candidates(name, hashes[in_category], doc_ids[in_category],
+                             lambda start, order: " ".join(
+                                 dataset.vocab[token]
+                                 for token in category_tokens[start:start + order].tolist()))
+    else:
+        for labels, texts in iter_column_batches(dataset, batch_size):
+            words_in_batch = defaultdict(list)
+            for label, words in zip(labels, tokenize_batch(list(texts))):
+                if label in CATEGORY_LABELS:
+                    words_in_batch[CATEGORY_LABELS[label]].append(words)
+            for name, word_lists in words_in_batch.items():
+                hashes, doc_ids, words = hash_word_lists(word_lists)
+                count_candidates(name, hashes, doc_ids,
+                                 lambda start, order: " ".join(words[start:start + order]))
+
+    result = {}
+    for order in ngrams.orders:
+        by_category = {}
+        for name in names:
+            top = exact[(name, order)].most_common(top_n)
+            _, outside_max = candidates[(name, order)]
+            if outside_max and (len(top) < top_n or top[-1][1] <= outside_max):
+                print(f"DEBUG: Топ {order}-грамм категории '{name}' может быть неполным: "
+                      f"увеличьте число корзин ({ngrams.buckets}).")
+            by_category[name] = top
+        result[NGRAM_NAMES.get(order, f"{order}-grams")] = by_category
+    return result
+
+
+def analyze_dataset(dataset, top_n: int = 15, workers: int = 1,
+                    sketch_capacity: int = None) -> Dict[str, Any]:
+    """
+    Выполняет все виды анализа за один проход по датасету.
+
+    Args:
+        dataset: Загруженный датасет.
+        top_n (int): Количество топ слов для каждой категории. По умолчанию 15.
+        workers (int): Количество процессов для подсчёта. По умолчанию 1.
+        sketch_capacity (int): Ёмкость приближённого счётчика слов. Если задано,
+            в результат добавляются границы погрешности топ слов.
+
+    Returns:
+        Dict[str, Any]: Распределение по категориям, статистика длин и топ слов
+        (и top_words_error_bounds в приближённом режиме).
+
+    Examples:
+        >>> result = analyze_dataset([{"label": 1, "text": "Goal goal!"}], top_n=1)
+        >>> result["top_words_per_category"]["Sports"]
+        [('goal', 2)]
+    """
+    state = collect_analysis_state(dataset, workers=workers, sketch_capacity=sketch_capacity)
+    return summarize_state(state, top_n)
+
+
+def summarize_state(state: AnalysisState, top_n: int = 15) -> Dict[str, Any]:
+    """
+    Строит итоговые результаты анализа по накопленному состоянию.
+
+    Args:
+        state (AnalysisState): Накопленное состояние.
+        top_n (int): Количество топ слов для каждой категории. По умолчанию 15.
+
+    Returns:
+        Dict[str, Any]: Распределение по категориям, число записей с неизвестной
+        меткой, статистика длин и топ слов (и top_words_error_bounds в приближённом режиме).
+    """
+    analysis = {
+        "category_distribution": state.category_distribution(),
+        "unknown_label_count": state.unknown_labels,
+        "text_length_statistics": state.length_statistics(),
+        "top_words_per_category": state.top_words(top_n)
+    }
+    if state.sketch_capacity:
+        analysis["top_words_error_bounds"] = state.top_words_error_bounds(top_n)
+    return analysis
+
+
+def dataset_fingerprint(dataset) -> Optional[str]:
+    """
+    Вычисляет отпечаток содержимого датасета для ключа кэша.
+
+    Для datasets.Dataset используется его собственный отпечаток, для
+    локального файла - хэш BLAKE2b содержимого файла, для списка записей -
+    хэш меток и текстов. Одноразовые итераторы не поддерживаются.
+
+    Args:
+        dataset: Загруженный датасет.
+
+    Returns:
+        Optional[str]: Отпечаток или None, если его нельзя вычислить без потери данных.
+    """
+    if isinstance(dataset, TokenCorpus):
+        return f"corpus:{dataset.meta['fingerprint']}"
+    hf_fingerprint = getattr(dataset, "_fingerprint", None)
+    if hf_fingerprint:
+        return f"hf:{hf_fingerprint}"
+    digest = hashlib.blake2b(digest_size=20)
+    if isinstance(dataset, LocalDatasetStream):
+        with open(dataset.path, "rb") as f:
+            for block in iter(partial(f.read, 1 << 20), b""):
+                digest.update(block)
+        return f"file:{digest.hexdigest()}"
+    if isinstance(dataset, list) or is_columnar_dataset(dataset):
+        for labels, texts in iter_column_batches(dataset):
+            digest.update(repr(list(labels)).encode("utf-8"))
+            digest.update(_DOC_SEPARATOR.join(map(str, texts)).encode("utf-8", "surrogatepass"))
+        return f"rows:{digest.hexdigest()}"
+    return None
+
+
+def cache_key(fingerprint: str, params: Dict[str, Any]) -> str:
+    """
+    Строит ключ кэша по отпечатку датасета и параметрам анализа.
+
+    Args:
+        fingerprint (str): Отпечаток датасета.
+        params (Dict[str, Any]): Параметры, влияющие на результат (top_n и т.п.).
+
+    Returns:
+        str: Шестнадцатеричный ключ.
+    """
+    payload = {"fingerprint": fingerprint, "params": params,
+               "tokenizer_version": TOKENIZER_VERSION, "cache_format": CACHE_FORMAT_VERSION}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Кэш результатов анализа на диске с вытеснением по размеру (LRU).
+
+    Каждая запись - отдельный pickle-файл <ключ>.pkl. Время изменения
+    файла обновляется при чтении и служит временем последнего доступа.
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+        """
+        Инициализация кэша.
+
+        Args:
+            directory (str): Каталог кэша (создаётся при первой записи).
+            max_bytes (int): Предельный суммарный размер записей.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _path(self, key: str) -> str:
+        """Возвращает путь к файлу записи."""
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Читает запись из кэша.
+
+        Args:
+            key (str): Ключ записи.
+
+        Returns:
+            Optional[Any]: Сохранённое значение или None при промахе.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"DEBUG: Повреждённая запись кэша '{path}': {e}. Удаляю.")
+            os.remove(path)
+            return None
+        os.utime(path)
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        """
+        Сохраняет запись и вытесняет давно не использованные записи сверх лимита.
+
+        Args:
+            key (str): Ключ записи.
+            value (Any): Значение (должно сериализоваться pickle).
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        # Пишем во временный файл и атомарно переименовываем
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self) -> None:
+        """Удаляет самые давно использованные записи, пока размер кэша превышает лимит."""
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(".pkl"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+
+def run_cached_analysis(dataset, cache: Optional[ResultCache], top_n: int = 15,
+                        workers: int = 1, sketch_capacity: int = None,
+                        ngram_orders: Tuple[int, ...] = (),
+                        ngram_buckets: int = DEFAULT_NGRAM_BUCKETS
+                        ) -> Tuple[AnalysisState, Dict[str, Any]]:
+    """
+    Выполняет анализ, используя кэш результатов, если он задан.
+
+    Ключ кэша строится по отпечатку датасета, top_n, sketch_capacity,
+    параметрам n-грамм и версии токенизатора. В кэше хранятся и накопленное
+    состояние, и итоговые результаты.
+
+    Args:
+        dataset: Загруженный датасет.
+        cache (Optional[ResultCache]): Кэш; None - всегда пересчитывать.
+        top_n (int): Количество топ слов для каждой категории.
+        workers (int): Количество процессов для подсчёта (на результат не влияет).
+        sketch_capacity (int): Ёмкость приближённого счётчика слов.
+        ngram_orders (Tuple[int, ...]): Длины n-грамм для хэш-счётчиков.
+        ngram_buckets (int): Количество корзин хэш-счётчика n-грамм.
+
+    Returns:
+        Tuple[AnalysisState, Dict[str, Any]]: Накопленное состояние и результаты
+        анализа, как у analyze_dataset().
+    """
+    fingerprint = dataset_fingerprint(dataset) if cache is not None else None
+    key = None
+    if fingerprint is not None:
+        key = cache_key(fingerprint, {"top_n": top_n, "sketch_capacity": sketch_capacity,
+                                      "ngram_orders": list(ngram_orders),
+                                      "ngram_buckets": ngram_buckets if ngram_orders else None})
+        cached = cache.get(key)
+        if cached is not None:
+            print(f"DEBUG: Результаты найдены в кэше ({key[:12]}).")
+            return cached["state"], cached["analysis"]
+    state = collect_analysis_state(dataset, workers=workers, sketch_capacity=sketch_capacity,
+                                   ngram_orders=ngram_orders, ngram_buckets=ngram_buckets)
+    analysis = summarize_state(state, top_n)
+    if key is not None:
+        cache.put(key, {"state": state, "analysis": analysis})
+    return state, analysis
+
+
+def save_state(state: AnalysisState, path: str = STATE_FILE,
+               appended_records: int = 0) -> None:
+    """
+    Сохраняет сливаемое состояние анализа на диск.
+
+    Состояние содержит количество записей, гистограммы длин и счётчики
+    слов по категориям, поэтому к нему можно добавлять новые записи,
+    не пересчитывая весь корпус.
+
+    Args:
+        state (AnalysisState): Накопленное состояние.
+        path (str): Путь к файлу состояния.
+        appended_records (int): Сколько записей добавлено к состоянию через --append.
+    """
+    payload = {"cache_format": CACHE_FORMAT_VERSION, "tokenizer_version": TOKENIZER_VERSION,
+               "appended_records": appended_records, "state": state}
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def _load_state_payload(path: str) -> Dict[str, Any]:
+    """
+    Загружает файл состояния вместе с метаданными и проверяет версию.
+
+    Args:
+        path (str): Путь к файлу состояния.
+
+    Returns:
+        Dict[str, Any]: Метаданные и состояние (ключ "state").
+
+    Raises:
+        FileNotFoundError: Если файл состояния отсутствует.
+        ValueError: Если состояние сохранено другой версией формата или токенизатора.
+    """
+    with open(path, "rb") as f:
+        payload = pickle.load(f)
+    if (payload.get("cache_format") != CACHE_FORMAT_VERSION
+            or payload.get("tokenizer_version") != TOKENIZER_VERSION):
+        raise ValueError(f"Состояние '{path}' несовместимо с текущей версией. "
+                         "Выполните полный пересчёт без --append.")
+    return payload
+
+
+def load_state(path: str = STATE_FILE) -> AnalysisState:
+    """
+    Загружает сохранённое состояние анализа.
+
+    Args:
+        path (str): Путь к файлу состояния.
+
+    Returns:
+        AnalysisState: Состояние анализа.
+
+    Raises:
+        FileNotFoundError: Если файл состояния отсутствует.
+        ValueError: Если состояние сохранено другой версией формата или токенизатора.
+    """
+    return _load_state_payload(path)["state"]
+
+
+def appended_records_in_state(path: str = STATE_FILE) -> int:
+    """
+    Возвращает количество записей, добавленных к сохранённому состоянию через --append.
+
+    Полный пересчёт не должен молча затирать такие записи: их нет
+    в основном датасете.
+
+    Args:
+        path (str): Путь к файлу состояния.
+
+    Returns:
+        int: Количество добавленных записей; 0, если файла нет или его
+        формат устарел (к нему всё равно нельзя добавлять записи).
+    """
+    try:
+        return _load_state_payload(path).get("appended_records", 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def append_records_to_state(records_path: str, state_path: str = STATE_FILE,
+                            workers: int = 1) -> AnalysisState:
+    """
+    Добавляет новые записи к сохранённому состоянию и сохраняет результат.
+
+    Читаются только новые записи, поэтому стоимость обновления
+    пропорциональна их количеству, а не размеру всего корпуса.
+
+    Args:
+        records_path (str): Файл с новыми записями (JSON Lines или JSON-массив).
+        state_path (str): Файл сохранённого состояния.
+        workers (int): Количество процессов для подсчёта новых записей.
+
+    Returns:
+        AnalysisState: Обновлённое состояние.
+    """
+    payload = _load_state_payload(state_path)
+    state = payload["state"]
+    # Новые записи считаются с теми же параметрами n-грамм, что и сохранённое состояние
+    ngram_params = {"ngram_orders": state.ngrams.orders,
+                    "ngram_buckets": state.ngrams.buckets} if state.ngrams else {}
+    delta = collect_analysis_state(LocalDatasetStream(records_path), workers=workers,
+                                   sketch_capacity=state.sketch_capacity, **ngram_params)
+    state.merge(delta)
+    appended = sum(delta.category_counts.values()) + delta.unknown_labels
+    save_state(state, state_path,
+               appended_records=payload.get("appended_records", 0) + appended)
+    return state
+
+
+def columnar_tables(state: AnalysisState,
+                    top_n: Optional[int] = None) -> Dict[str, Dict[str, "np.ndarray"]]:
+    """
+    Строит столбцовые таблицы счётчиков слов и гистограмм длин.
+
+    Каждая таблица - словарь столбцов одинаковой длины, поэтому
+    pandas.DataFrame(table) строит фрейм без промежуточного JSON.
+
+    Args:
+        state (AnalysisState): Состояние анализа.
+        top_n (Optional[int]): Сколько слов выгружать на категорию. По умолчанию все.
+
+    Returns:
+        Dict[str, Dict[str, np.ndarray]]: Таблица 'words' (category, word, count)
+        и таблица 'lengths' (category, length, count).
+
+    Examples:
+        >>> state = AnalysisState()
+        >>> state.update({"label": 1, "text": "Team won"})
+        >>> tables = columnar_tables(state)
+        >>> tables["words"]["word"].tolist(), tables["lengths"]["length"].tolist()
+        (['team', 'won'], [2])
+    """
+    import numpy as np
+
+    names = list(CATEGORY_LABELS.values())
+    tables = {}
+    if state.count_words:
+        top_words = state.top_words(top_n)
+        pairs = list(chain.from_iterable(top_words.values()))
+        tables["words"] = {
+            "category": np.repeat(names, [len(top_words[name]) for name in names]),
+            "word": np.array([word for word, _ in pairs], dtype=str),
+            "count": np.fromiter((count for _, count in pairs), dtype=np.int64, count=len(pairs)),
+        }
+    if state.count_lengths:
+        histograms = [sorted(state.lengths_by_category[name].histogram.items()) for name in names]
+        rows = list(chain.from_iterable(histograms))
+        tables["lengths"] = {
+            "category": np.repeat(names, [len(histogram) for histogram in histograms]),
+            "length": np.fromiter((length for length, _ in rows), dtype=np.int64, count=len(rows)),
+            "count": np.fromiter((count for _, count in rows), dtype=np.int64, count=len(rows)),
+        }
+    return tables
+
+
+def export_columnar(state: AnalysisState, directory: str, top_n: Optional[int] = None,
+                    fmt: str = "npz") -> Dict[str, str]:
+    """
+    Выгружает счётчики слов и гистограммы длин в столбцовом формате.
+
+    Для каждой таблицы из columnar_tables() пишется файл <таблица>.npz
+    (numpy.savez) или <таблица>.parquet (требует pyarrow).
+
+    Args:
+        state (AnalysisState): Состояние анализа.
+        directory (str): Каталог для файлов.
+        top_n (Optional[int]): Сколько слов выгружать на категорию. По умолчанию все.
+        fmt (str): Формат: 'npz' или 'parquet'.
+
+    Returns:
+        Dict[str, str]: Пути к записанным файлам по именам таблиц.
+
+    Raises:
+        ValueError: Если формат не поддерживается.
+        ImportError: Если для Parquet не установлен pyarrow.
+
+    Examples:
+        >>> import numpy as np, pandas as pd  # doctest: +SKIP
+        >>> paths = export_columnar(state, "export")  # doctest: +SKIP
+        >>> words = pd.DataFrame(dict(np.load(paths["words"])))  # doctest: +SKIP
+    """
+    if fmt not in ("npz", "parquet"):
+        raise ValueError(f"Неподдерживаемый формат выгрузки: '{fmt}'")
+    if fmt == "parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Для выгрузки в Parquet нужен pyarrow: pip install pyarrow") from e
+    else:
+        import numpy as np
+
+    os.makedirs(directory, exist_ok=True)
+    paths = {}
+    for name, table in columnar_tables(state, top_n).items():
+        path = os.path.join(directory, f"{name}.{fmt}")
+        if fmt == "parquet":
+            pq.write_table(pa.table(table), path)
+        else:
+            np.savez(path, **table)
+        paths[name] = path
+    return paths
+
+
+def analyze_category_distribution(dataset,
+                                  label_codes: Optional["np.ndarray"] = None) -> Dict[str, int]:
+    """
+    Анализирует распределение новостей по категориям.
+
+    Распределение считается одним np.bincount по кодам категорий; записи с
+    неизвестной меткой не входят в распределение, их количество печатается.
+
+    Args:
+        dataset: Загруженный датасет (список словарей с ключами 'text' и 'label').
+        label_codes (Optional[np.ndarray]): Коды категорий из dataset_label_codes().
+
+    Returns:
+        Dict[str, int]: Словарь с количеством новостей по каждой категории.
+    """
+    if label_codes is None:
+        label_codes = dataset_label_codes(dataset)
+    distribution, unknown = label_distribution(label_codes)
+    if unknown:
+        print(f"DEBUG: Записей с неизвестной меткой: {unknown}.")
+    return distribution
+
+
+def analyze_text_lengths_by_category(dataset, label_codes: Optional["np.ndarray"] = None
+                                     ) -> Dict[str, Dict[str, Any]]:
+    """
+    Вычисляет статистику длины текстов по категориям.
+
+    Args:
+        dataset: Загруженный датасет.
+        label_codes (Optional[np.ndarray]): Коды категорий из dataset_label_codes().
+
+    Returns:
+        Dict[str, Dict[str, Any]]:
+        Словарь со статистикой (средняя, медиана, std, min, max, p90, p99,
+        гистограмма длин) по каждой категории.
+    """
+    state = collect_analysis_state(dataset, count_words=False, label_codes=label_codes)
+    return state.length_statistics()
+
+
+def extract_top_words_by_category(dataset, top_n: int = 15, workers: int = 1,
+                                  sketch_capacity: int = None,
+                                  label_codes: Optional["np.ndarray"] = None
+                                  ) -> Dict[str, List[Tuple[str, int]]]:
+    """
+    Извлекает топ-N слов для каждой категории.
+
+    Args:
+        dataset: Загруженный датасет.
+        top_n (int): Количество топ слов для извлечения. По умолчанию 15.
+        workers (int): Количество процессов для подсчёта слов. При workers > 1
+            датасет шардируется по пулу процессов; результат не зависит от workers.
+        sketch_capacity (int): Если задано, используется приближённый подсчёт с
+            фиксированной памятью; топ точен, когда SpaceSavingCounter может это гарантировать.
+        label_codes (Optional[np.ndarray]): Коды категорий из dataset_label_codes().
+
+    Returns:
+        Dict[str, List[Tuple[str, int]]]: Словарь, где ключ - категория, значение - список топ слов.
+    """
+    state = collect_analysis_state(dataset, count_lengths=False, workers=workers,
+                                   sketch_capacity=sketch_capacity, label_codes=label_codes)
+    return state.top_words(top_n)
+
+
+def category_term_matrix(state: AnalysisState) -> Tuple["sparse.csr_matrix", List[str]]:
+    """
+    Строит разреженную CSR-матрицу счётчиков "категория x слово".
+
+    Строки идут в порядке CATEGORY_LABELS, столбцы - в порядке первого
+    появления слов, поэтому равные оценки упорядочиваются так же, как в top_words().
+
+    Args:
+        state (AnalysisState): Состояние анализа со счётчиками слов.
+
+    Returns:
+        Tuple[sparse.csr_matrix, List[str]]: Матрица счётчиков и слова по столбцам.
+
+    Examples:
+        >>> state = AnalysisState()
+        >>> state.update_batch([{"label": 0, "text": "peace talks"},
+        ...                     {"label": 1, "text": "team talks"}])
+        >>> matrix, terms = category_term_matrix(state)
+        >>> terms, matrix.toarray().tolist()
+        (['peace', 'talks', 'team'], [[1, 1, 0], [0, 1, 1], [0, 0, 0], [0, 0, 0]])
+    """
+    import numpy as np
+    from scipy import sparse
+
+    if state.word_counts is not None:
+        # Точный режим: матрица (словарь x категории) уже есть, её достаточно транспонировать
+        size = len(state.word_counts.vocabulary)
+        matrix = sparse.csr_matrix(state.word_counts.counts[:size].T)
+        return matrix, list(state.word_counts.vocabulary)
+
+    # Словарь столбцов строится одним проходом по счётчикам; DictVectorizer из
+    # scikit-learn делает то же самое, но на порядок медленнее на больших словарях
+    vocabulary: Dict[str, int] = {}
+    add_term = vocabulary.setdefault
+    indices: List[int] = []
+    data: List[int] = []
+    indptr = [0]
+    for name in CATEGORY_LABELS.values():
+        counts = state.words_by_category[name].counts
+        indices.extend([add_term(word, len(vocabulary)) for word in counts])
+        data.extend(counts.values())
+        indptr.append(len(indices))
+    matrix = sparse.csr_matrix((np.array(data, dtype=np.int64), np.array(indices, dtype=np.int64),
+                                np.array(indptr, dtype=np.int64)),
+                               shape=(len(CATEGORY_LABELS), len(vocabulary)))
+    matrix.sort_indices()
+    return matrix, list(vocabulary)
+
+
+def score_characteristic_terms(matrix: "sparse.csr_matrix", method: str = "log_odds",
+                               prior_scale: float = DEFAULT_PRIOR_SCALE) -> "np.ndarray":
+    """
+    Оценивает, насколько каждое слово характерно для каждой категории.
+
+    - 'log_odds': z-оценка логарифма отношения шансов слова в категории против
+      остальных категорий с информативным априорным распределением Дирихле
+      (Monroe et al., 2008); псевдосчётчики пропорциональны общей частоте слова.
+    - 'tfidf': TF-IDF (TfidfTransformer), где документ - категория целиком;
+      частота логарифмируется (sublinear_tf), иначе миллионы "the" перевешивают idf.
+
+    Все оценки считаются векторно по всему словарю.
+
+    Args:
+        matrix (sparse.csr_matrix): Счётчики "категория x слово".
+        method (str): 'log_odds' или 'tfidf'.
+        prior_scale (float): Сила априорного распределения для log-odds.
+
+    Returns:
+        np.ndarray: Плотная матрица оценок той же формы, что и matrix.
+
+    Raises:
+        ValueError: Если метод неизвестен или prior_scale не положителен.
+    """
+    import numpy as np
+
+    if method not in CHARACTERISTIC_METHODS:
+        raise ValueError(f"Неизвестный метод характерных слов: '{method}'")
+    if method == "tfidf":
+        from sklearn.feature_extraction.text import TfidfTransformer
+        return TfidfTransformer(sublinear_tf=True).fit_transform(matrix).toarray()
+    if prior_scale <= 0:
+        raise ValueError("prior_scale должен быть положительным")
+
+    # Категорий всего четыре, поэтому плотная матрица занимает 4 * V чисел
+    counts = matrix.toarray().astype(np.float64)
+    alpha = prior_scale * counts.sum(axis=0)
+    alpha0 = alpha.sum()
+    totals = counts.sum(axis=1, keepdims=True)
+    rest = counts.sum(axis=0) - counts
+    rest_totals = totals.sum() - totals
+    with np.errstate(divide="ignore", invalid="ignore"):
+        delta = (np.log((counts + alpha) / (totals + alpha0 - counts - alpha))
+                 - np.log((rest + alpha) / (rest_totals + alpha0 - rest - alpha)))
+        scores = delta / np.sqrt(1 / (counts + alpha) + 1 / (rest + alpha))
+    return np.nan_to_num(scores, nan=0.0)
+
+
+def characteristic_words(state: AnalysisState, top_n: int = 15, method: str = "log_odds",
+                         prior_scale: float = DEFAULT_PRIOR_SCALE
+                         ) -> Dict[str, List[Tuple[str, float]]]:
+    """
+    Возвращает топ-N характерных слов каждой категории.
+
+    Кандидаты - слова, встретившиеся в категории; при равных оценках раньше
+    идёт слово, появившееся в датасете раньше.
+
+    Args:
+        state (AnalysisState): Состояние анализа со счётчиками слов.
+        top_n (int): Количество слов на категорию. По умолчанию 15.
+        method (str): 'log_odds' или 'tfidf'.
+        prior_scale (float): Сила априорного распределения для log-odds.
+
+    Returns:
+        Dict[str, List[Tuple[str, float]]]: Пары (слово, оценка) по убыванию оценки.
+    """
+    import numpy as np
+
+    matrix, terms = category_term_matrix(state)
+    scores = score_characteristic_terms(matrix, method, prior_scale)
+    result = {}
+    for row, name in enumerate(CATEGORY_LABELS.values()):
+        columns = matrix.indices[matrix.indptr[row]:matrix.indptr[row + 1]]
+        row_scores = scores[row, columns]
+        order = np.lexsort((columns, -row_scores))[:top_n]
+        result[name] = [(terms[column], round(float(score), 4))
+                        for column, score in zip(columns[order], row_scores[order])]
+    return result
+
+
+def extract_characteristic_words_by_category(dataset, top_n: int = 15, method: str = "log_odds",
+                                             workers: int = 1,
+                                             prior_scale: float = DEFAULT_PRIOR_SCALE
+                                             ) -> Dict[str, List[Tuple[str, float]]]:
+    """
+    Извлекает характерные слова каждой категории (в отличие от самых частых).
+
+    Частотный топ заполнен служебными словами ("the", "of", "a"); log-odds и
+    TF-IDF поднимают слова, которые отличают категорию от остальных.
+
+    Args:
+        dataset: Загруженный датасет.
+        top_n (int): Количество слов на категорию. По умолчанию 15.
+        method (str): 'log_odds' или 'tfidf'.
+        workers (int): Количество процессов для подсчёта слов.
+        prior_scale (float): Сила априорного распределения для log-odds.
+
+    Returns:
+        Dict[str, List[Tuple[str, float]]]: Пары (слово, оценка) по каждой категории.
+    """
+    state = collect_analysis_state(dataset, count_lengths=False, workers=workers)
+    return characteristic_words(state, top_n, method, prior_scale)
+
+
+def create_pie_chart(category_counts: Dict[str, int], output_path: str = CHART_FILE):
+    """
+    Создаёт и сохраняет круговую диаграмму распределения категорий.
+
+    Используется объектный API Agg (Figure + FigureCanvasAgg) без pyplot:
+    нет глобального состояния, поэтому функцию можно вызывать в любом процессе.
+
+    Args:
+        category_counts (Dict[str, int]): Словарь с количеством новостей по категориям.
+        output_path (str): Путь к PNG-файлу.
+    """
+    # matplotlib загружается только здесь
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=(8, 8))
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot()
+    ax.pie(list(category_counts.values()), labels=list(category_counts.keys()),
+           autopct='%1.1f%%', startangle=140)
+    ax.set_title('Distribution of News Categories in AG News Dataset')
+    ax.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle.
+    figure.savefig(output_path)
+
+
+def peek_category_distribution(dataset) -> Optional[Dict[str, int]]:
+    """
+    Возвращает распределение категорий без полного прохода, если метки дёшево читаются отдельно.
+
+    Для списка записей и корпуса токенов считаются только метки; у
+    datasets.Dataset из Arrow читается один столбец 'label', без текстов.
+    В потоке из файла метки не отделить от текстов без лишнего разбора
+    всего файла, поэтому для него None.
+
+    Args:
+        dataset: Датасет.
+
+    Returns:
+        Optional[Dict[str, int]]: Распределение категорий или None.
+    """
+    import numpy as np
+    if isinstance(dataset, (list, TokenCorpus)):
+        return label_distribution(dataset_label_codes(dataset))[0]
+    if is_columnar_dataset(dataset) and hasattr(dataset, "select_columns"):
+        labels = dataset.select_columns(["label"])
+        codes = [encode_labels(columns["label"])
+                 for columns in labels.iter(batch_size=DEFAULT_BATCH_SIZE)]
+        return label_distribution(np.concatenate(codes) if codes
+                                  else np.zeros(0, dtype=np.uint8))[0]
+    return None
+
+
+class ChartRenderer:
+    """
+    Рисует круговую диаграмму в отдельном процессе, параллельно с анализом.
+
+    Examples:
+        >>> chart = ChartRenderer({"World": 1, "Sports": 1}, "chart.png")  # doctest: +SKIP
+        >>> chart.start()  # doctest: +SKIP
+        >>> chart.join()  # doctest: +SKIP
+    """
+
+    def __init__(self, category_counts: Dict[str, int], output_path: str = CHART_FILE):
+        """
+        Инициализация отрисовщика; процесс создаётся только в start().
+
+        Args:
+            category_counts (Dict[str, int]): Количество записей по категориям.
+            output_path (str): Путь к PNG-файлу диаграммы.
+        """
+        self.category_counts = dict(category_counts)
+        self.output_path = output_path
+        self.process = None
+
+    def start(self) -> "ChartRenderer":
+        """
+        Запускает процесс отрисовки.
+
+        Если в процессе работают другие потоки (например, загрузчик Hub,
+        не уложившийся в срок), процесс запускается через spawn: fork
+        многопоточного процесса может унаследовать захваченные блокировки.
+
+        Returns:
+            ChartRenderer: self.
+        """
+        import multiprocessing
+        import threading
+        context = multiprocessing.get_context()
+        if context.get_start_method() == "fork" and threading.active_count() > 1:
+            context = multiprocessing.get_context("spawn")
+        self.process = context.Process(target=create_pie_chart,
+                                       args=(self.category_counts, self.output_path))
+        self.process.start()
+        return self
+
+    def join(self) -> None:
+        """
+        Дожидается отрисовки.
+
+        Если процесс не запускался или завершился с ошибкой, диаграмма
+        рисуется в текущем процессе, чтобы ошибка matplotlib не потерялась.
+        """
+        if self.process is not None:
+            self.process.join()
+            if self.process.exitcode == 0:
+                return
+            print(f"DEBUG: Процесс отрисовки завершился с кодом {self.process.exitcode}, "
+                  "рисуем диаграмму в основном процессе")
+        create_pie_chart(self.category_counts, self.output_path)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Возвращает пиковый размер резидентной памяти процесса в мегабайтах.
+
+    Returns:
+        Optional[float]: Пиковый RSS или None, если модуль resource недоступен (Windows).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдаёт килобайты, macOS - байты
+    scale = 2 ** 20 if sys.platform == "darwin" else 2 ** 10
+    return round(peak / scale, 2)
+
+
+def cpu_seconds() -> float:
+    """
+    Возвращает процессорное время процесса вместе с его дочерними процессами.
+
+    Дочерние процессы (пул --workers, отрисовка диаграммы) учитываются
+    через RUSAGE_CHILDREN, то есть только после их завершения и ожидания.
+    Без модуля resource (Windows) возвращается время только этого процесса.
+
+    Returns:
+        float: Суммарное user + system время в секундах.
+    """
+    total = time.process_time()
+    try:
+        import resource
+    except ImportError:
+        return total
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return total + children.ru_utime + children.ru_stime
+
+
+class PerfRecorder:
+    """
+    Телеметрия этапов запуска: время, процессорное время, строки/сек и пиковый RSS.
+
+    Процессорное время включает завершившиеся за время этапа дочерние
+    процессы (см. cpu_seconds), поэтому для параллельного анализа
+    отношение cpu/wall показывает реальную загрузку ядер. Пиковый RSS -
+    максимум основного процесса на момент окончания этапа, поэтому
+    рост между этапами показывает, какой из них поднял потребление памяти.
+
+    Examples:
+        >>> perf = PerfRecorder()
+        >>> with perf.stage("analyze"):
+        ...     pass
+        >>> sorted(perf.report()["stages"]["analyze"])
+        ['cpu_seconds', 'peak_rss_mb', 'rows_per_sec', 'wall_seconds']
+    """
+
+    def __init__(self):
+        """
+        Инициализация пустой телеметрии.
+
+        rows задаётся после загрузки датасета и используется для rows_per_sec.
+        """
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.rows: Optional[int] = None
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Измеряет блок кода как этап name.
+
+        Args:
+            name (str): Имя этапа.
+        """
+        wall, cpu = time.perf_counter(), cpu_seconds()
+        try:
+            yield
+        finally:
+            self.stages[name] = {
+                "wall_seconds": round(time.perf_counter() - wall, 6),
+                "cpu_seconds": round(cpu_seconds() - cpu, 6),
+                "peak_rss_mb": peak_rss_mb(),
+            }
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Формирует отчёт по всем этапам.
+
+        rows_per_sec считается от числа проанализированных строк (self.rows)
+        и равен None, пока оно неизвестно.
+
+        Returns:
+            Dict[str, Any]: rows, stages и суммарные wall_seconds/cpu_seconds.
+        """
+        stages = {}
+        for name, metrics in self.stages.items():
+            wall = metrics["wall_seconds"]
+            rows_per_sec = round(self.rows / wall, 1) if self.rows and wall > 0 else None
+            stages[name] = dict(metrics, rows_per_sec=rows_per_sec)
+        return {
+            "rows": self.rows,
+            "stages": stages,
+            "total_wall_seconds": round(sum(m["wall_seconds"] for m in stages.values()), 6),
+            "total_cpu_seconds": round(sum(m["cpu_seconds"] for m in stages.values()), 6),
+        }
+
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    """
+    Разбирает аргументы командной строки.
+
+    Args:
+        argv (List[str]): Аргументы. По умолчанию sys.argv[1:].
+
+    Returns:
+        argparse.Namespace: Разобранные аргументы.
+    """
+    parser = argparse.ArgumentParser(description="Анализ датасета AG News")
+    parser.add_argument("--source", choices=DATASET_SOURCES, default="auto",
+                        help="Источник датасета: auto (Hub и файл параллельно), hub или local")
+    parser.add_argument("--deadline", type=float, default=DEFAULT_HUB_DEADLINE,
+                        help="Сколько секунд ждать Hugging Face Hub в режиме auto")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Количество процессов для подсчёта (0 - по числу ядер)")
+    parser.add_argument("--sketch-capacity", type=int, default=None,
+                        help="Приближённый подсчёт слов: сколько слов отслеживать на категорию")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="Каталог кэша результатов")
+    parser.add_argument("--cache-max-mb", type=int, default=DEFAULT_CACHE_MAX_BYTES >> 20,
+                        help="Предельный размер кэша в мегабайтах")
+    parser.add_argument("--no-cache", action="store_true", help="Не использовать кэш")
+    parser.add_argument("--build-corpus", metavar="DIR",
+                        help="Собрать корпус токенов в каталоге DIR и анализировать его")
+    parser.add_argument("--corpus", metavar="DIR",
+                        help="Анализировать ранее собранный корпус токенов из DIR")
+    parser.add_argument("--state-file", default=STATE_FILE,
+                        help="Файл сливаемого состояния анализа. Полный запуск перезаписывает "
+                             "его, только если в нём нет записей, добавленных через --append")
+    parser.add_argument("--overwrite-state", action="store_true",
+                        help="Перезаписать файл состояния, даже если в нём есть записи, "
+                             "добавленные через --append (они будут потеряны)")
+    parser.add_argument("--append", metavar="NEW_ITEMS",
+                        help="Добавить записи из файла (JSON Lines) к сохранённому состоянию")
+    parser.add_argument("--perf", action="store_true",
+                        help="Измерить этапы и добавить раздел perf в результаты")
+    parser.add_argument("--ngrams", type=lambda value: tuple(int(n) for n in value.split(",")),
+                        default=(), metavar="ORDERS",
+                        help="Длины n-грамм через запятую, например 2,3 (биграммы и триграммы)")
+    parser.add_argument("--ngram-buckets", type=int, default=DEFAULT_NGRAM_BUCKETS,
+                        help="Количество корзин хэш-счётчика n-грамм на категорию")
+    parser.add_argument("--characteristic", choices=CHARACTERISTIC_METHODS,
+                        help="Добавить характерные слова категорий (log-odds или TF-IDF)")
+    parser.add_argument("--export", metavar="DIR",
+                        help="Выгрузить счётчики слов и гистограммы длин в столбцовом формате")
+    parser.add_argument("--export-format", choices=("npz", "parquet"), default="npz",
+                        help="Формат столбцовой выгрузки (parquet требует pyarrow)")
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str] = None):
+    """
+    Основная функция для выполнения анализа.
+
+    Args:
+        argv (List[str]): Аргументы командной строки. По умолчанию sys.argv[1:].
+    """
+    args = parse_args(argv)
+    perf = PerfRecorder()
+    chart = None
+    if args.append:
+        print(f"Appending new items from '{args.append}' to '{args.state_file}'...")
+        with perf.stage("append"):
+            state = append_records_to_state(args.append, args.state_file, workers=args.workers)
+            analysis = summarize_state(state, top_n=15)
+    else:
+        print("Loading AG News dataset...")
+        with perf.stage("load"):
+            if args.corpus:
+                dataset = TokenCorpus(args.corpus)
+            else:
+                dataset = load_ag_news_dataset(streaming=True, source=args.source,
+                                               deadline=args.deadline)
+        print("Dataset loaded successfully.")
+        if args.build_corpus:
+            print(f"Building token corpus in '{args.build_corpus}'...")
+            with perf.stage("build_corpus"):
+                dataset = build_token_corpus(dataset, args.build_corpus)
+
+        # Если метки читаются отдельно от текстов, диаграмма рисуется параллельно с анализом
+        with perf.stage("chart_start"):
+            distribution = peek_category_distribution(dataset)
+            if distribution is not None:
+                print("Creating pie chart in background...")
+                chart = ChartRenderer(distribution).start()
+
+        # Распределение, длины и топ слов считаются за один проход - это один этап;
+        # потоковое чтение файла тоже происходит здесь
+        print("Analyzing dataset in a single pass...")
+        with perf.stage("analyze"):
+            cache = None if args.no_cache else ResultCache(args.cache_dir,
+                                                           args.cache_max_mb << 20)
+            state, analysis = run_cached_analysis(dataset, cache, top_n=15,
+                                                  workers=args.workers,
+                                                  sketch_capacity=args.sketch_capacity,
+                                                  ngram_orders=args.ngrams,
+                                                  ngram_buckets=args.ngram_buckets)
+    if chart is None:
+        print("Creating pie chart in background...")
+        chart = ChartRenderer(analysis["category_distribution"]).start()
+    if not args.append:
+        appended = appended_records_in_state(args.state_file)
+        if appended and not args.overwrite_state:
+            print(f"State file '{args.state_file}' contains {appended} appended records; "
+                  "not overwriting it (use --overwrite-state to replace it).")
+        else:
+            with perf.stage("save_state"):
+                save_state(state, args.state_file)
+    perf.rows = sum(state.category_counts.values())
+    category_dist = analysis["category_distribution"]
+    length_stats = analysis["text_length_statistics"]
+    top_words = analysis["top_words_per_category"]
+    print("Category distribution:", category_dist)
+    if analysis["unknown_label_count"]:
+        print("Records with unknown labels:", analysis["unknown_label_count"])
+    print("Length statistics by category:", length_stats)
     print("Top words extracted.")
 
-    print("Creating pie chart...")
-    create_pie_chart(category_dist)
-    print("Pie chart saved as 'visualization.png'.")
+    # Ожидание процесса отрисовки - всё, что осталось от диаграммы на критическом пути
+    with perf.stage("chart"):
+        chart.join()
+    print(f"Pie chart saved as '{CHART_FILE}'.")
 
     # Сбор результатов в один словарь
     results = {
         "dataset": "ag_news",
         "category_distribution": category_dist,
+        "unknown_label_count": analysis["unknown_label_count"],
         "text_length_statistics": length_stats,
         "top_words_per_category": top_words
     }
+    if "top_words_error_bounds" in analysis:
+        results["top_words_error_bounds"] = analysis["top_words_error_bounds"]
+    if args.ngrams and args.append:
+        print("DEBUG: Точные n-граммы требуют повторного прохода по всему датасету; "
+              "в режиме --append они не считаются.")
+    elif args.ngrams:
+        print("Counting exact n-grams for candidate buckets...")
+        with perf.stage("ngrams"):
+            results["top_ngrams_per_category"] = top_ngrams(dataset, state, top_n=15)
+    if args.characteristic:
+        with perf.stage("characteristic_words"):
+            results["characteristic_words_per_category"] = characteristic_words(
+                state, top_n=15, method=args.characteristic)
 
     print("Saving results to 'ag_news_results.json'...")
-    with open("ag_news_results.json", "w", encoding="utf-8") as f:
-        json.dump(results, f, ensure_ascii=False, indent=4)
+    with perf.stage("save"):
+        if args.perf:
+            # Время сохранения results попадает только в лог-строку ниже
+            results["perf"] = perf.report()
+        with open("ag_news_results.json", "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=4)
     print("Results saved successfully.")
+    if args.export:
+        print(f"Exporting columnar results to '{args.export}'...")
+        with perf.stage("export"):
+            paths = export_columnar(state, args.export, fmt=args.export_format)
+        print("Exported:", ", ".join(paths.values()))
+    if args.perf:
+        print("PERF " + json.dumps(perf.report()))
 
 
 if __name__ == "__main__":
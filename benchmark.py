@@ -0,0 +1,381 @@
+"""
+Бенчмарки для assignment.py.
+
+Режимы:
+- suite: прогоняет каждую функцию анализа на синтетических корпусах,
+  похожих на AG News (от 1k до 1M строк), измеряет пропускную способность,
+  пиковую память и показатель масштабирования, сохраняет их в JSON-базу
+  и падает при регрессии сверх порога;
+- tokenizer: сравнивает построчную токенизацию (preprocess_text) и
+  пакетную (tokenize_batch).
+
+Запуск:
+    python benchmark.py suite --save-baseline
+    python benchmark.py suite --check --threshold 0.2
+    python benchmark.py tokenizer --rows 100000
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from assignment import (CATEGORY_LABELS, DEFAULT_BATCH_SIZE, analyze_category_distribution,
+                        analyze_text_lengths_by_category, create_pie_chart,
+                        extract_top_words_by_category, preprocess_text, tokenize_batch)
+
+#  Словарь для генерации синтетических текстов
+SYNTHETIC_WORDS = [
+    "Reuters", "AP", "stocks", "oil", "prices", "Iraq", "election", "team", "won", "game",
+    "season", "Microsoft", "Google", "software", "profit", "quarter", "shares", "said",
+    "the", "of", "a", "in", "to", "and", "on", "for", "with", "new", "U.S.", "#39;s",
+]
+
+#  Знаки препинания и числа, которые токенизатор должен отбрасывать
+SYNTHETIC_NOISE = [",", ".", "-", "(", ")", "2004", "$5.2", "quot;", "--", "'"]
+
+#  Размеры корпусов по умолчанию
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+
+#  Файл с базовыми значениями и допустимая доля регрессии
+BASELINE_FILE = "benchmark_baseline.json"
+DEFAULT_THRESHOLD = 0.2
+
+#  Допустимый рост показателя масштабирования относительно базы
+EXPONENT_TOLERANCE = 0.15
+
+#  Количество уникальных текстов, из которых собираются большие корпуса
+TEXT_POOL_SIZE = 20000
+
+#  Минимальная длительность одного замера: быстрые вызовы повторяются в
+#  цикле, иначе на 1k строк (доли миллисекунды) доминирует шум таймера
+MIN_SAMPLE_SECONDS = 0.2
+
+
+def generate_texts(rows: int, seed: int = 42) -> List[str]:
+    """
+    Генерирует синтетические новостные тексты.
+
+    Args:
+        rows (int): Количество текстов.
+        seed (int): Зерно генератора случайных чисел.
+
+    Returns:
+        List[str]: Сгенерированные тексты.
+    """
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(rows):
+        length = rng.randint(15, 60)
+        parts = [rng.choice(SYNTHETIC_WORDS) if rng.random() < 0.85
+                 else rng.choice(SYNTHETIC_NOISE) for _ in range(length)]
+        # Редкие слова дают реалистичный рост словаря
+        parts.append(f"topic{rng.randint(0, rows)}")
+        texts.append(" ".join(parts))
+    return texts
+
+
+def generate_dataset(rows: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """
+    Генерирует синтетический датасет в формате AG News.
+
+    Тексты выбираются из пула TEXT_POOL_SIZE уникальных текстов, поэтому
+    корпус на 1M строк строится за секунды.
+
+    Args:
+        rows (int): Количество записей.
+        seed (int): Зерно генератора случайных чисел.
+
+    Returns:
+        List[Dict[str, Any]]: Записи с ключами 'label' и 'text'.
+    """
+    rng = random.Random(seed)
+    pool = generate_texts(min(rows, TEXT_POOL_SIZE), seed)
+    labels = list(CATEGORY_LABELS)
+    return [{"label": rng.choice(labels), "text": rng.choice(pool)} for _ in range(rows)]
+
+
+def run_pie_chart(dataset: List[Dict[str, Any]]) -> None:
+    """
+    Строит круговую диаграмму во временном каталоге.
+
+    Args:
+        dataset (List[Dict[str, Any]]): Датасет (используется его распределение).
+    """
+    distribution = analyze_category_distribution(dataset[:1000])
+    with tempfile.TemporaryDirectory() as directory:
+        create_pie_chart(distribution, os.path.join(directory, "visualization.png"))
+
+
+#  Функции, для которых измеряется масштабирование. Диаграмма строится по
+#  распределению категорий, её стоимость не зависит от размера корпуса
+FIXED_COST_BENCHMARKS = {"create_pie_chart"}
+BENCHMARKS: Dict[str, Callable[[List[Dict[str, Any]]], Any]] = {
+    "analyze_category_distribution": analyze_category_distribution,
+    "analyze_text_lengths_by_category": analyze_text_lengths_by_category,
+    "extract_top_words_by_category": extract_top_words_by_category,
+    "create_pie_chart": run_pie_chart,
+}
+
+
+def measure(func: Callable[[List[Dict[str, Any]]], Any], dataset: List[Dict[str, Any]],
+            repeat: int, min_seconds: float = MIN_SAMPLE_SECONDS) -> Dict[str, float]:
+    """
+    Измеряет время и пиковую память одного вызова функции.
+
+    Первый запуск прогревает ленивые импорты и не учитывается. Каждый из
+    repeat замеров вызывает функцию в цикле, пока не пройдёт min_seconds,
+    и делит время на число вызовов; результат - лучший замер. Пиковая
+    память измеряется отдельным запуском под tracemalloc.
+
+    Args:
+        func: Функция анализа.
+        dataset (List[Dict[str, Any]]): Датасет.
+        repeat (int): Количество замеров времени.
+        min_seconds (float): Минимальная длительность одного замера.
+
+    Returns:
+        Dict[str, float]: seconds (на один вызов), rows_per_sec, peak_mb и
+        calls (число вызовов в замере).
+    """
+    func(dataset)
+    best = float("inf")
+    calls = 0
+    for _ in range(repeat):
+        calls = 0
+        start = time.perf_counter()
+        while True:
+            func(dataset)
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_seconds:
+                break
+        best = min(best, elapsed / calls)
+    tracemalloc.start()
+    try:
+        func(dataset)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": round(best, 6), "rows_per_sec": round(len(dataset) / best, 1),
+            "peak_mb": round(peak / 2 ** 20, 3), "calls": calls}
+
+
+def scaling_exponent(sizes: List[int], seconds: List[float]) -> float:
+    """
+    Оценивает показатель k в зависимости time ~ rows^k (МНК в логарифмах).
+
+    Args:
+        sizes (List[int]): Размеры корпусов.
+        seconds (List[float]): Время для каждого размера.
+
+    Returns:
+        float: Показатель масштабирования (1.0 - линейный рост).
+    """
+    if len(sizes) < 2:
+        return float("nan")
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(max(value, 1e-9)) for value in seconds]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    variance = sum((x - mean_x) ** 2 for x in xs)
+    return round(covariance / variance, 3)
+
+
+def run_suite(sizes: List[int], repeat: int) -> Dict[str, Any]:
+    """
+    Прогоняет все бенчмарки на корпусах заданных размеров.
+
+    Args:
+        sizes (List[int]): Размеры корпусов.
+        repeat (int): Количество повторов для измерения времени.
+
+    Returns:
+        Dict[str, Any]: Результаты по функциям: измерения по размерам и показатель масштабирования.
+    """
+    results = {name: {"sizes": {}} for name in BENCHMARKS}
+    for size in sizes:
+        dataset = generate_dataset(size)
+        for name, func in BENCHMARKS.items():
+            metrics = measure(func, dataset, repeat)
+            results[name]["sizes"][str(size)] = metrics
+            print(f"{name:<34} {size:>9,} rows  {metrics['rows_per_sec']:>14,.0f} rows/sec  "
+                  f"{metrics['peak_mb']:>9.2f} MB")
+    for name, result in results.items():
+        if name in FIXED_COST_BENCHMARKS:
+            result["scaling_exponent"] = None
+            continue
+        measured = result["sizes"]
+        result["scaling_exponent"] = scaling_exponent(
+            [int(size) for size in measured], [m["seconds"] for m in measured.values()])
+        print(f"{name:<34} scaling exponent {result['scaling_exponent']}")
+    return results
+
+
+def find_regressions(current: Dict[str, Any], baseline: Dict[str, Any],
+                     threshold: float) -> List[str]:
+    """
+    Сравнивает результаты с базой и возвращает описания регрессий.
+
+    Регрессия - падение пропускной способности или рост пиковой памяти
+    больше чем на threshold, либо рост показателя масштабирования больше
+    чем на EXPONENT_TOLERANCE. Сравниваются только размеры, которые есть в
+    обоих наборах; показатели - только при совпадающих наборах размеров.
+
+    Args:
+        current (Dict[str, Any]): Текущие результаты run_suite().
+        baseline (Dict[str, Any]): Базовые результаты.
+        threshold (float): Допустимая доля ухудшения (0.2 = 20%).
+
+    Returns:
+        List[str]: Описания регрессий (пустой список, если их нет).
+    """
+    regressions = []
+    for name, result in current.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for size, metrics in result["sizes"].items():
+            base_metrics = base["sizes"].get(size)
+            if not base_metrics:
+                continue
+            if metrics["rows_per_sec"] < base_metrics["rows_per_sec"] * (1 - threshold):
+                regressions.append(f"{name} @ {size}: throughput {metrics['rows_per_sec']:,.0f} "
+                                   f"< baseline {base_metrics['rows_per_sec']:,.0f} rows/sec")
+            if metrics["peak_mb"] > base_metrics["peak_mb"] * (1 + threshold) + 0.1:
+                regressions.append(f"{name} @ {size}: peak memory {metrics['peak_mb']} MB "
+                                   f"> baseline {base_metrics['peak_mb']} MB")
+        exponent, base_exponent = result["scaling_exponent"], base.get("scaling_exponent")
+        if (exponent is not None and base_exponent is not None
+                and set(result["sizes"]) == set(base["sizes"])
+                and exponent > base_exponent + EXPONENT_TOLERANCE):
+            regressions.append(f"{name}: scaling exponent {exponent} > baseline {base_exponent}")
+    return regressions
+
+
+def tokenize_per_string(texts: List[str]) -> List[List[str]]:
+    """
+    Токенизирует тексты построчно, как до появления пакетного API.
+
+    Args:
+        texts (List[str]): Тексты.
+
+    Returns:
+        List[List[str]]: Токены для каждого текста.
+    """
+    return [preprocess_text(text).split() for text in texts]
+
+
+def tokenize_batched(texts: List[str]) -> List[List[str]]:
+    """
+    Токенизирует тексты порциями через tokenize_batch().
+
+    Args:
+        texts (List[str]): Тексты.
+
+    Returns:
+        List[List[str]]: Токены для каждого текста.
+    """
+    tokens = []
+    for start in range(0, len(texts), DEFAULT_BATCH_SIZE):
+        tokens.extend(tokenize_batch(texts[start:start + DEFAULT_BATCH_SIZE]))
+    return tokens
+
+
+def measure_throughput(tokenize: Callable[[List[str]], List[List[str]]],
+                       texts: List[str], repeat: int) -> float:
+    """
+    Измеряет лучшую пропускную способность токенизатора.
+
+    Args:
+        tokenize: Функция токенизации столбца текстов.
+        texts (List[str]): Тексты.
+        repeat (int): Количество повторов.
+
+    Returns:
+        float: Текстов в секунду (лучший из повторов).
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        tokenize(texts)
+        best = min(best, time.perf_counter() - start)
+    return len(texts) / best
+
+
+def run_tokenizer_benchmark(rows: int, repeat: int) -> None:
+    """
+    Сравнивает построчную и пакетную токенизацию.
+
+    Args:
+        rows (int): Количество текстов.
+        repeat (int): Количество повторов.
+    """
+    texts = generate_texts(rows)
+    # Пакетный путь обязан давать те же токены, что и построчный
+    if tokenize_batched(texts) != tokenize_per_string(texts):
+        raise SystemExit("ERROR: tokenize_batch() расходится с preprocess_text()")
+
+    per_string = measure_throughput(tokenize_per_string, texts, repeat)
+    batched = measure_throughput(tokenize_batched, texts, repeat)
+    print(f"preprocess_text: {per_string:,.0f} texts/sec")
+    print(f"tokenize_batch:  {batched:,.0f} texts/sec")
+    print(f"speedup:         {batched / per_string:.2f}x")
+
+
+def main():
+    """
+    Основная функция бенчмарка.
+    """
+    parser = argparse.ArgumentParser(description="Бенчмарки анализа AG News")
+    subparsers = parser.add_subparsers(dest="mode")
+
+    suite = subparsers.add_parser("suite", help="Масштабирование функций анализа")
+    suite.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                       help="Размеры корпусов через запятую")
+    suite.add_argument("--repeat", type=int, default=3, help="Количество повторов")
+    suite.add_argument("--baseline", default=BASELINE_FILE, help="Файл базовых значений")
+    suite.add_argument("--save-baseline", action="store_true", help="Сохранить результаты как базу")
+    suite.add_argument("--check", action="store_true",
+                       help="Сравнить с базой и упасть при регрессии")
+    suite.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                       help="Допустимая доля ухудшения (0.2 = 20%%)")
+
+    tokenizer = subparsers.add_parser("tokenizer", help="Сравнение токенизаторов")
+    tokenizer.add_argument("--rows", type=int, default=100000, help="Количество текстов")
+    tokenizer.add_argument("--repeat", type=int, default=5, help="Количество повторов")
+
+    args = parser.parse_args(sys.argv[1:] or ["suite"])
+    if args.mode == "tokenizer":
+        run_tokenizer_benchmark(args.rows, args.repeat)
+        return
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    results = run_suite(sizes, args.repeat)
+    if args.check:
+        try:
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        except FileNotFoundError:
+            raise SystemExit(f"ERROR: база '{args.baseline}' не найдена. "
+                             "Сначала запустите с --save-baseline.")
+        regressions = find_regressions(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if regressions:
+            raise SystemExit(1)
+        print("No regressions against baseline.")
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=4)
+        print(f"Baseline saved to '{args.baseline}'.")
+
+
+if __name__ == "__main__":
+    main()
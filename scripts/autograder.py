@@ -5,11 +5,22 @@
 unit тесты и корректность функциональности.
 """
 
+import io
 import os
+import re
 import sys
 import json
+import time
+import signal
+import argparse
+import threading
 import subprocess
-from typing import Dict, List, Tuple, Any
+import importlib.util
+import multiprocessing
+import multiprocessing.util
+from contextlib import redirect_stdout, redirect_stderr
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Tuple, Any, Optional
 from pathlib import Path
 
 # ============================================
@@ -32,6 +43,28 @@ DOCUMENTATION_REQUIREMENTS = {
     }
 }
 
+# ============================================
+# ПРОВЕРКИ ОТЧЕТА
+# ============================================
+
+# Ключ отчета -> метод проверки. Каждая проверка выполняется один раз
+# за прогон, отчет и подсчет балла читают общее хранилище результатов
+REPORT_CHECKS = {
+    "files_check": "check_files_exist",
+    "code_quality": "check_code_quality",
+    "dataset_validation": "check_dataset_validation",
+    "documentation": "check_documentation",
+    "unit_tests": "check_unit_tests",
+    "output_format": "check_output_format",
+}
+
+# ============================================
+# ПАКЕТНАЯ ПРОВЕРКА
+# ============================================
+
+BATCH_DEFAULT_TIMEOUT = 300.0
+BATCH_REPORT_FILE = "batch_report.jsonl"
+
 # Импортируем конфиги из autograder_config
 try:
     from autograder_config import VARIANT_CONFIGS, GRADING_CRITERIA
@@ -41,6 +74,581 @@ except ImportError:
     GRADING_CRITERIA = {}
 
 
+# ============================================
+# ЛИНТЕР В ПРОЦЕССЕ (pycodestyle + pyflakes)
+# ============================================
+
+PEP8_MAX_LINE_LENGTH = 100
+
+# Коды flake8 для сообщений pyflakes (имя класса сообщения -> код)
+PYFLAKES_CODES = {
+    "UnusedImport": "F401",
+    "ImportShadowedByLoopVar": "F402",
+    "ImportStarUsed": "F403",
+    "LateFutureImport": "F404",
+    "ImportStarUsage": "F405",
+    "ImportStarNotPermitted": "F406",
+    "FutureFeatureNotDefined": "F407",
+    "PercentFormatInvalidFormat": "F501",
+    "PercentFormatExpectedMapping": "F502",
+    "PercentFormatExpectedSequence": "F503",
+    "PercentFormatExtraNamedArguments": "F504",
+    "PercentFormatMissingArgument": "F505",
+    "PercentFormatMixedPositionalAndNamed": "F506",
+    "PercentFormatPositionalCountMismatch": "F507",
+    "PercentFormatStarRequiresSequence": "F508",
+    "PercentFormatUnsupportedFormatCharacter": "F509",
+    "StringDotFormatInvalidFormat": "F521",
+    "StringDotFormatExtraNamedArguments": "F522",
+    "StringDotFormatExtraPositionalArguments": "F523",
+    "StringDotFormatMissingArgument": "F524",
+    "StringDotFormatMixingAutomatic": "F525",
+    "FStringMissingPlaceholders": "F541",
+    "MultiValueRepeatedKeyLiteral": "F601",
+    "MultiValueRepeatedKeyVariable": "F602",
+    "TooManyExpressionsInStarredAssignment": "F621",
+    "TwoStarredExpressions": "F622",
+    "AssertTuple": "F631",
+    "IsLiteral": "F632",
+    "InvalidPrintSyntax": "F633",
+    "IfTuple": "F634",
+    "BreakOutsideLoop": "F701",
+    "ContinueOutsideLoop": "F702",
+    "YieldOutsideFunction": "F704",
+    "ReturnOutsideFunction": "F706",
+    "DefaultExceptNotLast": "F707",
+    "DoctestSyntaxError": "F721",
+    "ForwardAnnotationSyntaxError": "F722",
+    "RedefinedWhileUnused": "F811",
+    "UndefinedName": "F821",
+    "UndefinedExport": "F822",
+    "UndefinedLocal": "F823",
+    "UnusedIndirectAssignment": "F824",
+    "DuplicateArgument": "F831",
+    "UnusedVariable": "F841",
+    "UnusedAnnotation": "F842",
+    "RaiseNotImplemented": "F901",
+}
+
+# Комментарий "# noqa" или "# noqa: E501,F401" (как во flake8)
+NOQA_PATTERN = re.compile(
+    r"#\s*noqa(?::[\s]?(?P<codes>[A-Z][0-9]+(?:[,\s]+[A-Z][0-9]+)*))?",
+    re.IGNORECASE,
+)
+
+# Строка вывода flake8: "<path>:<line>:<col>: <code> <message>"
+FLAKE8_LINE_PATTERN = re.compile(r"^.*?:(\d+):(\d+): ([A-Z]+\d+) (.*)$")
+
+
+def _violation(code: str, line: int, column: int, message: str) -> Dict[str, Any]:
+    """Создает запись о нарушении (колонка с 1, как во flake8)."""
+    return {"code": code, "line": line, "column": column, "message": message}
+
+
+def _pycodestyle_violations(path: str, lines: List[str],
+                            max_line_length: int) -> List[Dict[str, Any]]:
+    """
+    Проверяет стиль через API pycodestyle.
+
+    Args:
+        path: Путь к файлу (для сообщений)
+        lines: Строки файла
+        max_line_length: Максимальная длина строки
+
+    Returns:
+        List[Dict[str, Any]]: Нарушения E/W
+    """
+    import pycodestyle
+
+    violations = []
+
+    class CollectingReport(pycodestyle.BaseReport):
+        """Отчет pycodestyle, собирающий нарушения вместо печати."""
+
+        def error(self, line_number, offset, text, check):
+            code = super().error(line_number, offset, text, check)
+            if code:
+                violations.append(_violation(code, line_number, offset + 1, text[5:]))
+            return code
+
+    class NoqaFreeChecker(pycodestyle.Checker):
+        """
+        Checker без встроенной обработки # noqa, как в flake8.
+
+        pycodestyle пропускает строку с любым # noqa, даже если комментарий
+        подавляет другой код (# noqa: F401 на длинной строке скрывал E501).
+        Подавление выполняет только _filter_noqa.
+        """
+
+        @property
+        def noqa(self):
+            return False
+
+        @noqa.setter
+        def noqa(self, value):
+            pass
+
+    # Без select/ignore действует DEFAULT_IGNORE - те же исключения, что у flake8
+    style = pycodestyle.StyleGuide(
+        max_line_length=max_line_length,
+        reporter=CollectingReport,
+        checker_class=NoqaFreeChecker,
+        quiet=True,
+    )
+    style.input_file(path, lines=lines)
+    return violations
+
+
+def _pyflakes_violations(path: str, source: str) -> List[Dict[str, Any]]:
+    """
+    Ищет логические ошибки через API pyflakes.
+
+    Args:
+        path: Путь к файлу (для сообщений)
+        source: Исходный код
+
+    Returns:
+        List[Dict[str, Any]]: Нарушения F (и E999 при синтаксической ошибке)
+    """
+    from pyflakes import api as pyflakes_api
+
+    violations = []
+
+    class CollectingReporter:
+        """Репортер pyflakes, переводящий сообщения в коды flake8."""
+
+        def flake(self, message):
+            code = PYFLAKES_CODES.get(type(message).__name__, "F999")
+            text = message.message % message.message_args
+            violations.append(_violation(code, message.lineno, message.col + 1, text))
+
+        def syntaxError(self, filename, msg, lineno, offset, text):
+            # Колонка как у flake8: смещение SyntaxError + 1
+            violations.append(_violation("E999", lineno or 1, (offset or 0) + 1,
+                                         f"SyntaxError: {msg}"))
+
+        def unexpectedError(self, filename, msg):
+            violations.append(_violation("E902", 1, 1, str(msg)))
+
+    pyflakes_api.check(source, path, CollectingReporter())
+    return violations
+
+
+def _filter_noqa(violations: List[Dict[str, Any]],
+                 lines: List[str]) -> List[Dict[str, Any]]:
+    """Убирает нарушения, подавленные комментарием # noqa на их строке."""
+    kept = []
+    for violation in violations:
+        line_index = violation["line"] - 1
+        line = lines[line_index] if 0 <= line_index < len(lines) else ""
+        match = NOQA_PATTERN.search(line)
+        if match:
+            codes = match.group("codes")
+            if codes is None:
+                continue
+            if any(violation["code"].startswith(code.upper())
+                   for code in re.split(r"[,\s]+", codes) if code):
+                continue
+        kept.append(violation)
+    return kept
+
+
+def lint_with_flake8(path: str, max_line_length: int = PEP8_MAX_LINE_LENGTH,
+                     timeout: float = 10) -> List[Dict[str, Any]]:
+    """
+    Запасной вариант: запускает flake8 в subprocess и разбирает его вывод.
+
+    Args:
+        path: Путь к проверяемому файлу
+        max_line_length: Максимальная длина строки
+        timeout: Ограничение времени flake8 в секундах
+
+    Returns:
+        List[Dict[str, Any]]: Нарушения в том же формате, что у lint_file
+    """
+    result = subprocess.run(
+        ["flake8", str(path), f"--max-line-length={max_line_length}"],
+        capture_output=True,
+        text=True,
+        timeout=timeout
+    )
+    violations = []
+    for line in result.stdout.splitlines():
+        match = FLAKE8_LINE_PATTERN.match(line)
+        if match:
+            line_number, column, code, message = match.groups()
+            violations.append(_violation(code, int(line_number), int(column), message))
+    return violations
+
+
+def lint_file(path: str,
+              max_line_length: int = PEP8_MAX_LINE_LENGTH) -> Tuple[List[Dict[str, Any]], str]:
+    """
+    Проверяет файл на PEP8 и логические ошибки в текущем процессе.
+
+    Использует API pycodestyle и pyflakes (те же проверки, что flake8 по
+    умолчанию), без запуска интерпретатора и поиска плагинов на каждый
+    файл. Если библиотеки недоступны, вызывает flake8 в subprocess.
+
+    Args:
+        path: Путь к проверяемому файлу
+        max_line_length: Максимальная длина строки
+
+    Returns:
+        Tuple[List[Dict[str, Any]], str]: Нарушения {code, line, column, message},
+            отсортированные по позиции, и имя движка ("in-process" или "flake8")
+
+    Examples:
+        >>> violations, engine = lint_file("assignment.py")  # doctest: +SKIP
+        >>> engine, violations[0]["code"], violations[0]["line"]  # doctest: +SKIP
+        ('in-process', 'E501', 12)
+    """
+    try:
+        import pycodestyle  # noqa: F401
+        import pyflakes  # noqa: F401
+    except ImportError:
+        return lint_with_flake8(path, max_line_length), "flake8"
+
+    with open(path, "r", encoding="utf-8") as f:
+        source = f.read()
+    lines = source.splitlines(True)
+
+    violations = _pyflakes_violations(str(path), source)
+    # Как flake8: при синтаксической ошибке стиль не проверяется
+    if not any(v["code"] == "E999" for v in violations):
+        violations.extend(_pycodestyle_violations(str(path), lines, max_line_length))
+    violations = _filter_noqa(violations, lines)
+    violations.sort(key=lambda v: (v["line"], v["column"], v["code"]))
+    return violations, "in-process"
+
+
+# ============================================
+# ЗАПУСК ТЕСТОВ В ПРОЦЕССЕ (pytest.main)
+# ============================================
+
+UNIT_TEST_TIMEOUT = 30
+PYTEST_SLOWEST_COUNT = 5
+
+# Модули, импортируемые рабочим процессом pytest заранее
+PYTEST_WARM_MODULES = ("pytest", "numpy", "matplotlib", "matplotlib.pyplot")
+
+
+class PytestResultCollector:
+    """Плагин pytest: собирает исход и длительность каждого теста."""
+
+    def __init__(self):
+        self.tests: Dict[str, Dict[str, Any]] = {}
+        self.collection_errors: List[str] = []
+
+    def pytest_collectreport(self, report):
+        """Запоминает ошибки сбора тестов (например, ImportError в test.py)."""
+        if report.failed:
+            self.collection_errors.append(report.nodeid or "<collection>")
+
+    def pytest_runtest_logreport(self, report):
+        """Суммирует фазы setup/call/teardown в одну запись на тест."""
+        entry = self.tests.setdefault(report.nodeid, {
+            "nodeid": report.nodeid,
+            "outcome": "passed",
+            "duration": 0.0,
+        })
+        entry["duration"] += report.duration
+
+        if report.failed:
+            if entry["outcome"] not in ("failed", "error"):
+                entry["outcome"] = "failed" if report.when == "call" else "error"
+                entry["message"] = _short_failure_message(report)
+        elif report.skipped and entry["outcome"] == "passed":
+            entry["outcome"] = "skipped"
+
+    def summary(self, exit_code: int, duration: float) -> Dict[str, Any]:
+        """
+        Формирует итог прогона для отчета.
+
+        Args:
+            exit_code: Код возврата pytest.main
+            duration: Общее время прогона в секундах
+
+        Returns:
+            Dict[str, Any]: Счетчики исходов, доля пройденных, самые медленные
+                тесты и записи по каждому тесту
+        """
+        tests = list(self.tests.values())
+        for entry in tests:
+            entry["duration"] = round(entry["duration"], 4)
+
+        counts = {outcome: 0 for outcome in ("passed", "failed", "error", "skipped")}
+        for entry in tests:
+            counts[entry["outcome"]] += 1
+        executed = len(tests) - counts["skipped"]
+
+        slowest = sorted(tests, key=lambda entry: entry["duration"], reverse=True)
+        return {
+            "tests_pass": exit_code == 0,
+            "test_engine": "in-process",
+            "exit_code": exit_code,
+            "tests_total": len(tests),
+            "tests_passed": counts["passed"],
+            "tests_failed": counts["failed"],
+            "tests_errors": counts["error"] + len(self.collection_errors),
+            "tests_skipped": counts["skipped"],
+            "pass_rate": round(counts["passed"] / executed, 4) if executed else 0.0,
+            "collection_errors": self.collection_errors,
+            "duration_seconds": round(duration, 4),
+            "slowest_tests": [
+                {key: entry[key] for key in ("nodeid", "outcome", "duration")}
+                for entry in slowest[:PYTEST_SLOWEST_COUNT]
+            ],
+            "tests": tests,
+        }
+
+
+def _short_failure_message(report, limit: int = 300) -> str:
+    """Возвращает короткое сообщение об ошибке теста."""
+    crash = getattr(report.longrepr, "reprcrash", None)
+    if crash is not None:
+        message = crash.message
+    else:
+        lines = str(report.longrepr).strip().splitlines()
+        message = lines[-1] if lines else ""
+    return message[:limit]
+
+
+def _purge_submission_modules(submission_dir: Path):
+    """
+    Выгружает модули решения из sys.modules.
+
+    Удаляются только модули, файлы которых лежат в директории решения,
+    чтобы следующий прогон импортировал код заново. Модули с совпадающими
+    именами (например, json.py в решении) не трогаются: прогретые
+    библиотеки остаются в процессе.
+    """
+    for name, module in list(sys.modules.items()):
+        module_file = getattr(module, "__file__", None)
+        if not module_file:
+            continue
+        try:
+            Path(module_file).resolve().relative_to(submission_dir)
+        except (ValueError, OSError):
+            continue
+        del sys.modules[name]
+
+
+def run_pytest_in_process(test_file: str, submission_dir: str) -> Dict[str, Any]:
+    """
+    Запускает тесты решения через pytest.main в текущем процессе.
+
+    Рабочая директория, sys.path и модули решения восстанавливаются после
+    прогона; вывод pytest не попадает в stdout грейдера.
+
+    Args:
+        test_file: Путь к test.py
+        submission_dir: Директория решения (рабочая директория тестов)
+
+    Returns:
+        Dict[str, Any]: Результат PytestResultCollector.summary
+    """
+    import pytest
+
+    # Пути разрешаются до chdir: относительный test_file иначе указывал бы
+    # внутрь директории решения повторно (sub/sub/test.py)
+    submission_dir = Path(submission_dir).resolve()
+    test_file = Path(test_file).resolve()
+    collector = PytestResultCollector()
+    saved_cwd, saved_path = os.getcwd(), list(sys.path)
+
+    _purge_submission_modules(submission_dir)
+    os.chdir(submission_dir)
+    sys.path.insert(0, str(submission_dir))
+    start = time.perf_counter()
+    try:
+        with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+            exit_code = pytest.main(
+                [str(test_file), "-q", "-p", "no:cacheprovider"],
+                plugins=[collector],
+            )
+    finally:
+        duration = time.perf_counter() - start
+        os.chdir(saved_cwd)
+        sys.path[:] = saved_path
+        _purge_submission_modules(submission_dir)
+        # Фигуры, оставленные тестами, не должны копиться между решениями
+        if "matplotlib.pyplot" in sys.modules:
+            sys.modules["matplotlib.pyplot"].close("all")
+
+    return collector.summary(int(exit_code), duration)
+
+
+def run_pytest_subprocess(test_file: str, submission_dir: str,
+                          timeout: float = UNIT_TEST_TIMEOUT) -> Dict[str, Any]:
+    """
+    Запасной вариант: запускает pytest в subprocess (только код возврата).
+
+    Args:
+        test_file: Путь к test.py
+        submission_dir: Директория решения
+        timeout: Ограничение времени в секундах
+
+    Returns:
+        Dict[str, Any]: tests_pass и test_engine (или test_error)
+    """
+    results = {"tests_pass": False, "test_engine": "subprocess"}
+    try:
+        result = subprocess.run(
+            ["python", "-m", "pytest", str(test_file), "-v"],
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+            cwd=str(submission_dir)
+        )
+        results["tests_pass"] = result.returncode == 0
+    except Exception as e:
+        results["test_error"] = str(e)
+    return results
+
+
+def _pytest_worker_loop(connection, parent_connection, warm_modules: Tuple[str, ...]):
+    """Цикл рабочего процесса: выполняет задания pytest из канала."""
+    # Копия родительского конца канала досталась при fork: без нее recv
+    # получит EOFError, когда родитель завершится, даже аварийно
+    parent_connection.close()
+    # Тесты решений не должны открывать окна
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    for module_name in warm_modules:
+        try:
+            importlib.import_module(module_name)
+        except ImportError:
+            pass
+
+    while True:
+        try:
+            job = connection.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+        test_file, submission_dir = job
+        try:
+            result = run_pytest_in_process(test_file, submission_dir)
+        except Exception as e:
+            result = {"tests_pass": False, "test_error": f"{type(e).__name__}: {e}"}
+        connection.send(result)
+
+
+class PytestWorker:
+    """
+    Переиспользуемый процесс для запуска тестов решений.
+
+    Процесс один раз импортирует pytest, numpy и matplotlib, затем
+    выполняет прогоны pytest.main по очереди. Код решения не влияет на
+    процесс грейдера; при превышении времени или падении процесс
+    завершается и перезапускается при следующем прогоне.
+    """
+
+    def __init__(self, warm_modules: Tuple[str, ...] = PYTEST_WARM_MODULES):
+        """
+        Args:
+            warm_modules: Модули, импортируемые при старте процесса
+        """
+        self.warm_modules = warm_modules
+        self.process = None
+        self.connection = None
+
+    def start(self):
+        """Запускает процесс, если он еще не работает."""
+        if self.process is not None and self.process.is_alive():
+            return
+        parent_connection, child_connection = multiprocessing.Pipe()
+        # Не daemon: тесты решений могут сами создавать процессы
+        self.process = multiprocessing.Process(
+            target=_pytest_worker_loop,
+            args=(child_connection, parent_connection, self.warm_modules),
+        )
+        self.process.start()
+        child_connection.close()
+        self.connection = parent_connection
+
+    def stop(self):
+        """Останавливает процесс (штатно, затем принудительно)."""
+        if self.process is None:
+            return
+        try:
+            self.connection.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=1)
+        self.kill()
+
+    def kill(self):
+        """Немедленно завершает процесс."""
+        if self.process is None:
+            return
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.connection.close()
+        self.process = None
+        self.connection = None
+
+    def run(self, test_file: str, submission_dir: str,
+            timeout: float = UNIT_TEST_TIMEOUT) -> Dict[str, Any]:
+        """
+        Выполняет тесты решения в рабочем процессе.
+
+        Args:
+            test_file: Путь к test.py
+            submission_dir: Директория решения
+            timeout: Ограничение времени в секундах
+
+        Returns:
+            Dict[str, Any]: Результат run_pytest_in_process или
+                {"tests_pass": False, "test_error": ...}
+        """
+        self.start()
+        # Рабочая директория процесса могла разойтись с текущей: передаем
+        # абсолютные пути
+        job = (str(Path(test_file).resolve()), str(Path(submission_dir).resolve()))
+        try:
+            self.connection.send(job)
+            if not self.connection.poll(timeout):
+                self.kill()
+                return {"tests_pass": False, "test_engine": "in-process",
+                        "test_error": f"Tests exceeded {timeout} s"}
+            return self.connection.recv()
+        except (EOFError, OSError):
+            # Процесс упал посреди прогона (например, os._exit в тестах)
+            self.process.join(timeout=1)
+            exit_code = self.process.exitcode
+            self.kill()
+            return {"tests_pass": False, "test_engine": "in-process",
+                    "test_error": f"Test worker exited with code {exit_code}"}
+        except BaseException:
+            # Например, GradingTimeout в пакетном режиме
+            self.kill()
+            raise
+
+
+_pytest_worker = None
+_pytest_worker_pid = None
+
+
+def get_pytest_worker() -> PytestWorker:
+    """
+    Возвращает общий для процесса PytestWorker (создается при первом вызове).
+
+    Процесс пула, созданный через fork, наследует объект родителя, но не
+    может управлять чужим дочерним процессом, поэтому получает свой.
+    """
+    global _pytest_worker, _pytest_worker_pid
+    if _pytest_worker is None or _pytest_worker_pid != os.getpid():
+        _pytest_worker = PytestWorker()
+        _pytest_worker_pid = os.getpid()
+        # Финализатор с приоритетом выполняется и в процессах пула, причем
+        # до того, как multiprocessing начнет ждать дочерние процессы
+        multiprocessing.util.Finalize(None, _pytest_worker.stop, exitpriority=10)
+    return _pytest_worker
+
+
 class AssignmentGrader:
     """Автоматический грейдер для проверки заданий."""
 
@@ -57,6 +665,42 @@ class AssignmentGrader:
         self.config = VARIANT_CONFIGS.get(variant, {})
         self.results = {}
         self.score = 0.0
+        # Результаты проверок текущего прогона (имя метода -> результат)
+        self.check_results: Dict[str, Any] = {}
+        self.report = None
+
+    def run_check(self, check_name: str) -> Any:
+        """
+        Выполняет проверку один раз за прогон и возвращает ее результат.
+
+        Повторные вызовы (из отчета, подсчета балла или других проверок)
+        берут результат из хранилища, не запуская flake8/pytest заново.
+
+        Args:
+            check_name: Имя метода проверки, например "check_code_quality"
+
+        Returns:
+            Any: Результат проверки
+        """
+        if check_name not in self.check_results:
+            self.check_results[check_name] = getattr(self, check_name)()
+        return self.check_results[check_name]
+
+    def collect_results(self) -> Dict[str, Any]:
+        """
+        Собирает результаты всех проверок отчета.
+
+        Returns:
+            Dict[str, Any]: Ключ отчета -> результат проверки
+        """
+        return {key: self.run_check(name) for key, name in REPORT_CHECKS.items()}
+
+    def reset(self):
+        """Сбрасывает результаты, чтобы следующий отчет перепроверил решение."""
+        self.check_results = {}
+        self.report = None
+        self.results = {}
+        self.score = 0.0
 
     def check_files_exist(self) -> Dict[str, bool]:
         """Проверяет наличие всех необходимых файлов."""
@@ -79,17 +723,13 @@ class AssignmentGrader:
         if not assignment_file.exists():
             return {"error": "Assignment file not found"}
 
-        # Проверка PEP8 с flake8
+        # Проверка PEP8 (pycodestyle + pyflakes в процессе, flake8 как запасной)
         try:
-            result = subprocess.run(
-                ["flake8", str(assignment_file), "--max-line-length=100"],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            violations = len(result.stdout.strip().split("\n")) if result.stdout else 0
-            results["pep8_violations"] = violations
-            results["pep8_pass"] = result.returncode == 0
+            violations, engine = lint_file(str(assignment_file))
+            results["pep8_violations"] = len(violations)
+            results["pep8_pass"] = not violations
+            results["pep8_engine"] = engine
+            results["pep8_details"] = violations
         except Exception as e:
             results["pep8_error"] = str(e)
             results["pep8_pass"] = False
@@ -329,7 +969,7 @@ class AssignmentGrader:
             results["has_inline_comments"] = len(comment_lines) > 2
         
         # README
-        readme_check = self.check_readme_comprehensive()
+        readme_check = self.run_check("check_readme_comprehensive")
         results.update({f"readme_{k}": v for k, v in readme_check.items()})
         
         return results
@@ -348,18 +988,16 @@ class AssignmentGrader:
 
         results["test_file_exists"] = True
         
-        # Проверка запуска тестов
-        try:
-            result = subprocess.run(
-                ["python", "-m", "pytest", str(test_file), "-v"],
-                capture_output=True,
-                text=True,
-                timeout=30,
-                cwd=str(self.submission_dir)
-            )
-            results["tests_pass"] = result.returncode == 0
-        except Exception as e:
-            results["test_error"] = str(e)
+        # Запуск тестов: pytest.main в прогретом рабочем процессе
+        # (исходы и длительности по тестам), иначе pytest в subprocess
+        if importlib.util.find_spec("pytest") is not None:
+            results.update(get_pytest_worker().run(
+                test_file, self.submission_dir, UNIT_TEST_TIMEOUT
+            ))
+        else:
+            results.update(run_pytest_subprocess(
+                test_file, self.submission_dir, UNIT_TEST_TIMEOUT
+            ))
 
         return results
 
@@ -403,13 +1041,15 @@ class AssignmentGrader:
         # ============================================
         # ШАГ 1: Собираем результаты всех проверок
         # ============================================
-        self.results = {
-            "code_quality": self.check_code_quality(),
-            "dataset_validation": self.check_dataset_validation(),
-            "documentation": self.check_documentation(),
-            "unit_tests": self.check_unit_tests(),
-            "output_format": self.check_output_format(),
-        }
+        # Проверки, уже выполненные в этом прогоне, не запускаются повторно
+        results = self.collect_results()
+        self.results = {key: results[key] for key in (
+            "code_quality",
+            "dataset_validation",
+            "documentation",
+            "unit_tests",
+            "output_format",
+        )}
         
         # ============================================
         # ШАГ 2: Определяем веса
@@ -647,7 +1287,8 @@ class AssignmentGrader:
         if tests.get("tests_pass", False):
             return 1.0
         else:
-            return 0.3
+            # Частичный балл за долю пройденных тестов
+            return 0.3 + 0.6 * tests.get("pass_rate", 0.0)
     
     
     def _score_functionality_section(self) -> float:
@@ -683,22 +1324,24 @@ class AssignmentGrader:
         
 
     def generate_report(self) -> Dict:
-        """Генерирует итоговый отчет."""
-        report = {
-            "variant": self.variant,
-            "files_check": self.check_files_exist(),
-            "code_quality": self.check_code_quality(),
-            "dataset_validation": self.check_dataset_validation(),
-            "documentation": self.check_documentation(),
-            "unit_tests": self.check_unit_tests(),
-            "output_format": self.check_output_format(),
-            "overall_score": self.calculate_score(),
-        }
+        """
+        Генерирует итоговый отчет.
 
+        Каждая проверка выполняется один раз; повторный вызов возвращает
+        уже готовый отчет (для перепроверки используйте reset()).
+        """
+        if self.report is not None:
+            return self.report
+
+        report = {"variant": self.variant}
+        report.update(self.collect_results())
+        report["overall_score"] = self.calculate_score()
+
+        self.report = report
         return report
 
     def save_report(self, output_file: str = "grading_report.json"):
-        """Сохраняет отчет в JSON файл."""
+        """Сохраняет отчет в JSON файл (без повторной проверки)."""
         report = self.generate_report()
         with open(output_file, "w") as f:
             json.dump(report, f, indent=2)
@@ -706,10 +1349,285 @@ class AssignmentGrader:
         return report
 
 
+# ============================================
+# ПАКЕТНАЯ ПРОВЕРКА
+# ============================================
+
+class GradingTimeout(BaseException):
+    """
+    Проверка решения превысила отведенное время.
+
+    Наследуется от BaseException, чтобы не перехватываться
+    блоками `except Exception` внутри проверок.
+    """
+
+
+def _raise_grading_timeout(signum, frame):
+    """Обработчик SIGALRM: прерывает текущую проверку."""
+    raise GradingTimeout()
+
+
+def validate_submission(submission_dir: str, variant: int) -> Optional[str]:
+    """
+    Проверяет входные параметры проверки решения.
+
+    Args:
+        submission_dir: Путь к директории с решением
+        variant: Номер варианта (1-10)
+
+    Returns:
+        Optional[str]: Текст ошибки или None, если параметры корректны
+    """
+    if not Path(submission_dir).exists():
+        return f"Submission directory not found: {submission_dir}"
+    if variant < 1 or variant > 10:
+        return f"Invalid variant. Must be 1-10, got {variant}"
+    return None
+
+
+def grade_submission(submission_dir: str, variant: int,
+                     timeout: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Проверяет одно решение и возвращает запись для пакетного отчета.
+
+    Ошибки и превышение времени не прерывают пакет, а попадают в запись
+    со статусом "invalid", "timeout" или "error".
+
+    Args:
+        submission_dir: Путь к директории с решением
+        variant: Номер варианта (1-10)
+        timeout: Ограничение времени на решение в секундах (None - без ограничения)
+
+    Returns:
+        Dict[str, Any]: Запись с полями submission_dir, variant, status,
+            elapsed_seconds и overall_score/report либо error
+    """
+    record = {"submission_dir": str(submission_dir), "variant": variant}
+    error = validate_submission(submission_dir, variant)
+    if error:
+        record.update({"status": "invalid", "error": error, "elapsed_seconds": 0.0})
+        return record
+
+    # SIGALRM доступен только в главном потоке на Unix; запущенный
+    # flake8/pytest subprocess.run завершит сам при прерывании
+    use_alarm = (
+        timeout is not None
+        and hasattr(signal, "SIGALRM")
+        and threading.current_thread() is threading.main_thread()
+    )
+    if use_alarm:
+        previous_handler = signal.signal(signal.SIGALRM, _raise_grading_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+
+    start = time.perf_counter()
+    try:
+        report = AssignmentGrader(submission_dir, variant).generate_report()
+        record.update({
+            "status": "ok",
+            "overall_score": report["overall_score"],
+            "report": report,
+        })
+    except GradingTimeout:
+        record.update({"status": "timeout", "error": f"Grading exceeded {timeout} s"})
+    except Exception as e:
+        record.update({"status": "error", "error": f"{type(e).__name__}: {e}"})
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous_handler)
+    record["elapsed_seconds"] = round(time.perf_counter() - start, 3)
+    return record
+
+
+def load_manifest(manifest_path: str) -> List[Tuple[str, int]]:
+    """
+    Загружает манифест пакетной проверки.
+
+    Поддерживаются JSON-объект {"<submission_dir>": <variant>} (файл .json)
+    и текстовый формат: по одной строке "<submission_dir> <variant>",
+    строки с # игнорируются. Относительные пути считаются от манифеста.
+
+    Args:
+        manifest_path: Путь к файлу манифеста
+
+    Returns:
+        List[Tuple[str, int]]: Пары (директория, вариант) в порядке манифеста
+
+    Raises:
+        ValueError: Если строка или вариант в манифесте некорректны
+    """
+    manifest = Path(manifest_path)
+    base_dir = manifest.parent
+
+    if manifest.suffix == ".json":
+        with open(manifest, "r", encoding="utf-8") as f:
+            entries = list(json.load(f).items())
+    else:
+        entries = []
+        with open(manifest, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                parts = line.rsplit(maxsplit=1)
+                if len(parts) != 2:
+                    raise ValueError(
+                        f"{manifest_path}:{line_number}: expected '<submission_dir> <variant>'"
+                    )
+                entries.append((parts[0], parts[1]))
+
+    submissions = []
+    for submission_dir, variant in entries:
+        try:
+            variant = int(variant)
+        except ValueError:
+            raise ValueError(f"variant must be integer, got {variant} for {submission_dir}")
+        submissions.append((str(base_dir / submission_dir), variant))
+    return submissions
+
+
+def warm_worker():
+    """
+    Инициализатор рабочего процесса: импортирует линтеры и запускает
+    прогретый PytestWorker.
+
+    Это выполняется один раз на процесс пула, а не на каждое решение.
+    """
+    try:
+        import pycodestyle  # noqa: F401
+        from pyflakes import api  # noqa: F401
+    except ImportError:
+        pass
+    if importlib.util.find_spec("pytest") is not None:
+        get_pytest_worker().start()
+
+
+def run_batch(submissions: List[Tuple[str, int]], output_file: str = BATCH_REPORT_FILE,
+              workers: Optional[int] = None,
+              timeout: Optional[float] = BATCH_DEFAULT_TIMEOUT) -> List[Dict[str, Any]]:
+    """
+    Параллельно проверяет решения на пуле процессов.
+
+    Записи пишутся в JSONL-отчет (по одной на строку) в порядке входного
+    списка: каждая запись выводится, как только готовы все предыдущие,
+    поэтому отчет детерминирован, а прерванный пакет сохраняет уже
+    записанные решения.
+
+    Args:
+        submissions: Пары (директория, вариант)
+        output_file: Путь к агрегированному JSONL-отчету
+        workers: Число процессов (None - по числу CPU)
+        timeout: Ограничение времени на одно решение в секундах
+
+    Returns:
+        List[Dict[str, Any]]: Записи в порядке входного списка
+    """
+    records: List[Optional[Dict[str, Any]]] = [None] * len(submissions)
+    total = len(submissions)
+    # Первая запись, еще не выведенная в отчет
+    next_index = 0
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=warm_worker) as executor, \
+            open(output_file, "w", encoding="utf-8") as out:
+        futures = {
+            executor.submit(grade_submission, submission_dir, variant, timeout): index
+            for index, (submission_dir, variant) in enumerate(submissions)
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            index = futures[future]
+            submission_dir, variant = submissions[index]
+            try:
+                record = future.result()
+            except Exception as e:
+                # Например, рабочий процесс аварийно завершился
+                record = {
+                    "submission_dir": submission_dir,
+                    "variant": variant,
+                    "status": "error",
+                    "error": f"{type(e).__name__}: {e}",
+                }
+            records[index] = record
+            while next_index < total and records[next_index] is not None:
+                out.write(json.dumps(records[next_index], ensure_ascii=False) + "\n")
+                next_index += 1
+            out.flush()
+
+            score = record.get("overall_score")
+            score_text = f"{score:.2f}" if score is not None else "-"
+            print(f"[{done}/{total}] {record['status']:<7} {score_text:>4}  {submission_dir}")
+
+    return records
+
+
+def batch_main(argv: List[str]) -> int:
+    """
+    Точка входа пакетного режима.
+
+    Args:
+        argv: Аргументы командной строки после "batch"
+
+    Returns:
+        int: Код возврата (0 - все решения проверены)
+    """
+    parser = argparse.ArgumentParser(
+        prog="autograder.py batch",
+        description="Parallel grading of many submissions into one JSONL report",
+    )
+    parser.add_argument("submission_dirs", nargs="*",
+                        help="Submission directories (graded with --variant)")
+    parser.add_argument("--variant", type=int,
+                        help="Variant for all submission_dirs")
+    parser.add_argument("--manifest",
+                        help="Manifest: .json {dir: variant} or lines '<dir> <variant>'")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of worker processes (default: CPU count)")
+    parser.add_argument("--timeout", type=float, default=BATCH_DEFAULT_TIMEOUT,
+                        help="Per-submission timeout in seconds (0 disables)")
+    parser.add_argument("--output", default=BATCH_REPORT_FILE,
+                        help="Aggregated JSONL report path")
+    args = parser.parse_args(argv)
+
+    submissions = []
+    if args.submission_dirs:
+        if args.variant is None:
+            parser.error("--variant is required with submission directories")
+        submissions.extend((d, args.variant) for d in args.submission_dirs)
+    if args.manifest:
+        try:
+            submissions.extend(load_manifest(args.manifest))
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+    if not submissions:
+        parser.error("no submissions: pass directories with --variant or --manifest")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be >= 1")
+
+    timeout = args.timeout if args.timeout and args.timeout > 0 else None
+    start = time.perf_counter()
+    records = run_batch(submissions, args.output, args.workers, timeout)
+    elapsed = time.perf_counter() - start
+
+    graded = [r for r in records if r["status"] == "ok"]
+    failed = len(records) - len(graded)
+    print(f"\nGraded {len(graded)}/{len(records)} submissions in {elapsed:.1f} s")
+    if graded:
+        mean_score = sum(r["overall_score"] for r in graded) / len(graded)
+        print(f"Mean Score: {mean_score:.2f}/1.0")
+    if failed:
+        print(f"Failed: {failed} (see status/error in the report)")
+    print(f"Report saved to: {args.output}")
+    return 0 if failed == 0 else 1
+
+
 def main():
     """Основная функция автопроверки."""
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        sys.exit(batch_main(sys.argv[2:]))
+
     if len(sys.argv) < 3:
         print("Usage: python autograder.py <submission_dir> <variant>")
+        print("       python autograder.py batch [<submission_dir> ...] --variant N "
+              "| --manifest FILE [--workers N] [--timeout S] [--output FILE]")
         sys.exit(1)
 
     submission_dir = sys.argv[1]
@@ -719,12 +1637,9 @@ def main():
         print(f"Error: variant must be integer, got {sys.argv[2]}")
         sys.exit(1)
 
-    if not Path(submission_dir).exists():
-        print(f"Error: Submission directory not found: {submission_dir}")
-        sys.exit(1)
-
-    if variant < 1 or variant > 10:
-        print(f"Error: Invalid variant. Must be 1-10, got {variant}")
+    error = validate_submission(submission_dir, variant)
+    if error:
+        print(f"Error: {error}")
         sys.exit(1)
 
     grader = AssignmentGrader(submission_dir, variant)
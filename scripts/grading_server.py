@@ -0,0 +1,555 @@
+"""
+Сервер автопроверки с прогретым пулом рабочих процессов.
+
+Принимает решения по HTTP, ставит их в очередь и проверяет на пуле
+процессов AssignmentGrader. Рабочие процессы один раз импортируют
+линтеры и запускают PytestWorker с numpy, matplotlib и pytest, поэтому
+каждая проверка обходится без холодного старта интерпретатора.
+
+Запуск сервера:
+    python grading_server.py serve --port 8765 --workers 4
+
+Отправка решения (например, из CI):
+    python grading_server.py submit ./submission 2 --wait
+
+API:
+    POST /submissions              {"submission_dir": ..., "variant": N}
+                                   -> 202 {"id": ..., "status": "queued", ...}
+    GET  /submissions/<id>         статус задания и запись проверки
+    GET  /submissions/<id>?wait=S  ждать результат до S секунд
+    GET  /health                   состояние пула и очереди (503, если пул сломан)
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import signal
+import argparse
+import threading
+import urllib.error
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+from autograder import (
+    BATCH_DEFAULT_TIMEOUT,
+    grade_submission,
+    validate_submission,
+    warm_worker,
+)
+
+# ============================================
+# НАСТРОЙКИ СЕРВЕРА
+# ============================================
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_SERVER_URL = f"http://{DEFAULT_HOST}:{DEFAULT_PORT}"
+
+# Сколько завершенных заданий хранить в памяти
+JOB_HISTORY_LIMIT = 1000
+
+# Максимальное ожидание результата в одном запросе (?wait=...)
+MAX_WAIT_SECONDS = 60.0
+
+# Сколько раз перезапускать задание, если во время проверки сломался пул
+POOL_RETRY_LIMIT = 1
+
+
+def _worker_pid() -> int:
+    """Пустое задание для прогрева: возвращает PID рабочего процесса."""
+    time.sleep(0.1)
+    return os.getpid()
+
+
+class GradingService:
+    """
+    Очередь заданий проверки поверх прогретого пула процессов.
+
+    Задания выполняются в порядке поступления; статус и запись проверки
+    хранятся в памяти (не более JOB_HISTORY_LIMIT завершенных). Если рабочий
+    процесс аварийно завершился и пул сломан (BrokenProcessPool), пул
+    пересоздается, а затронутые задания перезапускаются (POOL_RETRY_LIMIT раз).
+    """
+
+    def __init__(self, workers: Optional[int] = None,
+                 timeout: Optional[float] = BATCH_DEFAULT_TIMEOUT):
+        """
+        Args:
+            workers: Число рабочих процессов (None - по числу CPU)
+            timeout: Ограничение времени на одно решение в секундах
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.executor = self._create_executor()
+        self.jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.futures = {}
+        self.lock = threading.Lock()
+        # Состояние пула для /health
+        self.pool_broken = False
+        self.pool_restarts = 0
+        self.pool_error: Optional[str] = None
+        self.closed = False
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        """Создает пул процессов с прогревом рабочих процессов."""
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=warm_worker)
+
+    def _restart_pool(self, broken: ProcessPoolExecutor, error: BaseException):
+        """
+        Заменяет сломанный пул новым. Вызывается под self.lock.
+
+        Пул пересоздается только один раз, даже если о поломке сообщили
+        несколько заданий: если self.executor уже не broken, ничего не делается.
+
+        Args:
+            broken: Пул, в котором произошла ошибка
+            error: Ошибка BrokenProcessPool
+        """
+        if self.executor is not broken or self.closed:
+            return
+        self.pool_broken = True
+        self.pool_error = f"{type(error).__name__}: {error}"
+        broken.shutdown(wait=False, cancel_futures=True)
+        try:
+            self.executor = self._create_executor()
+        except OSError as e:
+            # Пул остается сломанным, /health сообщает об этом
+            self.pool_error = f"{type(e).__name__}: {e}"
+            return
+        self.pool_broken = False
+        self.pool_restarts += 1
+        print(f"Worker pool was broken ({self.pool_error}), restarted", file=sys.stderr)
+
+    def _submit_job(self, job: Dict[str, Any]) -> Tuple[Any, ProcessPoolExecutor]:
+        """
+        Отправляет задание в пул. Вызывается под self.lock.
+
+        Если пул уже сломан, он пересоздается и отправка повторяется один раз.
+
+        Args:
+            job: Задание из self.jobs
+
+        Returns:
+            Tuple[Any, ProcessPoolExecutor]: Future задания и пул, в который оно отправлено
+        """
+        args = (grade_submission, job["submission_dir"], job["variant"], job["timeout"])
+        executor = self.executor
+        try:
+            future = executor.submit(*args)
+        except BrokenProcessPool as e:
+            self._restart_pool(executor, e)
+            executor = self.executor
+            future = executor.submit(*args)
+        job["attempts"] += 1
+        self.futures[job["id"]] = future
+        return future, executor
+
+    def warm_up(self):
+        """Запускает все рабочие процессы заранее, до первых решений."""
+        pids = [self.executor.submit(_worker_pid) for _ in range(self.workers)]
+        for future in pids:
+            future.result()
+
+    def submit(self, submission_dir: str, variant: int,
+               timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Ставит решение в очередь проверки.
+
+        Args:
+            submission_dir: Путь к директории с решением
+            variant: Номер варианта (1-10)
+            timeout: Ограничение времени (None - значение сервера)
+
+        Returns:
+            Dict[str, Any]: Публичное описание задания
+
+        Raises:
+            ValueError: Если директория или вариант некорректны
+            BrokenProcessPool: Если пул сломан и пересоздать его не удалось
+        """
+        submission_dir = os.path.abspath(submission_dir)
+        error = validate_submission(submission_dir, variant)
+        if error:
+            raise ValueError(error)
+
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            "id": job_id,
+            "status": "queued",
+            "submission_dir": submission_dir,
+            "variant": variant,
+            "timeout": timeout if timeout is not None else self.timeout,
+            "attempts": 0,
+            "submitted_at": time.time(),
+        }
+        with self.lock:
+            self.jobs[job_id] = job
+            try:
+                future, executor = self._submit_job(job)
+            except BrokenProcessPool:
+                del self.jobs[job_id]
+                raise
+        self._watch(job_id, future, executor)
+        return self.describe(job_id)
+
+    def _watch(self, job_id: str, future, executor: ProcessPoolExecutor):
+        """Подписывает _finish на завершение future из пула executor."""
+        future.add_done_callback(lambda done: self._finish(job_id, done, executor))
+
+    def _finish(self, job_id: str, future, executor: ProcessPoolExecutor):
+        """
+        Сохраняет запись проверки после завершения задания.
+
+        Если задание упало из-за сломанного пула, пул пересоздается и задание
+        перезапускается, пока не исчерпан POOL_RETRY_LIMIT.
+        """
+        broken = None
+        try:
+            record = future.result()
+        except BrokenProcessPool as e:
+            broken = e
+            record = {"status": "error", "error": f"{type(e).__name__}: {e}"}
+        except Exception as e:
+            record = {"status": "error", "error": f"{type(e).__name__}: {e}"}
+
+        retry = None
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return
+            if broken is not None:
+                self._restart_pool(executor, broken)
+                if job["attempts"] <= POOL_RETRY_LIMIT and not self.closed:
+                    try:
+                        retry = self._submit_job(job)
+                    except BrokenProcessPool:
+                        pass
+            if retry is None:
+                job["status"] = "done" if record.get("status") == "ok" else "failed"
+                job["finished_at"] = time.time()
+                job["record"] = record
+                self.futures.pop(job_id, None)
+                self._evict_finished()
+        # Подписка вне блокировки: колбэк готового future вызывается сразу
+        if retry is not None:
+            self._watch(job_id, *retry)
+
+    def _evict_finished(self):
+        """Удаляет самые старые завершенные задания сверх лимита."""
+        finished = [job_id for job_id, job in self.jobs.items() if "record" in job]
+        for job_id in finished[:max(0, len(finished) - JOB_HISTORY_LIMIT)]:
+            del self.jobs[job_id]
+
+    def describe(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Возвращает копию задания с актуальным статусом.
+
+        Args:
+            job_id: Идентификатор задания
+
+        Returns:
+            Optional[Dict[str, Any]]: Задание или None, если оно неизвестно
+        """
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            job = dict(job)
+            future = self.futures.get(job_id)
+        if job["status"] == "queued" and future is not None and future.running():
+            job["status"] = "running"
+        return job
+
+    def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Ждет завершения задания не дольше timeout секунд.
+
+        Args:
+            job_id: Идентификатор задания
+            timeout: Максимальное ожидание в секундах
+
+        Returns:
+            Optional[Dict[str, Any]]: Задание (возможно, еще не завершенное)
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            with self.lock:
+                future = self.futures.get(job_id)
+            remaining = deadline - time.monotonic()
+            if future is None or remaining <= 0:
+                break
+            try:
+                future.result(timeout=remaining)
+            except FutureTimeoutError:
+                break
+            except Exception:
+                # Ошибка записывается в задание через _finish
+                pass
+            # Колбэк _finish мог еще не отработать или перезапустить задание
+            # в новом пуле: тогда ждем уже новый future
+            while self.futures.get(job_id) is future and time.monotonic() < deadline:
+                time.sleep(0.01)
+        return self.describe(job_id)
+
+    def health(self) -> Dict[str, Any]:
+        """
+        Возвращает состояние пула и число заданий по статусам.
+
+        status равен "broken", если пул сломан и пересоздать его не удалось.
+        """
+        with self.lock:
+            job_ids = list(self.jobs)
+            pool = {
+                "broken": self.pool_broken,
+                "restarts": self.pool_restarts,
+                "last_error": self.pool_error,
+            }
+        counts = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+        for job_id in job_ids:
+            job = self.describe(job_id)
+            if job is not None:
+                counts[job["status"]] += 1
+        return {
+            "status": "broken" if pool["broken"] else "ok",
+            "workers": self.workers,
+            "pool": pool,
+            "jobs": counts,
+        }
+
+    def shutdown(self):
+        """Отменяет ожидающие задания и останавливает пул."""
+        with self.lock:
+            self.closed = True
+            executor = self.executor
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+# ============================================
+# HTTP
+# ============================================
+
+class GradingRequestHandler(BaseHTTPRequestHandler):
+    """Обработчик HTTP API сервера автопроверки."""
+
+    server_version = "GradingServer/1.0"
+
+    @property
+    def service(self) -> GradingService:
+        return self.server.grading_service
+
+    def _send_json(self, status: int, payload: Dict[str, Any]):
+        """Отправляет JSON-ответ."""
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        """POST /submissions: ставит решение в очередь."""
+        if urlparse(self.path).path.rstrip("/") != "/submissions":
+            self._send_json(404, {"error": "Not found"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            submission_dir = payload["submission_dir"]
+            variant = int(payload["variant"])
+            timeout = payload.get("timeout")
+            timeout = float(timeout) if timeout is not None else None
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {"error": f"Invalid request: {e}"})
+            return
+
+        try:
+            job = self.service.submit(submission_dir, variant, timeout)
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        except BrokenProcessPool as e:
+            self._send_json(503, {"error": f"Worker pool is broken: {e}"})
+            return
+        job["url"] = f"/submissions/{job['id']}"
+        self._send_json(202, job)
+
+    def do_GET(self):
+        """GET /health и GET /submissions/<id>[?wait=S]."""
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split("/") if part]
+
+        if parts == ["health"]:
+            health = self.service.health()
+            self._send_json(200 if health["status"] == "ok" else 503, health)
+            return
+
+        if len(parts) == 2 and parts[0] == "submissions":
+            query = parse_qs(url.query)
+            try:
+                wait = float(query.get("wait", ["0"])[0])
+            except ValueError:
+                self._send_json(400, {"error": "wait must be a number"})
+                return
+
+            wait = min(max(wait, 0.0), MAX_WAIT_SECONDS)
+            if wait > 0:
+                job = self.service.wait(parts[1], wait)
+            else:
+                job = self.service.describe(parts[1])
+            if job is None:
+                self._send_json(404, {"error": f"Unknown submission: {parts[1]}"})
+            else:
+                self._send_json(200, job)
+            return
+
+        self._send_json(404, {"error": "Not found"})
+
+
+def _raise_keyboard_interrupt(signum, frame):
+    """Обработчик SIGTERM: останавливает serve_forever."""
+    raise KeyboardInterrupt
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+          workers: Optional[int] = None,
+          timeout: Optional[float] = BATCH_DEFAULT_TIMEOUT):
+    """
+    Запускает сервер автопроверки (до Ctrl+C).
+
+    Args:
+        host: Адрес для прослушивания
+        port: Порт
+        workers: Число рабочих процессов (None - по числу CPU)
+        timeout: Ограничение времени на одно решение в секундах
+    """
+    service = GradingService(workers, timeout)
+    print(f"Warming up {service.workers} grading worker(s)...")
+    service.warm_up()
+
+    # SIGTERM (остановка службы) завершает сервер так же, как Ctrl+C;
+    # обработчик ставится после прогрева, чтобы его не унаследовал пул
+    signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
+
+    server = ThreadingHTTPServer((host, port), GradingRequestHandler)
+    server.grading_service = service
+    print(f"Grading server listening on http://{host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down...")
+    finally:
+        server.server_close()
+        service.shutdown()
+
+
+# ============================================
+# КЛИЕНТ
+# ============================================
+
+def _request(method: str, url: str, payload: Optional[Dict[str, Any]] = None,
+             timeout: float = MAX_WAIT_SECONDS + 10) -> Dict[str, Any]:
+    """
+    Выполняет HTTP-запрос к серверу и возвращает JSON-ответ.
+
+    Raises:
+        RuntimeError: Если сервер вернул ошибку или недоступен
+    """
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    request = urllib.request.Request(
+        url, data=data, method=method,
+        headers={"Content-Type": "application/json"},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read().decode("utf-8"))
+    except urllib.error.HTTPError as e:
+        message = json.loads(e.read().decode("utf-8") or "{}").get("error", e.reason)
+        raise RuntimeError(f"Server error {e.code}: {message}")
+    except urllib.error.URLError as e:
+        raise RuntimeError(f"Cannot reach grading server at {url}: {e.reason}")
+
+
+def submit(server_url: str, submission_dir: str, variant: int, wait: bool = False,
+           timeout: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Отправляет решение на сервер и при wait=True ждет результат.
+
+    Args:
+        server_url: Адрес сервера, например http://127.0.0.1:8765
+        submission_dir: Путь к директории с решением
+        variant: Номер варианта (1-10)
+        wait: Ждать завершения проверки
+        timeout: Ограничение времени проверки (None - значение сервера)
+
+    Returns:
+        Dict[str, Any]: Задание (с записью проверки, если она готова)
+    """
+    server_url = server_url.rstrip("/")
+    payload = {"submission_dir": os.path.abspath(submission_dir), "variant": variant}
+    if timeout is not None:
+        payload["timeout"] = timeout
+    job = _request("POST", f"{server_url}/submissions", payload)
+
+    while wait and job["status"] in ("queued", "running"):
+        job = _request("GET", f"{server_url}/submissions/{job['id']}?wait={MAX_WAIT_SECONDS}")
+    return job
+
+
+def main():
+    """Точка входа: serve (сервер) или submit (клиент)."""
+    parser = argparse.ArgumentParser(description="Grading server with a warm worker pool")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="Run the grading server")
+    serve_parser.add_argument("--host", default=DEFAULT_HOST)
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument("--workers", type=int, default=None,
+                              help="Number of worker processes (default: CPU count)")
+    serve_parser.add_argument("--timeout", type=float, default=BATCH_DEFAULT_TIMEOUT,
+                              help="Per-submission timeout in seconds (0 disables)")
+
+    submit_parser = commands.add_parser("submit", help="Submit a solution for grading")
+    submit_parser.add_argument("submission_dir")
+    submit_parser.add_argument("variant", type=int)
+    submit_parser.add_argument("--server", default=DEFAULT_SERVER_URL)
+    submit_parser.add_argument("--wait", action="store_true",
+                               help="Wait for the report and print it")
+    submit_parser.add_argument("--timeout", type=float, default=None,
+                               help="Per-submission timeout in seconds")
+
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        if args.workers is not None and args.workers < 1:
+            parser.error("--workers must be >= 1")
+        timeout = args.timeout if args.timeout and args.timeout > 0 else None
+        serve(args.host, args.port, args.workers, timeout)
+        return
+
+    try:
+        job = submit(args.server, args.submission_dir, args.variant, args.wait, args.timeout)
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    print(json.dumps(job, indent=2, ensure_ascii=False))
+    record = job.get("record")
+    if record is None:
+        print(f"\nQueued as {job['id']}: {args.server.rstrip('/')}{job['url']}")
+    elif record.get("status") == "ok":
+        print(f"\nOverall Score: {record['overall_score']:.2f}/1.0")
+    else:
+        print(f"\nGrading {record.get('status')}: {record.get('error')}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+Тесты автоматического грейдера (scripts/autograder.py).
+
+Решения для проверки создаются во временных директориях: маленький
+assignment.py и test.py с нужным поведением (проходит, падает, зависает).
+"""
+
+import importlib.util
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from autograder import (  # noqa: E402
+    AssignmentGrader,
+    _filter_noqa,
+    _purge_submission_modules,
+    get_pytest_worker,
+    grade_submission,
+    lint_file,
+    lint_with_flake8,
+    load_manifest,
+    run_batch,
+)
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+# Исходники с нарушениями, на которых линтер в процессе сверяется с flake8
+LINT_CASES = {
+    "syntax_error": "def f(:\n  pass\n",
+    "noqa": ("import os  # noqa\nimport re  # noqa: E501\n"
+             "import sys  # NOQA:F401,E501\nx=1  # noqa:E225\n"),
+    # # noqa с другим кодом не подавляет E501 и логические проверки строки
+    "noqa_other_code": ("import os  # noqa: F401\nvalue = '" + "a" * 90 + "'  # noqa: F401\n"
+                        "x=(1,  # noqa: F401\n   2)\n"),
+    "tabs": "if True:\n\tx = 1\n\ty = 2\n",
+    "no_eof_newline": "x = 1",
+    "crlf": "import os\r\nx=1\r\n",
+    "mixed": ("import json\n\n\n\ndef f(a, a):\n    y = 1\n    return undefined\n"
+              "z = '" + "a" * 120 + "'\n"),
+}
+
+# Решение, у которого проходит один тест из двух
+ASSIGNMENT_SOURCE = '''"""Минимальное решение."""
+
+
+def value() -> int:
+    """Возвращает 1."""
+    return 1
+'''
+
+PARTIAL_TEST_SOURCE = '''import assignment
+
+
+def test_value():
+    assert assignment.value() == 1
+
+
+def test_wrong_value():
+    assert assignment.value() == 2
+'''
+
+PASSING_TEST_SOURCE = '''import assignment
+
+
+def test_value():
+    assert assignment.value() == 1
+'''
+
+# Тест, который не укладывается в ограничение времени проверки
+SLEEPING_TEST_SOURCE = '''import time
+
+
+def test_sleep():
+    time.sleep(60)
+'''
+
+
+def make_submission(directory: str, test_source: str = PASSING_TEST_SOURCE) -> str:
+    """
+    Создает решение с assignment.py, README.md и test.py.
+
+    Args:
+        directory: Директория решения (создается при необходимости)
+        test_source: Содержимое test.py
+
+    Returns:
+        str: Путь к директории решения
+    """
+    path = Path(directory)
+    path.mkdir(parents=True, exist_ok=True)
+    (path / "assignment.py").write_text(ASSIGNMENT_SOURCE, encoding="utf-8")
+    (path / "README.md").write_text("# Решение\n", encoding="utf-8")
+    (path / "test.py").write_text(test_source, encoding="utf-8")
+    return str(path)
+
+
+class TestAutograder(unittest.TestCase):
+    """Тесты проверок грейдера."""
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = temp_dir.name
+
+    def _chdir(self, directory: str):
+        """Переходит в directory до конца теста."""
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(directory)
+
+    # --- Тесты для запуска pytest ---
+    def test_unit_tests_report_per_test_outcomes(self):
+        """Тест: исходы и длительности каждого теста попадают в отчет."""
+        submission = make_submission(os.path.join(self.temp_dir, "sub"), PARTIAL_TEST_SOURCE)
+        results = AssignmentGrader(submission, 1).check_unit_tests()
+        self.assertFalse(results["tests_pass"])
+        self.assertEqual((results["tests_total"], results["tests_passed"],
+                          results["tests_failed"]), (2, 1, 1))
+        self.assertEqual(results["pass_rate"], 0.5)
+        outcomes = {test["nodeid"]: test["outcome"] for test in results["tests"]}
+        self.assertEqual(outcomes, {"test.py::test_value": "passed",
+                                    "test.py::test_wrong_value": "failed"})
+        self.assertEqual(len(results["slowest_tests"]), 2)
+
+    def test_unit_tests_relative_submission_dir(self):
+        """Тест: относительный путь к решению дает тот же результат, что и абсолютный."""
+        make_submission(os.path.join(self.temp_dir, "sub"))
+        self._chdir(self.temp_dir)
+        results = AssignmentGrader("sub", 1).check_unit_tests()
+        self.assertTrue(results["tests_pass"])
+        self.assertEqual(results["tests_total"], 1)
+
+    def test_pytest_worker_reloads_submission_modules(self):
+        """Тест: модуль assignment предыдущего решения не переиспользуется."""
+        first = make_submission(os.path.join(self.temp_dir, "first"))
+        second = make_submission(os.path.join(self.temp_dir, "second"))
+        Path(second, "assignment.py").write_text("def value():\n    return 2\n",
+                                                 encoding="utf-8")
+        worker = get_pytest_worker()
+        self.assertTrue(worker.run(os.path.join(first, "test.py"), first)["tests_pass"])
+        self.assertFalse(worker.run(os.path.join(second, "test.py"), second)["tests_pass"])
+
+    def test_purge_keeps_libraries_shadowed_by_submission_files(self):
+        """Тест: json.py и numpy.py в решении не выгружают прогретые json и numpy."""
+        import numpy
+
+        submission = Path(make_submission(os.path.join(self.temp_dir, "sub")))
+        for name in ("json", "numpy", "pytest"):
+            (submission / f"{name}.py").write_text("VALUE = 1\n", encoding="utf-8")
+        spec = importlib.util.spec_from_file_location(
+            "submission_helper", submission / "assignment.py")
+        sys.modules["submission_helper"] = importlib.util.module_from_spec(spec)
+        self.addCleanup(sys.modules.pop, "submission_helper", None)
+        loaded = {name: sys.modules[name] for name in ("json", "numpy", "numpy.linalg")}
+
+        _purge_submission_modules(submission.resolve())
+        for name, module in loaded.items():
+            self.assertIs(sys.modules.get(name), module)
+        self.assertIs(sys.modules["numpy"], numpy)
+        self.assertNotIn("submission_helper", sys.modules)
+
+    # --- Тесты для манифеста пакетной проверки ---
+    def _write_manifest(self, name: str, content: str) -> str:
+        """Записывает манифест во временную директорию и возвращает путь."""
+        path = os.path.join(self.temp_dir, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        return path
+
+    def test_load_manifest_json(self):
+        """Тест: JSON-манифест, пути считаются от директории манифеста."""
+        path = self._write_manifest("cohort.json", json.dumps({"a": 1, "b": "2"}))
+        self.assertEqual(load_manifest(path), [(os.path.join(self.temp_dir, "a"), 1),
+                                               (os.path.join(self.temp_dir, "b"), 2)])
+
+    def test_load_manifest_text(self):
+        """Тест: текстовый манифест пропускает пустые строки и комментарии."""
+        path = self._write_manifest("cohort.txt",
+                                    "# группа 1\n\nstudent one 3\n  b 10  \n")
+        self.assertEqual(load_manifest(path), [(os.path.join(self.temp_dir, "student one"), 3),
+                                               (os.path.join(self.temp_dir, "b"), 10)])
+
+    def test_load_manifest_bad_lines(self):
+        """Тест: строка без варианта и нечисловой вариант - ошибки манифеста."""
+        for content in ("a 1\nmissing_variant\n", "a x\n"):
+            path = self._write_manifest("bad.txt", content)
+            with self.assertRaises(ValueError):
+                load_manifest(path)
+        path = self._write_manifest("bad.json", json.dumps({"a": "x"}))
+        with self.assertRaises(ValueError):
+            load_manifest(path)
+
+    # --- Тесты для пакетной проверки ---
+    def test_grade_submission_statuses(self):
+        """Тест: статусы ok, invalid и timeout."""
+        ok = grade_submission(make_submission(os.path.join(self.temp_dir, "ok")), 1)
+        self.assertEqual(ok["status"], "ok")
+        self.assertIn("overall_score", ok)
+
+        missing = grade_submission(os.path.join(self.temp_dir, "missing"), 1)
+        self.assertEqual(missing["status"], "invalid")
+        wrong_variant = grade_submission(os.path.join(self.temp_dir, "ok"), 11)
+        self.assertEqual(wrong_variant["status"], "invalid")
+
+        slow = make_submission(os.path.join(self.temp_dir, "slow"), SLEEPING_TEST_SOURCE)
+        timed_out = grade_submission(slow, 1, timeout=2)
+        self.assertEqual(timed_out["status"], "timeout")
+        self.assertLess(timed_out["elapsed_seconds"], 10)
+
+    def test_run_batch_writes_jsonl_in_input_order(self):
+        """Тест: JSONL-отчет в порядке входа, даже если первое решение проверяется дольше."""
+        submissions = [
+            (make_submission(os.path.join(self.temp_dir, "slow"), SLEEPING_TEST_SOURCE), 1),
+            (make_submission(os.path.join(self.temp_dir, "fast")), 1),
+            (os.path.join(self.temp_dir, "missing"), 1),
+        ]
+        output = os.path.join(self.temp_dir, "report.jsonl")
+        records = run_batch(submissions, output, workers=2, timeout=3)
+
+        with open(output, "r", encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual(lines, records)
+        self.assertEqual([record["submission_dir"] for record in lines],
+                         [submission_dir for submission_dir, _ in submissions])
+        self.assertEqual([record["status"] for record in lines], ["timeout", "ok", "invalid"])
+
+    # --- Тесты для линтера ---
+    def _violation(self, code: str, line: int) -> dict:
+        """Создает нарушение для проверки _filter_noqa."""
+        return {"code": code, "line": line, "column": 1, "message": ""}
+
+    def test_filter_noqa(self):
+        """Тест: # noqa подавляет все коды строки, # noqa: <коды> - только перечисленные."""
+        lines = ["import os  # noqa\n",
+                 "import re  # noqa: E501\n",
+                 "x=1  # NOQA:E2,F401\n",
+                 "y = 1\n"]
+        violations = [self._violation("F401", 1), self._violation("E501", 2),
+                      self._violation("F401", 2), self._violation("E225", 3),
+                      self._violation("W291", 3), self._violation("E225", 4)]
+        kept = _filter_noqa(violations, lines)
+        self.assertEqual([(v["code"], v["line"]) for v in kept],
+                         [("F401", 2), ("W291", 3), ("E225", 4)])
+
+    def test_filter_noqa_line_out_of_range(self):
+        """Тест: нарушение за пределами файла (E901 после EOF) не теряется."""
+        violations = [self._violation("E901", 5)]
+        self.assertEqual(_filter_noqa(violations, ["x = 1\n"]), violations)
+
+    def test_lint_file_reports_structured_violations(self):
+        """Тест: нарушения возвращаются с кодом, строкой и колонкой."""
+        path = os.path.join(self.temp_dir, "lint.py")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("import os\nx=1\n")
+        violations, engine = lint_file(path)
+        self.assertEqual(engine, "in-process")
+        self.assertEqual([(v["code"], v["line"], v["column"]) for v in violations],
+                         [("F401", 1, 1), ("E225", 2, 2)])
+
+    @unittest.skipIf(shutil.which("flake8") is None, "flake8 не установлен")
+    def test_lint_file_matches_flake8(self):
+        """Тест: линтер в процессе выдает те же нарушения, что и flake8."""
+        paths = [str(REPO_DIR / name) for name in ("assignment.py", "test.py", "benchmark.py")]
+        paths += [str(path) for path in sorted((REPO_DIR / "scripts").glob("*.py"))]
+        for name, source in LINT_CASES.items():
+            path = os.path.join(self.temp_dir, f"{name}.py")
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                f.write(source)
+            paths.append(path)
+
+        def key(violation):
+            return violation["line"], violation["column"], violation["code"]
+
+        for path in paths:
+            with self.subTest(path=path):
+                self.assertEqual(sorted(lint_file(path)[0], key=key),
+                                 sorted(lint_with_flake8(path), key=key))
+
+
+if __name__ == "__main__":
+    unittest.main()
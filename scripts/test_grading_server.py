@@ -0,0 +1,150 @@
+"""
+Тесты сервера автопроверки (scripts/grading_server.py).
+
+Сервер запускается в отдельном потоке на свободном порту (порт 0),
+решения создаются во временных директориях через make_submission.
+"""
+
+import json
+import os
+import signal
+import sys
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from grading_server import (  # noqa: E402
+    GradingRequestHandler,
+    GradingService,
+    _worker_pid,
+    submit,
+)
+from test_autograder import make_submission  # noqa: E402
+
+
+class TestGradingServer(unittest.TestCase):
+    """Тесты HTTP API и восстановления пула."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.service = GradingService(workers=1, timeout=30)
+        cls.service.warm_up()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), GradingRequestHandler)
+        cls.server.grading_service = cls.service
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.thread.join()
+        cls.service.shutdown()
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = temp_dir.name
+
+    def _request(self, method: str, path: str, payload=None):
+        """Отправляет запрос и возвращает (код ответа, JSON)."""
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        request = urllib.request.Request(self.url + path, data=data, method=method,
+                                         headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    def test_submit_wait_done(self):
+        """Тест: решение ставится в очередь и проверяется до статуса done."""
+        submission = make_submission(os.path.join(self.temp_dir, "sub"))
+        job = submit(self.url, submission, 1, wait=True, timeout=60)
+        self.assertEqual(job["status"], "done")
+        self.assertEqual(job["record"]["status"], "ok")
+        self.assertEqual(job["submission_dir"], submission)
+
+        status, described = self._request("GET", f"/submissions/{job['id']}")
+        self.assertEqual(status, 200)
+        self.assertEqual(described["status"], "done")
+
+    def test_unknown_submission_404(self):
+        """Тест: неизвестный идентификатор задания - 404."""
+        status, body = self._request("GET", "/submissions/unknown?wait=1")
+        self.assertEqual(status, 404)
+        self.assertIn("error", body)
+
+    def test_invalid_payload_400(self):
+        """Тест: некорректный запрос и некорректное решение - 400."""
+        submission = make_submission(os.path.join(self.temp_dir, "sub"))
+        payloads = [
+            {"variant": 1},
+            {"submission_dir": submission, "variant": "x"},
+            {"submission_dir": submission, "variant": 11},
+            {"submission_dir": os.path.join(self.temp_dir, "missing"), "variant": 1},
+        ]
+        for payload in payloads:
+            with self.subTest(payload=payload):
+                status, body = self._request("POST", "/submissions", payload)
+                self.assertEqual(status, 400)
+                self.assertIn("error", body)
+
+    def _kill_pool_worker(self):
+        """Убивает рабочий процесс текущего пула, ломая пул."""
+        with self.service.lock:
+            executor = self.service.executor
+        os.kill(executor.submit(_worker_pid).result(), signal.SIGKILL)
+
+    def test_pool_recovers_after_worker_crash(self):
+        """Тест: после гибели рабочего процесса пул пересоздается и задания проходят."""
+        restarts = self.service.health()["pool"]["restarts"]
+        self._kill_pool_worker()
+
+        submission = make_submission(os.path.join(self.temp_dir, "sub"))
+        job = submit(self.url, submission, 1, wait=True, timeout=60)
+        self.assertEqual(job["status"], "done")
+
+        status, health = self._request("GET", "/health")
+        self.assertEqual(status, 200)
+        self.assertEqual(health["status"], "ok")
+        self.assertFalse(health["pool"]["broken"])
+        self.assertEqual(health["pool"]["restarts"], restarts + 1)
+        self.assertIn("BrokenProcessPool", health["pool"]["last_error"])
+
+    def test_health_reports_broken_pool(self):
+        """Тест: если пул не удалось пересоздать, /health возвращает 503."""
+        submission = make_submission(os.path.join(self.temp_dir, "sub"))
+        payload = {"submission_dir": submission, "variant": 1}
+        failure = OSError("fork failed")
+        with mock.patch.object(self.service, "_create_executor", side_effect=failure):
+            self._kill_pool_worker()
+            status, job = self._request("POST", "/submissions", payload)
+            if status == 202:
+                # Пул сломался уже после постановки в очередь
+                status, job = self._request("GET", f"/submissions/{job['id']}?wait=30")
+                self.assertEqual(job["status"], "failed")
+            else:
+                self.assertEqual(status, 503)
+
+            status, health = self._request("GET", "/health")
+            self.assertEqual(status, 503)
+            self.assertEqual(health["status"], "broken")
+            self.assertTrue(health["pool"]["broken"])
+            self.assertIn("fork failed", health["pool"]["last_error"])
+
+        # Следующее решение пересоздает пул
+        job = submit(self.url, submission, 1, wait=True, timeout=60)
+        self.assertEqual(job["status"], "done")
+        self.assertEqual(self._request("GET", "/health")[1]["status"], "ok")
+
+
+if __name__ == "__main__":
+    unittest.main()
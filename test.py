@@ -1,5 +1,33 @@
+import json
+import multiprocessing
+import os
+import pickle
+import tempfile
+import threading
+import time
+import random
+import subprocess
+import sys
 import unittest
+from unittest import mock
+from collections import Counter
+
+import numpy as np
 from assignment import analyze_category_distribution, analyze_text_lengths_by_category, extract_top_words_by_category, preprocess_text, CATEGORY_LABELS
+from assignment import analyze_dataset, iter_json_record_batches, LocalDatasetStream, tokenize_batch
+from assignment import collect_analysis_state, SpaceSavingCounter, LengthAccumulator, iter_column_batches
+from assignment import ResultCache, dataset_fingerprint, run_cached_analysis
+from assignment import append_records_to_state, load_state, save_state, summarize_state
+from assignment import appended_records_in_state
+from assignment import build_token_corpus, TokenCorpus
+from assignment import PerfRecorder, ChartRenderer, peek_category_distribution
+from assignment import AnalysisState, columnar_tables, export_columnar
+from assignment import load_ag_news_dataset
+from assignment import category_term_matrix, characteristic_words, extract_characteristic_words_by_category
+from assignment import HashedNgramCounter, top_ngrams
+from assignment import dataset_label_codes, encode_labels, label_distribution
+from assignment import WordCountMatrix
+from benchmark import find_regressions, measure, scaling_exponent
 
 # Тестовый датасет с разными характеристиками
 # Используем константу CATEGORY_LABELS для проверки соответствия
@@ -28,6 +56,28 @@ EDGE_CASE_DATASET = [
     # Датасет с отсутствующими ключами (для проверки гибкости, хотя в assignment.py это обрабатывается)
     # {"text": "No label here."}, # Не включаем, т.к. assignment.py ожидает 'label'
 ]
+# Бюджет времени импорта assignment.py (микросекунды, накопленное время по -X importtime)
+IMPORT_TIME_BUDGET_US = 150000
+
+
+class FakeColumnarDataset:
+    """Имитация datasets.Dataset: отдаёт порции столбцов и запрещает построчный обход."""
+
+    def __init__(self, records, column_names=("text", "label")):
+        self.records = records
+        self.column_names = list(column_names)
+
+    def iter(self, batch_size):
+        for start in range(0, len(self.records), batch_size):
+            batch = self.records[start:start + batch_size]
+            yield {name: [item[name] for item in batch] for name in self.column_names}
+
+    def select_columns(self, column_names):
+        return FakeColumnarDataset(self.records, column_names)
+
+    def __iter__(self):
+        raise AssertionError("построчный обход Arrow-датасета")
+
 
 class TestAnalysis(unittest.TestCase):
 
@@ -51,6 +101,21 @@ class TestAnalysis(unittest.TestCase):
         self.assertEqual(preprocess_text("A 1 B!"), "a b")
 
 
+    # --- Тесты для tokenize_batch ---
+    def test_tokenize_batch_matches_preprocess_text(self):
+        """Тест: пакетная токенизация совпадает с preprocess_text."""
+        texts = [item["text"] for item in TEST_DATASET + EDGE_CASE_DATASET]
+        # Символы вне ASCII, в т.ч. дающие ASCII-буквы после lower()
+        texts += ["Caf\u00e9 \u0130stanbul \u212aelvin \ufb01nance", "tab\tnew\nline", "a\x00b"]
+        expected = [preprocess_text(text).split() for text in texts]
+        self.assertEqual(tokenize_batch(texts), expected)
+
+    def test_tokenize_batch_empty(self):
+        """Тест: пакетная токенизация пустого столбца."""
+        self.assertEqual(tokenize_batch([]), [])
+        self.assertEqual(tokenize_batch([""]), [[]])
+
+
     # --- Тесты для analyze_category_distribution ---
     def test_analyze_category_distribution_basic(self):
         """Тест: распределение по категориям."""
@@ -126,6 +191,35 @@ class TestAnalysis(unittest.TestCase):
                 self.assertEqual(stats["max_length"], 0)
 
 
+    # --- Тесты для LengthAccumulator ---
+    def test_length_accumulator_matches_numpy(self):
+        """Тест: потоковая статистика длин совпадает с numpy."""
+        rng = random.Random(7)
+        lengths = [rng.randint(3, 80) for _ in range(1001)]
+        accumulator = LengthAccumulator()
+        accumulator.add_many(lengths)
+        summary = accumulator.summary()
+        self.assertAlmostEqual(summary["mean_length"], round(float(np.mean(lengths)), 2))
+        self.assertAlmostEqual(summary["std_length"], round(float(np.std(lengths)), 2))
+        self.assertEqual(summary["median_length"], float(np.median(lengths)))
+        self.assertAlmostEqual(summary["p90_length"], round(float(np.percentile(lengths, 90)), 2))
+        self.assertAlmostEqual(summary["p99_length"], round(float(np.percentile(lengths, 99)), 2))
+        self.assertEqual(summary["min_length"], min(lengths))
+        self.assertEqual(summary["max_length"], max(lengths))
+        self.assertEqual(sum(summary["histogram"].values()), len(lengths))
+
+    def test_length_accumulator_merge(self):
+        """Тест: слияние накопителей эквивалентно общему накоплению."""
+        lengths = [6, 8, 6, 10, 1, 4, 4]
+        whole, left, right = LengthAccumulator(), LengthAccumulator(), LengthAccumulator()
+        whole.add_many(lengths)
+        left.add_many(lengths[:3])
+        right.add_many(lengths[3:])
+        left.merge(right)
+        self.assertEqual(left.summary(), whole.summary())
+        self.assertEqual(whole.summary()["median_length"], 6.0)
+
+
     # --- Тесты для extract_top_words_by_category ---
     def test_extract_top_words_by_category_basic(self):
         """Тест: извлечение топ слов по категориям."""
@@ -179,5 +273,671 @@ class TestAnalysis(unittest.TestCase):
         self.assertEqual(result_set, expected_set)
 
 
+    # --- Тесты для analyze_dataset ---
+    def test_analyze_dataset_matches_separate_functions(self):
+        """Тест: совмещённый анализ совпадает с отдельными функциями."""
+        result = analyze_dataset(TEST_DATASET, top_n=3)
+        self.assertEqual(result["category_distribution"], analyze_category_distribution(TEST_DATASET))
+        self.assertEqual(result["text_length_statistics"], analyze_text_lengths_by_category(TEST_DATASET))
+        self.assertEqual(result["top_words_per_category"], extract_top_words_by_category(TEST_DATASET, top_n=3))
+
+    def test_analyze_dataset_single_pass(self):
+        """Тест: совмещённый анализ проходит по датасету ровно один раз."""
+        passes = []
+
+        def one_shot():
+            passes.append(1)
+            yield from EDGE_CASE_DATASET
+
+        result = analyze_dataset(one_shot(), top_n=5)
+        self.assertEqual(len(passes), 1)
+        self.assertEqual(sum(result["category_distribution"].values()), len(EDGE_CASE_DATASET))
+
+
+    # --- Тесты для многопроцессного подсчёта ---
+    def test_collect_analysis_state_workers_match_serial(self):
+        """Тест: шардированный подсчёт совпадает с последовательным, включая порядок при равных частотах."""
+        dataset = TEST_DATASET * 3 + EDGE_CASE_DATASET
+        serial = collect_analysis_state(dataset)
+        for workers in (2, 3):
+            parallel = collect_analysis_state(dataset, workers=workers, shard_size=4)
+            self.assertEqual(parallel.category_distribution(), serial.category_distribution())
+            self.assertEqual(parallel.length_statistics(), serial.length_statistics())
+            self.assertEqual(parallel.top_words(5), serial.top_words(5))
+
+    def test_extract_top_words_by_category_workers(self):
+        """Тест: параметр workers не меняет результат извлечения топ слов."""
+        self.assertEqual(extract_top_words_by_category(TEST_DATASET, top_n=2, workers=2),
+                         extract_top_words_by_category(TEST_DATASET, top_n=2))
+
+    def test_collect_analysis_state_invalid_workers(self):
+        """Тест: отрицательное число процессов вызывает ошибку."""
+        with self.assertRaises(ValueError):
+            collect_analysis_state(TEST_DATASET, workers=-1)
+
+
+    # --- Тесты для приближённого подсчёта слов ---
+    def test_space_saving_exact_when_capacity_suffices(self):
+        """Тест: при достаточной ёмкости счётчик точен."""
+        words = "a b a c b a d".split()
+        sketch = SpaceSavingCounter(capacity=10)
+        sketch.update(words)
+        self.assertEqual(sketch.most_common(3), Counter(words).most_common(3))
+        bounds = sketch.error_bounds(3)
+        self.assertTrue(bounds["exact"])
+        self.assertEqual(bounds["max_error"], 0)
+
+    def test_space_saving_heavy_hitters(self):
+        """Тест: частые слова находятся при малой ёмкости, погрешность в пределах границы."""
+        words = ["the"] * 50 + ["of"] * 30 + [f"rare{i}" for i in range(200)] + ["the"] * 10
+        sketch = SpaceSavingCounter(capacity=20)
+        for start in range(0, len(words), 7):
+            sketch.update(words[start:start + 7])
+        self.assertLessEqual(len(sketch.counts), 20)
+        top = sketch.most_common(2)
+        self.assertEqual([word for word, _ in top], ["the", "of"])
+        bounds = sketch.error_bounds(2)
+        self.assertTrue(bounds["guaranteed"])
+        self.assertLessEqual(bounds["max_error"], bounds["error_bound"])
+        for word, true_count in (("the", 60), ("of", 30)):
+            self.assertGreaterEqual(sketch.counts[word], true_count)
+            self.assertLessEqual(sketch.counts[word] - sketch.errors[word], true_count)
+
+    def test_space_saving_merge(self):
+        """Тест: слияние счётчиков сохраняет частые слова."""
+        first, second = SpaceSavingCounter(capacity=4), SpaceSavingCounter(capacity=4)
+        first.update(["x"] * 5 + ["a", "b", "c", "d"])
+        second.update(["x"] * 3 + ["y"] * 4 + ["e", "f"])
+        first.merge(second)
+        self.assertEqual(first.total, 18)
+        self.assertLessEqual(len(first.counts), 4)
+        self.assertEqual(first.most_common(1)[0][0], "x")
+        self.assertGreaterEqual(first.counts["x"], 8)
+
+    def test_extract_top_words_approximate_matches_exact(self):
+        """Тест: приближённый режим возвращает точный топ, когда может его гарантировать."""
+        dataset = TEST_DATASET * 4
+        exact = extract_top_words_by_category(dataset, top_n=3)
+        approximate = extract_top_words_by_category(dataset, top_n=3, sketch_capacity=100)
+        self.assertEqual(approximate, exact)
+        result = analyze_dataset(dataset, top_n=3, sketch_capacity=100)
+        self.assertTrue(all(bounds["exact"] for bounds in result["top_words_error_bounds"].values()))
+
+
+    # --- Тесты для постолбцового чтения ---
+    def test_iter_column_batches_columnar(self):
+        """Тест: датасет со столбцами читается порциями столбцов."""
+        batches = list(iter_column_batches(FakeColumnarDataset(TEST_DATASET), batch_size=5))
+        self.assertEqual([len(labels) for labels, _ in batches], [5, 5, 2])
+        self.assertEqual(batches[0][1][0], TEST_DATASET[0]["text"])
+
+    def test_columnar_dataset_analysis(self):
+        """Тест: анализ столбцового датасета совпадает с анализом списка словарей."""
+        dataset = FakeColumnarDataset(TEST_DATASET + EDGE_CASE_DATASET)
+        self.assertEqual(analyze_dataset(dataset), analyze_dataset(TEST_DATASET + EDGE_CASE_DATASET))
+        self.assertEqual(extract_top_words_by_category(dataset, top_n=2, workers=2),
+                         extract_top_words_by_category(TEST_DATASET + EDGE_CASE_DATASET, top_n=2))
+
+
+    # --- Тесты для потокового чтения ---
+    def _write_temp(self, content):
+        """Записывает содержимое во временный файл и возвращает путь."""
+        fd, path = tempfile.mkstemp(suffix=".json")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_iter_json_record_batches_array(self):
+        """Тест: потоковое чтение JSON-массива порциями."""
+        path = self._write_temp(json.dumps(TEST_DATASET, indent=2))
+        batches = list(iter_json_record_batches(path, batch_size=5, chunk_size=16))
+        self.assertEqual([len(batch) for batch in batches], [5, 5, 2])
+        self.assertEqual([item for batch in batches for item in batch], TEST_DATASET)
+
+    def test_iter_json_record_batches_jsonl(self):
+        """Тест: потоковое чтение JSON Lines."""
+        path = self._write_temp("\n".join(json.dumps(item) for item in TEST_DATASET) + "\n")
+        records = [item for batch in iter_json_record_batches(path, chunk_size=7) for item in batch]
+        self.assertEqual(records, TEST_DATASET)
+
+    def test_iter_json_record_batches_leading_whitespace(self):
+        """Тест: массив после пробелов длиннее блока чтения не принимается за JSON Lines."""
+        path = self._write_temp("\n" * 40 + json.dumps(TEST_DATASET[:2]))
+        batches = list(iter_json_record_batches(path, chunk_size=16))
+        self.assertEqual([len(batch) for batch in batches], [2])
+        self.assertEqual(batches[0], TEST_DATASET[:2])
+
+    def test_iter_json_record_batches_truncated(self):
+        """Тест: обрезанный JSON-массив вызывает ошибку разбора."""
+        path = self._write_temp(json.dumps(TEST_DATASET)[:-20])
+        with self.assertRaises(json.JSONDecodeError):
+            list(iter_json_record_batches(path))
+
+    def test_local_dataset_stream_analysis(self):
+        """Тест: анализ потокового датасета совпадает с анализом списка."""
+        path = self._write_temp(json.dumps(TEST_DATASET))
+        stream = LocalDatasetStream(path, batch_size=4)
+        self.assertEqual(analyze_dataset(stream), analyze_dataset(TEST_DATASET))
+        # Поток можно пройти повторно
+        self.assertEqual(analyze_category_distribution(stream), analyze_category_distribution(TEST_DATASET))
+
+
+    # --- Тесты для кэша результатов ---
+    def test_dataset_fingerprint(self):
+        """Тест: отпечаток зависит только от содержимого датасета."""
+        self.assertEqual(dataset_fingerprint(list(TEST_DATASET)), dataset_fingerprint(TEST_DATASET))
+        changed = TEST_DATASET[:-1] + [{"label": 3, "text": "Tech news about robots."}]
+        self.assertNotEqual(dataset_fingerprint(changed), dataset_fingerprint(TEST_DATASET))
+        path = self._write_temp(json.dumps(TEST_DATASET))
+        self.assertTrue(dataset_fingerprint(LocalDatasetStream(path)).startswith("file:"))
+        # Одноразовый итератор нельзя хэшировать, не израсходовав его
+        self.assertIsNone(dataset_fingerprint(iter(TEST_DATASET)))
+
+    def test_result_cache_lru_eviction(self):
+        """Тест: кэш вытесняет давно не использованные записи сверх лимита."""
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResultCache(directory, max_bytes=10 ** 6)
+            cache.put("old", "x" * 400000)
+            cache.put("used", "y" * 400000)
+            os.utime(os.path.join(directory, "old.pkl"), (1, 1))
+            os.utime(os.path.join(directory, "used.pkl"), (2, 2))
+            self.assertIsNotNone(cache.get("used"))  # Обновляет время доступа
+            cache.put("new", "z" * 400000)
+            self.assertIsNone(cache.get("old"))
+            self.assertEqual(cache.get("used"), "y" * 400000)
+            self.assertEqual(cache.get("new"), "z" * 400000)
+
+    def test_run_cached_analysis_warm_run(self):
+        """Тест: повторный запуск на том же датасете берёт результаты из кэша."""
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResultCache(directory)
+            _, cold = run_cached_analysis(TEST_DATASET, cache, top_n=3)
+            self.assertEqual(cold, analyze_dataset(TEST_DATASET, top_n=3))
+            with mock.patch("assignment.collect_analysis_state") as collect:
+                _, warm = run_cached_analysis(TEST_DATASET, cache, top_n=3)
+            collect.assert_not_called()
+            self.assertEqual(warm, cold)
+            # Другие параметры анализа - другой ключ
+            self.assertEqual(run_cached_analysis(TEST_DATASET, cache, top_n=2)[1],
+                             analyze_dataset(TEST_DATASET, top_n=2))
+
+
+    # --- Тесты для режима дозаписи ---
+    def test_append_records_to_state(self):
+        """Тест: дозапись новых записей эквивалентна полному пересчёту."""
+        base, new_items = TEST_DATASET[:7], TEST_DATASET[7:] + EDGE_CASE_DATASET
+        state_path = self._write_temp("")
+        save_state(collect_analysis_state(base), state_path)
+        new_path = self._write_temp("\n".join(json.dumps(item) for item in new_items))
+        state = append_records_to_state(new_path, state_path)
+        expected = analyze_dataset(base + new_items)
+        self.assertEqual(summarize_state(state), expected)
+        self.assertEqual(summarize_state(load_state(state_path)), expected)
+
+    def test_appended_records_in_state(self):
+        """Тест: файл состояния помнит, сколько записей добавлено через --append."""
+        state_path = self._write_temp("")
+        save_state(collect_analysis_state(TEST_DATASET[:7]), state_path)
+        self.assertEqual(appended_records_in_state(state_path), 0)
+        new_items = TEST_DATASET[7:] + [{"label": 9, "text": "Unknown label"}]
+        new_path = self._write_temp("\n".join(json.dumps(item) for item in new_items))
+        append_records_to_state(new_path, state_path)
+        append_records_to_state(new_path, state_path)
+        self.assertEqual(appended_records_in_state(state_path), 2 * len(new_items))
+        self.assertEqual(appended_records_in_state(state_path + ".missing"), 0)
+
+    def test_load_state_rejects_other_version(self):
+        """Тест: состояние несовместимой версии не загружается."""
+        path = self._write_temp("")
+        save_state(collect_analysis_state(TEST_DATASET), path)
+        with mock.patch("assignment.TOKENIZER_VERSION", -1):
+            with self.assertRaises(ValueError):
+                load_state(path)
+
+
+    # --- Тесты для корпуса токенов ---
+    def test_token_corpus_roundtrip(self):
+        """Тест: корпус токенов сохраняет метки, смещения и словарь."""
+        dataset = TEST_DATASET + [{"label": 9, "text": "Unknown label"}]
+        with tempfile.TemporaryDirectory() as directory:
+            build_token_corpus(dataset, directory, batch_size=5)
+            corpus = TokenCorpus(directory)
+            self.assertEqual(len(corpus), len(dataset))
+            self.assertEqual(corpus.tokens.dtype, np.uint32)
+            self.assertEqual(corpus.labels.dtype, np.uint8)
+            self.assertEqual(corpus.labels[-1], 255)
+            self.assertEqual(corpus.labels.tolist(),
+                             encode_labels([item["label"] for item in dataset]).tolist())
+            first_doc = corpus.tokens[corpus.offsets[0]:corpus.offsets[1]]
+            self.assertEqual([corpus.vocab[i] for i in first_doc], preprocess_text(dataset[0]["text"]).split())
+            del corpus, first_doc  # Закрываем отображения файлов до удаления каталога
+
+    def test_token_corpus_analysis_matches_dataset(self):
+        """Тест: анализ корпуса токенов совпадает с анализом исходного датасета."""
+        dataset = TEST_DATASET * 2 + EDGE_CASE_DATASET
+        with tempfile.TemporaryDirectory() as directory:
+            corpus = build_token_corpus(dataset, directory)
+            self.assertEqual(analyze_dataset(corpus, top_n=4), analyze_dataset(dataset, top_n=4))
+            self.assertEqual(analyze_category_distribution(corpus), analyze_category_distribution(dataset))
+            self.assertEqual(extract_top_words_by_category(corpus, top_n=2),
+                             extract_top_words_by_category(dataset, top_n=2))
+            del corpus
+
+    def test_token_corpus_fingerprint_includes_vocabulary(self):
+        """Тест: корпуса с одинаковой раскладкой id, но разным словарём не делят кэш."""
+        with tempfile.TemporaryDirectory() as directory:
+            first = build_token_corpus([{"label": 1, "text": "cat sat"}], os.path.join(directory, "a"))
+            second = build_token_corpus([{"label": 1, "text": "dog ran"}], os.path.join(directory, "b"))
+            self.assertEqual(first.tokens.tolist(), second.tokens.tolist())
+            self.assertNotEqual(dataset_fingerprint(first), dataset_fingerprint(second))
+            cache = ResultCache(os.path.join(directory, "cache"))
+            run_cached_analysis(first, cache, top_n=2)
+            _, results = run_cached_analysis(second, cache, top_n=2)
+            self.assertEqual(results["top_words_per_category"]["Sports"], [("dog", 1), ("ran", 1)])
+            del first, second
+
+
+    # --- Тесты для телеметрии этапов ---
+    def test_perf_recorder_reports_stages_in_order(self):
+        """Тест: PerfRecorder измеряет этапы и считает строки в секунду."""
+        perf = PerfRecorder()
+        with perf.stage("load"):
+            pass
+        with perf.stage("analyze"):
+            sum(range(10000))
+        report = perf.report()
+        self.assertEqual(list(report["stages"]), ["load", "analyze"])
+        self.assertIsNone(report["stages"]["analyze"]["rows_per_sec"])
+
+        perf.rows = 100
+        analyze = perf.report()["stages"]["analyze"]
+        self.assertGreaterEqual(analyze["wall_seconds"], 0)
+        self.assertGreaterEqual(analyze["cpu_seconds"], 0)
+        if analyze["wall_seconds"] > 0:
+            self.assertAlmostEqual(analyze["rows_per_sec"], 100 / analyze["wall_seconds"], delta=1)
+
+    def test_perf_recorder_records_failed_stage(self):
+        """Тест: этап, завершившийся исключением, тоже попадает в отчёт."""
+        perf = PerfRecorder()
+        with self.assertRaises(ValueError):
+            with perf.stage("save"):
+                raise ValueError("disk full")
+        self.assertIn("save", perf.report()["stages"])
+
+    @unittest.skipIf(sys.platform == "win32", "RUSAGE_CHILDREN недоступен на Windows")
+    def test_perf_recorder_counts_child_process_cpu(self):
+        """Тест: процессорное время этапа включает завершившиеся дочерние процессы."""
+        perf = PerfRecorder()
+        with perf.stage("analyze"):
+            subprocess.run([sys.executable, "-c", "sum(i * i for i in range(3 * 10 ** 6))"],
+                           check=True)
+        self.assertGreater(perf.report()["stages"]["analyze"]["cpu_seconds"], 0.1)
+
+
+    # --- Тесты для отрисовки диаграммы ---
+    def test_chart_renderer_writes_png_in_background(self):
+        """Тест: ChartRenderer рисует PNG в отдельном процессе."""
+        with tempfile.TemporaryDirectory() as directory:
+            output_path = os.path.join(directory, "chart.png")
+            chart = ChartRenderer(analyze_category_distribution(TEST_DATASET), output_path).start()
+            chart.join()
+            self.assertEqual(chart.process.exitcode, 0)
+            with open(output_path, "rb") as f:
+                self.assertEqual(f.read(8), b"\x89PNG\r\n\x1a\n")
+
+    def test_chart_renderer_spawns_when_threads_are_running(self):
+        """Тест: при работающих потоках процесс отрисовки не создаётся через fork."""
+        stop = threading.Event()
+        thread = threading.Thread(target=stop.wait)
+        thread.start()
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                output_path = os.path.join(directory, "chart.png")
+                chart = ChartRenderer({"World": 1, "Sports": 2}, output_path).start()
+                chart.join()
+                self.assertIsInstance(chart.process, multiprocessing.get_context("spawn").Process)
+                self.assertEqual(chart.process.exitcode, 0)
+                self.assertTrue(os.path.exists(output_path))
+        finally:
+            stop.set()
+            thread.join()
+
+    def test_chart_renderer_falls_back_to_current_process(self):
+        """Тест: без запущенного процесса join() рисует диаграмму сам."""
+        chart = ChartRenderer({"World": 1}, "unused.png")
+        with mock.patch("assignment.create_pie_chart") as render:
+            chart.join()
+        render.assert_called_once_with({"World": 1}, "unused.png")
+
+    def test_peek_category_distribution(self):
+        """Тест: распределение читается заранее только для дешёвых источников."""
+        self.assertEqual(peek_category_distribution(TEST_DATASET),
+                         analyze_category_distribution(TEST_DATASET))
+        path = self._write_temp(json.dumps(TEST_DATASET))
+        self.assertIsNone(peek_category_distribution(LocalDatasetStream(path)))
+
+    def test_peek_category_distribution_reads_only_label_column(self):
+        """Тест: у столбцового датасета распределение считается по одному столбцу меток."""
+        self.assertEqual(peek_category_distribution(FakeColumnarDataset(TEST_DATASET)),
+                         analyze_category_distribution(TEST_DATASET))
+        # Записи без текстов: полный обход упал бы на столбце 'text'
+        labels_only = FakeColumnarDataset([{"label": item["label"]} for item in TEST_DATASET])
+        self.assertEqual(peek_category_distribution(labels_only),
+                         analyze_category_distribution(TEST_DATASET))
+
+
+    # --- Тесты для столбцовой выгрузки ---
+    def test_columnar_tables_match_json_results(self):
+        """Тест: столбцовые таблицы содержат те же слова и длины, что и JSON-результаты."""
+        state = collect_analysis_state(TEST_DATASET)
+        words = columnar_tables(state, top_n=3)["words"]
+        rows = list(zip(words["category"].tolist(), words["word"].tolist(), words["count"].tolist()))
+        expected = [(name, word, count) for name, pairs in state.top_words(3).items()
+                    for word, count in pairs]
+        self.assertEqual(rows, expected)
+
+        lengths = columnar_tables(state)["lengths"]
+        for name, stats in state.length_statistics().items():
+            mask = lengths["category"] == name
+            self.assertEqual(int(lengths["count"][mask].sum()), state.category_counts[name])
+            self.assertEqual(int(lengths["length"][mask].max()), stats["max_length"])
+
+    def test_export_columnar_npz_round_trip(self):
+        """Тест: выгрузка в NPZ читается обратно через numpy.load."""
+        state = collect_analysis_state(TEST_DATASET)
+        tables = columnar_tables(state)
+        with tempfile.TemporaryDirectory() as directory:
+            paths = export_columnar(state, directory)
+            self.assertEqual(set(paths), {"words", "lengths"})
+            for name, path in paths.items():
+                with np.load(path) as loaded:
+                    for column, values in tables[name].items():
+                        np.testing.assert_array_equal(loaded[column], values)
+
+    def test_export_columnar_rejects_unknown_format(self):
+        """Тест: неизвестный формат выгрузки вызывает ValueError."""
+        with self.assertRaises(ValueError):
+            export_columnar(AnalysisState(), "unused", fmt="csv")
+
+
+    # --- Тесты для выбора источника датасета ---
+    def _patch_local_file(self):
+        """Подменяет локальный файл датасета временным файлом с TEST_DATASET."""
+        path = self._write_temp(json.dumps(TEST_DATASET))
+        patcher = mock.patch("assignment.LOCAL_DATASET_FILE", path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_load_dataset_prefers_hub_within_deadline(self):
+        """Тест: Hub, ответивший до дедлайна, выигрывает у локального файла."""
+        self._patch_local_file()
+        hub = [{"label": 1, "text": "From the hub"}]
+        self.assertIs(load_ag_news_dataset(deadline=5.0, hub_loader=lambda: hub), hub)
+
+    def test_load_dataset_falls_back_when_hub_fails(self):
+        """Тест: ошибка Hub сразу переключает на локальный файл, не дожидаясь дедлайна."""
+        self._patch_local_file()
+
+        def offline_hub():
+            raise ConnectionError("network is unreachable")
+
+        start = time.monotonic()
+        self.assertEqual(load_ag_news_dataset(deadline=30.0, hub_loader=offline_hub), TEST_DATASET)
+        self.assertLess(time.monotonic() - start, 5.0)
+
+    def test_load_dataset_falls_back_after_deadline(self):
+        """Тест: зависший Hub не задерживает загрузку дольше дедлайна."""
+        self._patch_local_file()
+        release = threading.Event()
+        self.addCleanup(release.set)
+        start = time.monotonic()
+        dataset = load_ag_news_dataset(deadline=0.2, hub_loader=release.wait)
+        self.assertEqual(dataset, TEST_DATASET)
+        self.assertLess(time.monotonic() - start, 5.0)
+
+    def test_load_dataset_explicit_source(self):
+        """Тест: source='local' не обращается к Hub, source='hub' не скрывает его ошибку."""
+        self._patch_local_file()
+        hub = mock.Mock(side_effect=ConnectionError("offline"))
+        self.assertEqual(load_ag_news_dataset(source="local", hub_loader=hub), TEST_DATASET)
+        hub.assert_not_called()
+        with self.assertRaises(ConnectionError):
+            load_ag_news_dataset(source="hub", hub_loader=hub)
+        with self.assertRaises(ValueError):
+            load_ag_news_dataset(source="ftp")
+
+
+    # --- Тесты для характерных слов ---
+    CHARACTERISTIC_DATASET = [
+        {"label": 0, "text": "the talks in the capital"},
+        {"label": 0, "text": "the minister and the talks"},
+        {"label": 1, "text": "the team won the match"},
+        {"label": 1, "text": "the team and the coach"},
+        {"label": 2, "text": "the shares and the market"},
+        {"label": 3, "text": "the software update"},
+    ]
+
+    def test_category_term_matrix_matches_counters(self):
+        """Тест: CSR-матрица содержит те же счётчики, что и Counter категорий."""
+        state = collect_analysis_state(self.CHARACTERISTIC_DATASET, count_lengths=False)
+        matrix, terms = category_term_matrix(state)
+        self.assertEqual(matrix.shape, (len(CATEGORY_LABELS), len(terms)))
+        for row, name in enumerate(CATEGORY_LABELS.values()):
+            dense = matrix.getrow(row).toarray()[0]
+            self.assertEqual({terms[i]: int(n) for i, n in enumerate(dense) if n},
+                             state.category_word_counts(name))
+
+    def test_characteristic_words_demote_shared_stopwords(self):
+        """Тест: общее для всех категорий "the" не возглавляет характерные слова."""
+        for method in ("log_odds", "tfidf"):
+            result = extract_characteristic_words_by_category(self.CHARACTERISTIC_DATASET,
+                                                              top_n=3, method=method)
+            self.assertEqual(result["World"][0][0], "talks", method)
+            self.assertEqual(result["Sports"][0][0], "team", method)
+        # log-odds сравнивает категорию с остальными: "the" уступает всем словам, редким вне World
+        log_odds = extract_characteristic_words_by_category(self.CHARACTERISTIC_DATASET, top_n=4)
+        self.assertNotIn("the", [word for word, _ in log_odds["World"]])
+
+    def test_characteristic_words_invalid_arguments(self):
+        """Тест: неизвестный метод и неположительный prior_scale вызывают ValueError."""
+        state = collect_analysis_state(self.CHARACTERISTIC_DATASET, count_lengths=False)
+        with self.assertRaises(ValueError):
+            characteristic_words(state, method="chi2")
+        with self.assertRaises(ValueError):
+            characteristic_words(state, prior_scale=0)
+
+
+    # --- Тесты для n-грамм ---
+    def _exact_ngrams(self, dataset, order, top_n):
+        """Точный топ n-грамм полным перебором (эталон для проверки)."""
+        counters = {name: Counter() for name in CATEGORY_LABELS.values()}
+        for item in dataset:
+            words = preprocess_text(item["text"]).split()
+            counters[CATEGORY_LABELS[item["label"]]].update(
+                " ".join(words[i:i + order]) for i in range(len(words) - order + 1))
+        return {name: counter.most_common(top_n) for name, counter in counters.items()}
+
+    def test_top_ngrams_match_exact_counts(self):
+        """Тест: хэш-счётчики с точным пересчётом кандидатов дают точный топ n-грамм."""
+        rng = random.Random(7)
+        words = ["wall", "street", "stocks", "fell", "the", "team", "won", "match"]
+        dataset = [{"label": rng.randrange(4), "text": " ".join(rng.choices(words, k=12))}
+                   for _ in range(300)]
+        state = collect_analysis_state(dataset, ngram_orders=(2, 3), ngram_buckets=4096)
+        result = top_ngrams(dataset, state, top_n=5)
+        self.assertEqual(result["bigrams"], self._exact_ngrams(dataset, 2, 5))
+        self.assertEqual(result["trigrams"], self._exact_ngrams(dataset, 3, 5))
+        # Униграммы считаются в том же проходе, как и раньше
+        self.assertEqual(state.top_words(5), extract_top_words_by_category(dataset, top_n=5))
+
+    def test_ngrams_do_not_cross_documents(self):
+        """Тест: n-граммы не склеивают конец одного текста с началом следующего."""
+        dataset = [{"label": 0, "text": "peace talks"}, {"label": 0, "text": "resume today"}]
+        state = collect_analysis_state(dataset, ngram_orders=(2,))
+        self.assertEqual(top_ngrams(dataset, state, top_n=5)["bigrams"]["World"],
+                         [("peace talks", 1), ("resume today", 1)])
+
+    def test_ngram_counts_independent_of_workers_and_corpus(self):
+        """Тест: счётчики корзин совпадают для пула процессов и корпуса токенов."""
+        dataset = TEST_DATASET * 5
+        expected = collect_analysis_state(dataset, ngram_orders=(2, 3), ngram_buckets=128)
+        parallel = collect_analysis_state(dataset, ngram_orders=(2, 3), ngram_buckets=128,
+                                          workers=2, shard_size=7)
+        with tempfile.TemporaryDirectory() as directory:
+            corpus = build_token_corpus(dataset, directory)
+            from_corpus = collect_analysis_state(corpus, ngram_orders=(2, 3), ngram_buckets=128)
+            for state in (parallel, from_corpus):
+                self.assertEqual(set(state.ngrams.counts), set(expected.ngrams.counts))
+                for key, counts in expected.ngrams.counts.items():
+                    np.testing.assert_array_equal(state.ngrams.counts[key], counts)
+            self.assertEqual(top_ngrams(corpus, from_corpus, top_n=3),
+                             top_ngrams(dataset, expected, top_n=3))
+            del corpus
+
+    def test_ngram_counter_rejects_mismatched_merge(self):
+        """Тест: слияние счётчиков с разным числом корзин вызывает ValueError."""
+        with self.assertRaises(ValueError):
+            HashedNgramCounter((2,), 16).merge(HashedNgramCounter((2,), 32))
+        with self.assertRaises(ValueError):
+            top_ngrams(TEST_DATASET, collect_analysis_state(TEST_DATASET))
+
+
+    # --- Тесты для кодов меток ---
+    UNKNOWN_LABEL_DATASET = TEST_DATASET + [
+        {"label": 7, "text": "Label out of range."},
+        {"label": None, "text": "No label."},
+        {"label": "World", "text": "Label given as a name."},
+    ]
+
+    def test_encode_labels_and_distribution(self):
+        """Тест: коды меток и распределение через bincount, неизвестные метки считаются отдельно."""
+        codes = encode_labels([0, 1, 1, 3, -1, 4])
+        self.assertEqual(codes.dtype, np.uint8)
+        self.assertEqual(label_distribution(codes),
+                         ({"World": 1, "Sports": 2, "Business": 0, "Tech": 1}, 2))
+        self.assertEqual(encode_labels([2, None, "Tech", 1.0]).tolist(), [2, 255, 255, 1])
+        self.assertEqual(label_distribution(encode_labels([]))[1], 0)
+
+    def test_unknown_labels_are_reported(self):
+        """Тест: записи с неизвестной меткой не теряются молча, а попадают в unknown_label_count."""
+        result = analyze_dataset(self.UNKNOWN_LABEL_DATASET)
+        self.assertEqual(result["unknown_label_count"], 3)
+        self.assertEqual(result["category_distribution"], analyze_category_distribution(TEST_DATASET))
+        parallel = collect_analysis_state(self.UNKNOWN_LABEL_DATASET, workers=2, shard_size=4)
+        self.assertEqual(parallel.unknown_labels, 3)
+        with tempfile.TemporaryDirectory() as directory:
+            corpus = build_token_corpus(self.UNKNOWN_LABEL_DATASET, directory)
+            self.assertEqual(analyze_dataset(corpus)["unknown_label_count"], 3)
+            del corpus
+
+    def test_label_codes_are_reused_across_analyzers(self):
+        """Тест: готовые коды меток избавляют анализаторы от повторного разбора меток."""
+        codes = dataset_label_codes(self.UNKNOWN_LABEL_DATASET)
+        # Распределению по кодам датасет вообще не нужен
+        self.assertEqual(analyze_category_distribution(None, label_codes=codes),
+                         analyze_category_distribution(self.UNKNOWN_LABEL_DATASET))
+        with mock.patch("assignment.encode_labels", wraps=encode_labels) as encode:
+            lengths = analyze_text_lengths_by_category(self.UNKNOWN_LABEL_DATASET, label_codes=codes)
+            words = extract_top_words_by_category(self.UNKNOWN_LABEL_DATASET, top_n=3, label_codes=codes)
+        # Каждой порции передаются уже готовые коды (uint8), а не исходные метки
+        self.assertTrue(all(call.args[0].dtype == np.uint8 for call in encode.call_args_list))
+        self.assertEqual(lengths, analyze_text_lengths_by_category(self.UNKNOWN_LABEL_DATASET))
+        self.assertEqual(words, extract_top_words_by_category(self.UNKNOWN_LABEL_DATASET, top_n=3))
+
+
+    # --- Тесты для общей матрицы частот слов ---
+    def test_word_count_matrix_matches_counters(self):
+        """Тест: матрица частот даёт тот же топ, что и Counter, включая порядок равных частот."""
+        rng = random.Random(3)
+        words = [f"w{i}" for i in range(40)]
+        batches = [(rng.randrange(3), rng.choices(words, k=rng.randrange(1, 30))) for _ in range(60)]
+        counters = [Counter() for _ in range(3)]
+        first, second = WordCountMatrix(3), WordCountMatrix(3)
+        for i, (code, batch) in enumerate(batches):
+            counters[code].update(batch)
+            (first if i < 30 else second).update(code, batch)
+        first.merge(second)
+        for code, counter in enumerate(counters):
+            for n in (1, 5, 17, None):
+                self.assertEqual(first.most_common(code, n), counter.most_common(n))
+            self.assertEqual(first.category_counts(code), dict(counter))
+
+    def test_word_count_matrix_shares_vocabulary(self):
+        """Тест: слово, встречающееся во всех категориях, хранится в словаре один раз."""
+        state = collect_analysis_state(TEST_DATASET * 3)
+        vocabulary = state.word_counts.vocabulary
+        self.assertEqual(len(vocabulary), len(set(vocabulary)))
+        self.assertEqual(state.word_counts.counts.shape[1], len(CATEGORY_LABELS))
+        restored = pickle.loads(pickle.dumps(state))
+        self.assertEqual(len(restored.word_counts.counts), len(vocabulary))
+        self.assertEqual(restored.top_words(5), state.top_words(5))
+
+
+    # --- Тесты для времени импорта ---
+    def test_import_does_not_load_heavy_dependencies(self):
+        """Тест: импорт assignment не загружает numpy, matplotlib и datasets."""
+        code = ("import sys, assignment; "
+                "print([m for m in ('numpy', 'matplotlib', 'datasets') if m in sys.modules])")
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                                check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+        self.assertEqual(output.strip(), "[]")
+
+    def test_import_time_budget(self):
+        """Тест: импорт assignment укладывается в бюджет времени."""
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import assignment"],
+                                capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        # Формат строки: "import time: <self> | <cumulative> | <module>"
+        timings = [line.split("|") for line in result.stderr.splitlines() if line.startswith("import time:")]
+        cumulative = {fields[2].strip(): int(fields[1]) for fields in timings if fields[1].strip().isdigit()}
+        self.assertIn("assignment", cumulative)
+        self.assertLess(cumulative["assignment"], IMPORT_TIME_BUDGET_US)
+
+    # --- Тесты для бенчмарков ---
+    def _suite_result(self, rows_per_sec, peak_mb, exponent, sizes=("1000", "10000")):
+        """Собирает результат run_suite() для одной функции."""
+        return {"f": {"sizes": {size: {"rows_per_sec": rows_per_sec, "peak_mb": peak_mb}
+                                for size in sizes},
+                      "scaling_exponent": exponent}}
+
+    def test_scaling_exponent(self):
+        """Тест: показатель масштабирования для линейного и квадратичного роста."""
+        sizes = [1000, 10000, 100000]
+        self.assertAlmostEqual(scaling_exponent(sizes, [0.01, 0.1, 1.0]), 1.0, places=3)
+        self.assertAlmostEqual(scaling_exponent(sizes, [0.01, 1.0, 100.0]), 2.0, places=3)
+        self.assertTrue(np.isnan(scaling_exponent([1000], [0.01])))
+
+    def test_find_regressions_within_threshold(self):
+        """Тест: отклонения в пределах порога не считаются регрессией."""
+        baseline = self._suite_result(1000.0, 10.0, 1.0)
+        current = self._suite_result(850.0, 11.5, 1.1)
+        self.assertEqual(find_regressions(current, baseline, threshold=0.2), [])
+
+    def test_find_regressions_detects_each_metric(self):
+        """Тест: падение пропускной способности, рост памяти и показателя - регрессии."""
+        baseline = self._suite_result(1000.0, 10.0, 1.0)
+        current = self._suite_result(700.0, 13.0, 1.3)
+        regressions = find_regressions(current, baseline, threshold=0.2)
+        self.assertEqual(sum("throughput" in line for line in regressions), 2)
+        self.assertEqual(sum("peak memory" in line for line in regressions), 2)
+        self.assertEqual(sum("scaling exponent" in line for line in regressions), 1)
+
+    def test_find_regressions_skips_mismatched_sizes(self):
+        """Тест: показатель сравнивается только при совпадающих наборах размеров."""
+        baseline = self._suite_result(1000.0, 10.0, 1.0, sizes=("1000", "10000", "100000"))
+        current = self._suite_result(1000.0, 10.0, 2.0, sizes=("1000",))
+        self.assertEqual(find_regressions(current, baseline, threshold=0.2), [])
+
+    def test_measure_repeats_fast_calls(self):
+        """Тест: быстрая функция вызывается в цикле до минимальной длительности замера."""
+        calls = []
+        metrics = measure(calls.append, TEST_DATASET, repeat=2, min_seconds=0.01)
+        self.assertGreater(metrics["calls"], 1)
+        # Прогрев + вызовы последнего замера + запуск под tracemalloc
+        self.assertGreaterEqual(len(calls), metrics["calls"] + 2)
+        self.assertGreater(metrics["rows_per_sec"], 0)
+
+
 if __name__ == '__main__':
     unittest.main()